@@ -0,0 +1,6 @@
+"""Let Python know that the `benchmarks/` folder is a package.
+
+Each `bench_*` module is a standalone script, run from the project root with:
+
+    $ python3 -m benchmarks.bench_<name> [args]
+"""
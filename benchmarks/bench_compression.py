@@ -0,0 +1,101 @@
+"""Compare the load and write throughput of each compression codec.
+
+The data files are compressed with each codec (at `--level`, or the codec's
+default level), and then:
+
+- `load`: `extract.load_neos` and `extract.load_approaches` read them back,
+- `write`: `write.write_to_csv` and `write.write_to_json` export every close
+  approach to a file compressed with the codec.
+
+Throughputs are in megabytes of uncompressed data per second, and the ratio is
+the size of the compressed files relative to the uncompressed ones. The `none`
+row is the uncompressed baseline.
+
+To run this benchmark from the project root, run:
+
+    $ python3 -m benchmarks.bench_compression --neofile data/neos.csv \
+        --cadfile data/cad.json --level 6
+"""
+import argparse
+import pathlib
+import tempfile
+import time
+
+from compression import CODECS, open_codec
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from write import write_to_csv, write_to_json
+
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
+
+
+def compress_copy(path, codec, root, level):
+    """Compress a copy of a file with a codec, and return the copy's path."""
+    if codec is None:
+        return path
+    copy = root / f'{path.name}{CODECS[codec][0]}'
+    with open(path, 'rb') as source, \
+            open_codec(codec, copy, 'wb', level) as target:
+        for block in iter(lambda: source.read(1 << 20), b''):
+            target.write(block)
+    return copy
+
+
+def timed(function, *args, **kwargs):
+    """Call a function, and return the seconds it took."""
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    """Time loading and writing with every codec, and report the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--neofile', type=pathlib.Path,
+                        default=PROJECT_ROOT / 'data' / 'neos.csv')
+    parser.add_argument('--cadfile', type=pathlib.Path,
+                        default=PROJECT_ROOT / 'data' / 'cad.json')
+    parser.add_argument('--level', type=int, default=None,
+                        help="The compression level of every codec. "
+                             "Defaults to each codec's default level.")
+    args = parser.parse_args()
+
+    neos = load_neos(args.neofile)
+    approaches = load_approaches(args.cadfile)
+    results = list(NEODatabase(neos, approaches, cache_entries=0).query([]))
+    source_size = args.neofile.stat().st_size + args.cadfile.stat().st_size
+
+    print(f"{'codec':<8}{'ratio':>8}{'load MB/s':>12}"
+          f"{'write MB/s':>12}{'out ratio':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        root = pathlib.Path(tmp)
+        plain_size = None
+        for codec in (None, *CODECS):
+            name = codec or 'none'
+            neofile = compress_copy(args.neofile, codec, root, args.level)
+            cadfile = compress_copy(args.cadfile, codec, root, args.level)
+            ratio = (neofile.stat().st_size
+                     + cadfile.stat().st_size) / source_size
+            load = (timed(load_neos, neofile)
+                    + timed(load_approaches, cadfile))
+
+            suffix = CODECS[codec][0] if codec else ''
+            outputs = (root / f'out-{name}.csv{suffix}',
+                       root / f'out-{name}.json{suffix}')
+            write = (timed(write_to_csv, results, outputs[0],
+                           compresslevel=args.level)
+                     + timed(write_to_json, results, outputs[1],
+                             compresslevel=args.level))
+            out_size = sum(output.stat().st_size for output in outputs)
+            if plain_size is None:
+                plain_size = out_size
+
+            print(f"{name:<8}{ratio:>8.3f}"
+                  f"{source_size / load / 1e6:>12.1f}"
+                  f"{plain_size / write / 1e6:>12.1f}"
+                  f"{out_size / plain_size:>11.3f}")
+
+
+if __name__ == '__main__':
+    main()
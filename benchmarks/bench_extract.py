@@ -0,0 +1,92 @@
+"""Compare the streaming close approach loader against a whole-document load.
+
+Each loader runs in a fresh subprocess, so the peak resident set size (RSS)
+reported for it isn't polluted by the other one. The `json.load` loader is the
+previous implementation of `extract.load_approaches`, kept here as a baseline,
+and the `no-dates` loader streams without the per-load cache of parsed `cd`
+timestamps, to show what sharing them saves.
+
+To run this benchmark from the project root, run:
+
+    $ python3 -m benchmarks.bench_extract --cadfile data/cad.json
+
+Peak RSS is read with the `resource` module, so this only runs on Unix.
+"""
+import argparse
+import json
+import pathlib
+import resource
+import subprocess
+import sys
+import time
+import unittest.mock
+
+from extract import load_approaches
+from helpers import cd_to_datetime
+from models import CloseApproach
+
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
+
+
+def load_approaches_json(cad_json_path):
+    """Load close approaches by decoding the whole file with `json.load`."""
+    with open(cad_json_path) as json_file:
+        data = json.load(json_file)
+    fields = data['fields']
+    des_i, cd_i = fields.index('des'), fields.index('cd')
+    dist_i, v_rel_i = fields.index('dist'), fields.index('v_rel')
+    return [CloseApproach(record[des_i], record[cd_i],
+                          record[dist_i], record[v_rel_i])
+            for record in data['data']]
+
+
+def load_approaches_without_dates(cad_json_path):
+    """Stream close approaches, parsing every `cd` string on its own."""
+    with unittest.mock.patch('extract.cd_to_datetime',
+                             lambda cd, cache=None: cd_to_datetime(cd)):
+        return load_approaches(cad_json_path)
+
+
+LOADERS = {
+    'json.load': load_approaches_json,
+    'no-dates': load_approaches_without_dates,
+    'streaming': load_approaches,
+}
+
+
+def run_one(name, cad_json_path):
+    """Run one loader in this process and print its time and peak RSS."""
+    start = time.perf_counter()
+    approaches = LOADERS[name](cad_json_path)
+    elapsed = time.perf_counter() - start
+    # `ru_maxrss` is in kilobytes on Linux (and in bytes on macOS).
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(len(approaches), elapsed, peak)
+
+
+def main():
+    """Run every loader in its own subprocess and report the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cadfile', type=pathlib.Path,
+                        default=PROJECT_ROOT / 'data' / 'cad.json')
+    parser.add_argument('--run', choices=LOADERS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(args.run, args.cadfile)
+        return
+
+    print(f"{'loader':<12}{'approaches':>12}{'seconds':>10}{'peak RSS':>14}")
+    for name in LOADERS:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_extract',
+             '--cadfile', str(args.cadfile), '--run', name],
+            cwd=PROJECT_ROOT, check=True, capture_output=True, text=True)
+        count, elapsed, peak = output.stdout.split()
+        print(f"{name:<12}{count:>12}{float(elapsed):>10.2f}"
+              f"{int(peak) / 1024:>11.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
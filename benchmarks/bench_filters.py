@@ -0,0 +1,73 @@
+"""Measure predicate evaluations per second, per filter or fused.
+
+For a few typical filter collections, every loaded close approach is checked
+once by looping over the `AttributeFilter`s (the original evaluation in
+`NEODatabase.query`) and once by the single predicate generated by
+`filters.compile_filters`.
+
+To run this benchmark from the project root, run:
+
+    $ python3 -m benchmarks.bench_filters --neofile data/neos.csv \
+        --cadfile data/cad.json
+"""
+import argparse
+import datetime
+import pathlib
+import timeit
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, compile_filters
+
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
+
+FILTERS = {
+    'distance range': {'distance_min': 0.01, 'distance_max': 0.1},
+    'date range, velocity': {'start_date': datetime.date(2020, 1, 1),
+                             'end_date': datetime.date(2020, 6, 30),
+                             'velocity_min': 10},
+    'everything': {'start_date': datetime.date(2020, 1, 1),
+                   'distance_max': 0.5, 'velocity_min': 1,
+                   'velocity_max': 50, 'diameter_max': 10,
+                   'hazardous': False},
+}
+
+
+def loop(filters):
+    """Build a predicate that calls every filter in turn."""
+    def predicate(approach):
+        for criterion in filters:
+            if not criterion(approach):
+                return False
+        return True
+    return predicate
+
+
+def main():
+    """Time both predicates over every approach and report the throughput."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--neofile', type=pathlib.Path,
+                        default=PROJECT_ROOT / 'data' / 'neos.csv')
+    parser.add_argument('--cadfile', type=pathlib.Path,
+                        default=PROJECT_ROOT / 'data' / 'cad.json')
+    args = parser.parse_args()
+
+    approaches = load_approaches(args.cadfile)
+    NEODatabase(load_neos(args.neofile, workers=1), approaches)
+
+    print(f"{'filters':<24}{'loop':>16}{'fused':>16}{'speedup':>9}")
+    for name, criteria in FILTERS.items():
+        filters = create_filters(**criteria)
+        rates = []
+        for predicate in (loop(filters), compile_filters(filters)):
+            seconds = min(timeit.repeat(
+                lambda: [predicate(approach) for approach in approaches],
+                number=1, repeat=5))
+            rates.append(len(approaches) / seconds)
+        print(f"{name:<24}{rates[0]:>14,.0f}/s{rates[1]:>14,.0f}/s"
+              f"{rates[1] / rates[0]:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Micro-benchmark the parsing of NASA `cd` timestamps.
+
+Compares `datetime.strptime` (the previous implementation) with the
+fixed-format `helpers.cd_to_datetime`, with and without its dedup cache, on a
+list of timestamps in which every distinct value repeats a few times.
+
+To run this benchmark from the project root, run:
+
+    $ python3 -m benchmarks.bench_helpers
+"""
+import argparse
+import datetime
+import random
+import timeit
+
+from helpers import cd_to_datetime, CD_FORMAT
+
+
+def make_timestamps(n, repeats):
+    """Build `n` shuffled `cd` strings, each value repeated `repeats` times."""
+    rng = random.Random(0)
+    start = datetime.datetime(1900, 1, 1)
+    distinct = [(start + datetime.timedelta(minutes=rng.randrange(1 << 27)))
+                .strftime(CD_FORMAT) for _ in range(n // repeats)]
+    timestamps = distinct * repeats
+    rng.shuffle(timestamps)
+    return timestamps
+
+
+def main():
+    """Time each parser over the same timestamps and report rows per second."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', type=int, default=200000)
+    parser.add_argument('--repeats', type=int, default=2)
+    args = parser.parse_args()
+
+    timestamps = make_timestamps(args.n, args.repeats)
+    parsers = {
+        'strptime': lambda: [datetime.datetime.strptime(cd, CD_FORMAT)
+                             for cd in timestamps],
+        'cd_to_datetime': lambda: [cd_to_datetime(cd) for cd in timestamps],
+        'cd_to_datetime+cache': lambda: [cd_to_datetime(cd, cache)
+                                         for cache in [{}]
+                                         for cd in timestamps],
+    }
+
+    baseline = None
+    for name, parse in parsers.items():
+        seconds = min(timeit.repeat(parse, number=1, repeat=3))
+        baseline = baseline or seconds
+        print(f"{name:<22}{len(timestamps) / seconds:>14,.0f} rows/s"
+              f"{baseline / seconds:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
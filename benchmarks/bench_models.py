@@ -0,0 +1,89 @@
+"""Measure the memory used per NEO and per close approach.
+
+Loads the data files with `tracemalloc` tracing, once with the slotted model
+classes, and once with copies of them without `__slots__`, whose instances
+keep their attributes in a per-instance `__dict__` (the previous layout).
+Each layout is measured in a fresh subprocess, so that neither measurement
+depends on what the other one allocated. The NEO and approach lists are
+measured separately, as they are loaded, before an `NEODatabase` links them.
+
+To run this benchmark from the project root, run:
+
+    $ python3 -m benchmarks.bench_models --neofile data/neos.csv \
+        --cadfile data/cad.json
+
+Sub-classing the model classes wouldn't do: a subclass inherits their slot
+descriptors, so its attributes would still be stored in slots.
+"""
+import argparse
+import gc
+import pathlib
+import subprocess
+import sys
+import tracemalloc
+import unittest.mock
+
+from extract import load_neos, load_approaches
+from models import NearEarthObject, CloseApproach
+
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
+
+
+def unslotted(cls):
+    """Return a copy of a model class whose instances have a `__dict__`."""
+    namespace = {name: value for name, value in vars(cls).items()
+                 if name not in cls.__slots__
+                 and name not in ('__slots__', '__dict__', '__weakref__')}
+    return type(cls.__name__, cls.__bases__, namespace)
+
+
+LAYOUTS = {
+    '__dict__': (unslotted(NearEarthObject), unslotted(CloseApproach)),
+    '__slots__': (NearEarthObject, CloseApproach),
+}
+
+
+def measure(neofile, cadfile, neo_cls, approach_cls):
+    """Return the bytes per NEO and per approach for the given classes."""
+    with unittest.mock.patch('extract.NearEarthObject', neo_cls), \
+            unittest.mock.patch('extract.CloseApproach', approach_cls):
+        gc.collect()
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        neos = load_neos(neofile, workers=1)
+        after_neos = tracemalloc.get_traced_memory()[0]
+        approaches = load_approaches(cadfile)
+        after_approaches = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    return ((after_neos - start) / len(neos),
+            (after_approaches - after_neos) / len(approaches))
+
+
+def main():
+    """Measure each layout in a subprocess and report bytes per object."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--neofile', type=pathlib.Path,
+                        default=PROJECT_ROOT / 'data' / 'neos.csv')
+    parser.add_argument('--cadfile', type=pathlib.Path,
+                        default=PROJECT_ROOT / 'data' / 'cad.json')
+    parser.add_argument('--run', choices=LAYOUTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(*measure(args.neofile, args.cadfile, *LAYOUTS[args.run]))
+        return
+
+    print(f"{'layout':<12}{'bytes/NEO':>12}{'bytes/approach':>16}")
+    for name in LAYOUTS:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_models',
+             '--neofile', str(args.neofile), '--cadfile', str(args.cadfile),
+             '--run', name],
+            cwd=PROJECT_ROOT, check=True, capture_output=True, text=True)
+        per_neo, per_approach = map(float, output.stdout.split())
+        print(f"{name:<12}{per_neo:>12.0f}{per_approach:>16.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Compare the query engines of `NEODatabase` on a (scaled-up) catalog.
+
+The catalog is loaded from the data files and, with `--scale N`, every close
+approach is repeated N times, to emulate a much larger catalog. Each query is
+then answered by:
+
+- `scan`: a plain loop checking every filter on every approach (the original
+  implementation of `NEODatabase.query`),
+- `index`: the default engine, planned through the sorted indexes and the
+  NEO-level criteria,
+- `columnar`: the NumPy-based `ColumnarEngine`, if NumPy is installed.
+
+Each query is run `INDEX_AFTER_QUERIES` times before it's timed, so that the
+lazily built sorted indexes are excluded from the timings. The query result
+cache is disabled.
+
+To run this benchmark from the project root, run:
+
+    $ python3 -m benchmarks.bench_query --neofile data/neos.csv \
+        --cadfile data/cad.json --scale 4
+"""
+import argparse
+import datetime
+import pathlib
+import time
+
+from columnar import numpy
+from database import NEODatabase, INDEX_AFTER_QUERIES
+from extract import load_neos, load_approaches
+from filters import create_filters
+from models import CloseApproach
+
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
+
+QUERIES = {
+    'all': {},
+    'date': {'date': datetime.date(2020, 3, 2)},
+    'month, max distance': {'start_date': datetime.date(2020, 1, 1),
+                            'end_date': datetime.date(2020, 1, 31),
+                            'distance_max': 0.025},
+    'max distance': {'distance_max': 0.001},
+    'min velocity': {'velocity_min': 30},
+    'hazardous, diameter': {'diameter_min': 1, 'hazardous': True},
+    'hazardous, velocity': {'hazardous': True, 'velocity_min': 15},
+}
+
+
+def load_catalog(neofile, cadfile, scale):
+    """Load NEOs and approaches, with every approach repeated `scale` times."""
+    neos = load_neos(neofile, workers=1)
+    approaches = load_approaches(cadfile)
+    approaches = [CloseApproach(a.designation, a.time, a.distance, a.velocity)
+                  for _ in range(scale) for a in approaches]
+    return neos, approaches
+
+
+def scan(approaches, filters):
+    """Check every filter on every approach."""
+    return [approach for approach in approaches
+            if all(criterion(approach) for criterion in filters)]
+
+
+def main():
+    """Time every query with every engine and report the speedups."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--neofile', type=pathlib.Path,
+                        default=PROJECT_ROOT / 'data' / 'neos.csv')
+    parser.add_argument('--cadfile', type=pathlib.Path,
+                        default=PROJECT_ROOT / 'data' / 'cad.json')
+    parser.add_argument('--scale', type=int, default=1)
+    args = parser.parse_args()
+
+    neos, approaches = load_catalog(args.neofile, args.cadfile, args.scale)
+    engines = {'scan': None,
+               'index': NEODatabase(neos, approaches, cache_entries=0)}
+    if numpy is not None:
+        engines['columnar'] = NEODatabase(neos, approaches, columnar=True,
+                                          cache_entries=0)
+    print(f"{len(approaches)} approaches")
+
+    print(f"{'query':<22}{'matches':>9}"
+          + ''.join(f"{name:>12}" for name in engines))
+    for name, criteria in QUERIES.items():
+        filters = create_filters(**criteria)
+        timings = []
+        for database in engines.values():
+            for _ in range(0 if database is None else INDEX_AFTER_QUERIES):
+                list(database.query(filters))
+            start = time.perf_counter()
+            if database is None:
+                results = scan(approaches, filters)
+            else:
+                results = list(database.query(filters))
+            timings.append(time.perf_counter() - start)
+        print(f"{name:<22}{len(results):>9}"
+              + ''.join(f"{seconds * 1000:>9.1f} ms" for seconds in timings))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Cache the results of repeated queries against an immutable `NEODatabase`.
+
+A `QueryCache` is a bounded least-recently-used (LRU) mapping from a canonical
+form of a filter collection to the positions of the approaches that matched
+it. Positions are stored as compact `array`s of integers rather than lists of
+`CloseApproach` objects, and the cache is bounded both by a number of entries
+and by the total size of the stored positions.
+
+The `filters_key` function computes the canonical form of a filter collection:
+it's independent of the order in which the filters were supplied.
+
+A `QueryCache` can be shared by queries running in several threads, such as
+the executor threads of `NEODatabase.aquery`.
+"""
+import array
+import collections
+import threading
+
+
+def filters_key(filters):
+    """Compute a canonical, order-independent key for a filter collection.
+
+    Each filter is described by its class and its instance attributes (for an
+    `AttributeFilter`, its comparator and reference value), so two collections
+    holding equivalent filters in a different order produce the same key.
+
+    :param filters: A collection of filters capturing user-specified criteria.
+    :return: A hashable key, or None if some filter can't be described by
+        hashable attributes (such a query simply isn't cached).
+    """
+    try:
+        key = frozenset((type(criterion),
+                         tuple(sorted(vars(criterion).items())))
+                        for criterion in filters)
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+class QueryCache:
+    """A bounded LRU cache of query results, stored as approach positions."""
+
+    def __init__(self, max_entries=128, max_bytes=64 << 20):
+        """Create a new, empty `QueryCache`.
+
+        :param max_entries: The maximum number of cached queries.
+        :param max_bytes: The maximum total size of the cached positions.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Return the number of cached queries."""
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        """Return the total size, in bytes, of the cached positions."""
+        return self._bytes
+
+    def get(self, key):
+        """Look up the positions matched by a query, and count a hit or miss.
+
+        :param key: A key computed by `filters_key`.
+        :return: An `array` of approach positions, or None if not cached.
+        """
+        with self._lock:
+            positions = self._entries.get(key)
+            if positions is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+        return positions
+
+    def put(self, key, positions):
+        """Store the positions matched by a query, evicting old entries.
+
+        Least recently used entries are evicted until the cache is within both
+        of its limits. A result larger than `max_bytes` isn't stored at all.
+
+        :param key: A key computed by `filters_key`.
+        :param positions: An iterable of matching approach positions.
+        """
+        positions = array.array('l', positions)
+        size = positions.itemsize * len(positions)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                old = self._entries.pop(key)
+                self._bytes -= old.itemsize * len(old)
+            self._entries[key] = positions
+            self._bytes += size
+
+            while (len(self._entries) > self.max_entries
+                   or self._bytes > self.max_bytes):
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= old.itemsize * len(old)
+
+    def clear(self):
+        """Remove every cached query, keeping the hit and miss counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
@@ -0,0 +1,91 @@
+"""
+Evaluate query filters as vectorized masks over NumPy columns.
+
+A `ColumnarEngine` stores the attributes that the built-in filters compare -
+approach date, distance and velocity, and NEO diameter and hazardous flag - as
+NumPy arrays aligned with the internal order of an `NEODatabase`. Each filter
+from `filters.create_filters` then becomes one vectorized comparison, and the
+combined boolean mask yields the positions of the matching approaches, still
+in internal order.
+
+NumPy is an optional dependency: this module imports without it, but creating
+a `ColumnarEngine` raises an `ImportError`.
+"""
+import operator
+
+from filters import (DateFilter, DistanceFilter, VelocityFilter,
+                     DiameterFilter, HazardousFilter)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Comparators with an element-wise NumPy equivalent.
+_UFUNCS = {
+    operator.eq: 'equal',
+    operator.ne: 'not_equal',
+    operator.lt: 'less',
+    operator.le: 'less_equal',
+    operator.gt: 'greater',
+    operator.ge: 'greater_equal',
+}
+
+
+class ColumnarEngine:
+    """Columns of approach attributes, for vectorized filter evaluation.
+
+    Filters whose class or comparator has no column or NumPy equivalent (such
+    as custom `AttributeFilter` subclasses) are returned to the caller, to be
+    checked approach by approach on the positions that the mask selects.
+    """
+
+    def __init__(self, approaches):
+        """Create a new `ColumnarEngine`.
+
+        :param approaches: A sequence of linked `CloseApproach`es, in the
+            internal order of the database.
+        """
+        if numpy is None:
+            raise ImportError("The columnar query engine requires NumPy.")
+
+        def column(get, dtype):
+            return numpy.fromiter((get(approach) for approach in approaches),
+                                  dtype=dtype, count=len(approaches))
+
+        # Each filter class maps to its column and to a function converting
+        # the filter's reference value into the column's units.
+        self._columns = {
+            DateFilter: (column(lambda a: a.time.toordinal(), numpy.int64),
+                         lambda date: date.toordinal()),
+            DistanceFilter: (column(lambda a: a.distance, numpy.float64),
+                             float),
+            VelocityFilter: (column(lambda a: a.velocity, numpy.float64),
+                             float),
+            DiameterFilter: (column(lambda a: a.neo.diameter, numpy.float64),
+                             float),
+            HazardousFilter: (column(lambda a: a.neo.hazardous, numpy.bool_),
+                              bool),
+        }
+        self._size = len(approaches)
+
+    def plan(self, filters):
+        """Evaluate the filters that have a column as one boolean mask.
+
+        :param filters: A collection of filters capturing user-specified
+        criteria.
+        :return: A tuple of the positions selected by the mask, in internal
+        order, and the filters that still need to be checked on them.
+        """
+        mask = numpy.ones(self._size, dtype=numpy.bool_)
+        remaining = []
+        for criterion in filters:
+            if (type(criterion) not in self._columns
+                    or criterion.op not in _UFUNCS):
+                remaining.append(criterion)
+                continue
+            column, convert = self._columns[type(criterion)]
+            compare = getattr(numpy, _UFUNCS[criterion.op])
+            mask &= compare(column, convert(criterion.value))
+        return numpy.flatnonzero(mask).tolist(), remaining
@@ -0,0 +1,105 @@
+"""
+Read and write files compressed with gzip, bzip2 or xz.
+
+Input files are recognized by their leading (magic) bytes, whatever their
+name, while output files are compressed according to the extension of their
+name, such as `results.csv.gz`. Either way, the data streams through the
+codec, without decompressing to or compressing from a temporary file.
+
+The `sniff_codec` and `suffix_codec` functions detect the codec of an input
+and an output file, the `open_codec` function opens a file through a codec,
+and the `format_suffix` function returns the extension of an output file
+once its compression extension is removed, which selects its data format.
+
+Uncompressed files aren't opened here: callers open them with `open` as
+usual, and only use `open_codec` when a codec was detected.
+"""
+import bz2
+import gzip
+import lzma
+import pathlib
+
+
+# Each codec maps to the extension of its files, their leading bytes, and the
+# module opening them.
+CODECS = {
+    'gzip': ('.gz', b'\x1f\x8b', gzip),
+    'bz2': ('.bz2', b'BZh', bz2),
+    'xz': ('.xz', b'\xfd7zXZ\x00', lzma),
+}
+
+# The valid compression levels of each codec (for xz, its presets).
+LEVELS = {
+    'gzip': range(0, 10),
+    'bz2': range(1, 10),
+    'xz': range(0, 10),
+}
+
+
+def sniff_codec(path):
+    """Detect the codec of a file from its leading bytes.
+
+    :param path: A Path-like object pointing to an existing file.
+    :return: The name of the file's codec, or None if it isn't compressed.
+    """
+    with open(path, 'rb') as sniffed:
+        magic = sniffed.read(max(len(magic) for _, magic, _ in
+                                 CODECS.values()))
+    for codec, (_, codec_magic, _) in CODECS.items():
+        if magic.startswith(codec_magic):
+            return codec
+    return None
+
+
+def suffix_codec(path):
+    """Detect the codec of a file from the extension of its name.
+
+    :param path: A Path-like object, or None.
+    :return: The name of the codec, or None if the name has no compression
+        extension.
+    """
+    if path is None:
+        return None
+    suffix = pathlib.PurePath(path).suffix.lower()
+    for codec, (codec_suffix, _, _) in CODECS.items():
+        if suffix == codec_suffix:
+            return codec
+    return None
+
+
+def format_suffix(path):
+    """Return the extension of a file's data format, ignoring compression.
+
+    :param path: A Path-like object, such as `results.csv.gz`.
+    :return: The extension of the uncompressed data, such as '.csv'.
+    """
+    path = pathlib.PurePath(path)
+    if suffix_codec(path) is not None:
+        path = path.with_suffix('')
+    return path.suffix
+
+
+def open_codec(codec, path, mode, level=None, **kwargs):
+    """Open a file through a codec, in text or binary mode.
+
+    :param codec: The name of a codec, a key of `CODECS`.
+    :param path: A Path-like object pointing to the file.
+    :param mode: A mode for `open`, such as 'rt' or 'wb'.
+    :param level: The compression level of a written file, or None for the
+        codec's default level.
+    :param kwargs: Other arguments for `open`, such as `newline`. A
+        `buffering` argument is ignored, since the codecs buffer their
+        output themselves.
+    :return: A file object.
+    :raises ValueError: If the level isn't valid for the codec.
+    """
+    kwargs.pop('buffering', None)
+    if 'b' not in mode and 't' not in mode:
+        # Like `open`, and unlike the codecs, default to text mode.
+        mode += 't'
+    module = CODECS[codec][2]
+    if level is not None and 'w' in mode:
+        if level not in LEVELS[codec]:
+            raise ValueError(f"Invalid {codec} compression level: {level}.")
+        kwargs['preset' if codec == 'xz' else 'compresslevel'] = level
+    return module.open(path, mode, **kwargs)
@@ -0,0 +1,69 @@
+"""
+Encode and decode opaque cursors for paging through query results.
+
+A cursor records the internal position of the last close approach returned by
+a page of a query, so the next page resumes the scan right after it instead
+of re-scanning and re-filtering every earlier match. It also records a
+fingerprint of the query's filters (and of the size of the database), so a
+cursor can't silently be resumed with a different query.
+
+Cursors are URL-safe base64 strings, meant to be passed around as is.
+"""
+import base64
+import binascii
+import hashlib
+
+
+class CursorError(ValueError):
+    """A cursor is malformed, or belongs to a different query."""
+
+
+def filters_fingerprint(filters, size):
+    """Compute a fingerprint of a query, stable across processes.
+
+    Unlike `cache.filters_key`, which relies on hashing, this fingerprint
+    only depends on the textual form of the filters, so a cursor printed by
+    one run can be resumed by another.
+
+    :param filters: A collection of filters capturing user-specified criteria.
+    :param size: The number of close approaches in the database.
+    :return: A short hexadecimal digest.
+    """
+    description = sorted(
+        (type(criterion).__qualname__,
+         sorted((name, repr(value))
+                for name, value in vars(criterion).items()))
+        for criterion in filters)
+    return hashlib.blake2b(repr((description, size)).encode(),
+                           digest_size=8).hexdigest()
+
+
+def encode_cursor(position, fingerprint):
+    """Encode the position of the last returned approach into a cursor.
+
+    :param position: The internal position of the last returned approach.
+    :param fingerprint: The query's fingerprint, from `filters_fingerprint`.
+    :return: An opaque cursor string.
+    """
+    token = f'{position}:{fingerprint}'.encode()
+    return base64.urlsafe_b64encode(token).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fingerprint):
+    """Decode a cursor into the position of the last returned approach.
+
+    :param cursor: A cursor returned by `encode_cursor`.
+    :param fingerprint: The fingerprint of the query being resumed.
+    :return: The internal position recorded in the cursor.
+    :raises CursorError: If the cursor is malformed or was issued for another
+        query.
+    """
+    try:
+        token = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        position, cursor_fingerprint = token.decode().split(':')
+        position = int(position)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise CursorError(f"Malformed cursor: {cursor!r}.") from None
+    if cursor_fingerprint != fingerprint or position < 0:
+        raise CursorError("This cursor was issued for a different query.")
+    return position
@@ -10,8 +10,90 @@ Under normal circumstances, the main module creates one NEODatabase from the
 data on NEOs and close approaches extracted by `extract.load_neos` and
 `extract.load_approaches`.
 
+The database keeps sorted indexes of approach dates, distances and velocities
+and of NEO diameters. A query plans its scan from the indexed criterion that
+is estimated to be the most selective, so it only visits the approaches
+within that criterion's range; an index is built once a second query needs
+it, as a single query is cheaper to answer with a linear scan.
+Criteria on NEO attributes can instead be checked on the (much smaller)
+collection of NEOs, so that only the approaches of qualifying NEOs are visited.
+Alternatively, a database can be created with the NumPy-based columnar engine
+from the `columnar` module, which evaluates the filters as vectorized masks.
+
+The positions of the approaches matched by recent queries are kept in an LRU
+`QueryCache`, so a repeated query streams its results without re-scanning.
+Large scans can also be split into shards scanned by a pool of processes.
+Results can be fetched in pages, each resuming the scan from an opaque cursor
+left by the previous page. For asyncio services, `aquery` streams matches
+asynchronously, scanning in chunks on an executor so the event loop isn't
+blocked.
+
+The `nearest` method finds the approaches most similar to a target distance,
+velocity and time, through a k-d tree over those three attributes, each
+scaled by its standard deviation so that they weigh alike.
+
 You'll edit this file in Tasks 2 and 3.
 """
+import array
+import asyncio
+import bisect
+import itertools
+import multiprocessing
+import operator
+import statistics
+
+from cache import QueryCache, filters_key
+from columnar import ColumnarEngine
+from cursor import decode_cursor, encode_cursor, filters_fingerprint
+from explain import QueryProfile
+from filters import (DateFilter, DistanceFilter, VelocityFilter,
+                     DiameterFilter, HazardousFilter, compile_filters)
+from index import SortedIndex, criteria_range, is_range_criterion
+from kdtree import KDTree
+from names import NameIndex
+
+
+# Filter classes answered from a sorted index, mapped to a function that
+# computes an approach's index key, a function that converts a filter's
+# reference value into a key, and the `array` typecode of the keys.
+INDEXED_FILTERS = {
+    DateFilter: (lambda approach: approach.time.toordinal(),
+                 lambda date: date.toordinal(), 'l'),
+    DistanceFilter: (lambda approach: approach.distance, None, 'd'),
+    VelocityFilter: (lambda approach: approach.velocity, None, 'd'),
+    DiameterFilter: (lambda approach: approach.neo.diameter, None, 'd'),
+}
+
+# Filter classes on an attribute of the NEO rather than of the approach,
+# mapped to a function that computes that attribute from an NEO.
+NEO_FILTERS = {
+    DiameterFilter: lambda neo: neo.diameter,
+    HazardousFilter: lambda neo: neo.hazardous,
+}
+
+# Maximum share of the approaches that criteria on NEO attributes may select
+# for their approaches to drive a scan. Broader ones (such as non-hazardous
+# NEOs) are cheaper to check in a linear scan than to merge.
+NEO_PLAN_MAX_SHARE = 0.25
+
+# Maximum number of approaches checked to estimate how many approaches a
+# query's criteria on an indexed attribute accept.
+PLAN_SAMPLE_SIZE = 1000
+
+# Number of queries that a filter class must drive before its sorted index is
+# built. Earlier ones scan linearly, which is cheaper than building an index
+# that no other query might use.
+INDEX_AFTER_QUERIES = 2
+
+# Number of matches that `aquery` fetches from the executor at a time.
+ASYNC_CHUNK_SIZE = 1000
+
+# Number of shards handed to each worker of a sharded query, to even out
+# their load.
+SHARDS_PER_WORKER = 4
+
+# The planned scan shared with forked worker processes of a sharded query.
+_shared_scan = None
 
 
 class NEODatabase:
@@ -23,7 +105,8 @@ class NEODatabase:
     querying for close approaches that match criteria.
     """
 
-    def __init__(self, neos, approaches):
+    def __init__(self, neos, approaches, columnar=False,
+                 cache_entries=128, cache_bytes=64 << 20):
         """Create a new `NEODatabase`.
 
         As a precondition, this constructor assumes that the collections of
@@ -40,9 +123,14 @@ class NEODatabase:
 
         :param neos: A collection of `NearEarthObject`s.
         :param approaches: A collection of `CloseApproach`es.
+        :param columnar: Whether to answer queries with the NumPy-based
+            `ColumnarEngine` instead of the sorted indexes.
+        :param cache_entries: The maximum number of queries whose results are
+            cached (0 disables the cache).
+        :param cache_bytes: The maximum size, in bytes, of cached results.
         """
         self._neos = neos
-        self._approaches = approaches
+        self._approaches = list(approaches)
 
         self._neos_by_name = {}
         self._neos_by_des = {}
@@ -54,7 +142,7 @@ class NEODatabase:
             if neo.name is not None:
                 self._neos_by_name[neo.name.lower()] = neo
 
-        for approach in approaches:
+        for approach in self._approaches:
             current_neo = self._neos_by_des[approach.designation]
             approach.neo = current_neo
             if current_neo.approaches is None:
@@ -62,6 +150,25 @@ class NEODatabase:
             else:
                 current_neo.approaches.append(approach)
 
+        # Sorted indexes and the number of queries that needed each, keyed by
+        # filter class, the approach positions of each NEO, keyed by
+        # designation, the name index and the k-d tree of approaches (with
+        # the scales of its coordinates), built on first use.
+        self._indexes = {}
+        self._index_demand = {}
+        self._positions_by_neo = None
+        self._names = None
+        self._tree = None
+        self._scales = None
+        self._columns = (ColumnarEngine(self._approaches) if columnar
+                         else None)
+        self._cache = QueryCache(cache_entries, cache_bytes)
+
+    @property
+    def cache(self):
+        """Return the `QueryCache` of this database's query results."""
+        return self._cache
+
     def get_neo_by_designation(self, designation):
         """Find and return an NEO by its primary designation.
 
@@ -94,7 +201,75 @@ class NEODatabase:
         """
         return self._neos_by_name.get(name.lower())
 
-    def query(self, filters=()):
+    def get_neos_by_prefix(self, prefix, limit=10):
+        """Find and return the NEOs whose name or designation has a prefix.
+
+        The matching is case-insensitive.
+
+        :param prefix: The beginning of the name or designation to search for.
+        :param limit: The maximum number of NEOs to return.
+        :return: A list of matching `NearEarthObject`s, in alphabetical order.
+        """
+        return self._name_index().prefix(prefix, limit)
+
+    def get_neos_by_fuzzy_name(self, name, limit=10):
+        """Find and return the NEOs named or designated closest to a name.
+
+        This tolerates typos: candidates are ranked by their edit distance to
+        the given name, so an exact match (if any) comes first.
+
+        :param name: The approximate name or designation to search for.
+        :param limit: The maximum number of NEOs to return.
+        :return: A list of (`NearEarthObject`, edit distance) tuples, from the
+            closest match to the farthest.
+        """
+        return self._name_index().fuzzy(name, limit)
+
+    def nearest(self, target, k=10, weights=None):
+        """Find the close approaches most similar to a target approach.
+
+        Similarity is the Euclidean distance between (distance, velocity,
+        time) triples, after scaling each attribute by its standard deviation
+        over every approach in the database, and then by its weight.
+
+        :param target: A tuple of the target distance (in au), velocity (in
+            km/s) and time (a `datetime.datetime` or a `datetime.date`).
+        :param k: The number of approaches to find.
+        :param weights: A tuple of non-negative weights of the distance,
+            velocity and time, or None to weigh them equally.
+        :return: A list of up to `k` (`CloseApproach`, dissimilarity) tuples,
+            from the most similar approach to the least.
+        :raises ValueError: If the weights aren't three non-negative numbers.
+        """
+        if weights is not None and (len(weights) != 3
+                                    or any(weight < 0 for weight in weights)):
+            raise ValueError("The weights must be three non-negative numbers, "
+                             "for the distance, velocity and time.")
+        if self._tree is None:
+            coordinates = [(approach.distance, approach.velocity,
+                            _days(approach.time))
+                           for approach in self._approaches]
+            self._scales = tuple(statistics.pstdev(column) or 1.0
+                                 for column in zip(*coordinates))
+            self._tree = KDTree(
+                tuple(value / scale
+                      for value, scale in zip(point, self._scales))
+                for point in coordinates)
+
+        distance, velocity, time = target
+        point = tuple(value / scale for value, scale in
+                      zip((distance, velocity, _days(time)), self._scales))
+        return [(self._approaches[position], dissimilarity)
+                for position, dissimilarity
+                in self._tree.nearest(point, k, weights)]
+
+    def _name_index(self):
+        """Return the `NameIndex` of the NEOs, building it if needed."""
+        if self._names is None:
+            self._names = NameIndex(self._neos_by_name, self._neos_by_des)
+        return self._names
+
+    def query(self, filters=(), workers=1, limit=None, profile=None):
         """Query close approaches filter them.
 
         This generates a stream of `CloseApproach` objects that match all
@@ -106,17 +281,463 @@ class NEODatabase:
         isn't guaranteed to be sorted meaninfully, although is often sorted
         by time.
 
+        The scan is driven from the sorted index of the most selective
+        indexed criterion, so only the approaches within its range are
+        checked against the remaining filters.
+
+        With several `workers`, the approaches the plan selects are split into
+        contiguous shards of internal order (which is time order for NASA's
+        data) that are scanned by a pool of worker processes, and the partial
+        results are merged back in shard order.
+
+        The positions matched by a query are cached once the stream has been
+        consumed to the end, and a cached query streams them back without
+        scanning. A stream that is abandoned early (for example by `limit`)
+        doesn't populate the cache, since its results are incomplete.
+
         :param filters: A collection of filters capturing user-specified
         criteria.
+        :param workers: The number of processes scanning the approaches.
+        :param limit: The maximum number of approaches to generate, or None.
+            Each shard stops scanning once it has found this many matches,
+            and shards that aren't needed any more are cancelled.
+        :param profile: An `explain.QueryProfile` recording the plan of the
+            query and counting the evaluations of each filter, or None.
         :return: A stream of matching `CloseApproach` objects.
         """
-        for approach in self._approaches:
-            all_passed = True
-            for filter in filters:
-                if filter(approach):
-                    continue
-                else:
-                    all_passed = False
-                    break
-            if all_passed:
+        filters = list(filters)
+        approaches = self._approaches
+        if limit == 0:
+            limit = None
+        key = filters_key(filters) if self._cache.max_entries > 0 else None
+        if key is not None:
+            cached = self._cache.get(key)
+            if cached is not None:
+                if profile is not None:
+                    profile.set_plan(f"cached result of {len(cached)} "
+                                     f"approaches", filters)
+                for position in itertools.islice(cached, limit):
+                    yield approaches[position]
+                return
+
+        if workers > 1:
+            positions = self._scan_sharded(filters, workers, limit, profile)
+        else:
+            positions = itertools.islice(self._scan(filters, profile=profile),
+                                         limit)
+
+        matched = (array.array('l')
+                   if key is not None and limit is None else None)
+        for position in positions:
+            if matched is not None:
+                matched.append(position)
+                if matched.itemsize * len(matched) > self._cache.max_bytes:
+                    matched = None
+            yield approaches[position]
+
+        if matched is not None:
+            self._cache.put(key, matched)
+
+    async def aquery(self, filters=(), limit=None, timeout=None,
+                     chunk_size=ASYNC_CHUNK_SIZE, executor=None):
+        """Query close approaches asynchronously, without blocking the loop.
+
+        This is the asynchronous counterpart of `query`, for use with `async
+        for`: the matches are generated in the same internal order, and the
+        result cache is used and populated in the same way. The scan runs on
+        an executor (the event loop's default one, unless given), one chunk
+        of matches at a time, so concurrent queries on the same database
+        take turns instead of stalling each other.
+
+        The query can be cancelled like any other awaitable; the chunk being
+        scanned when it is cancelled completes in the background and is
+        discarded.
+
+        :param filters: A collection of filters capturing user-specified
+        criteria.
+        :param limit: The maximum number of approaches to generate, or None.
+        :param timeout: A deadline for the whole query, in seconds from the
+            call, or None.
+        :param chunk_size: The number of matches scanned per executor call.
+        :param executor: The `concurrent.futures.Executor` running the scan,
+            or None for the event loop's default executor.
+        :return: An asynchronous stream of matching `CloseApproach` objects.
+        :raises asyncio.TimeoutError: If the deadline passes before the
+            stream is exhausted.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        results = self.query(filters, limit=limit)
+
+        def next_chunk():
+            return list(itertools.islice(results, chunk_size))
+
+        while True:
+            chunk = loop.run_in_executor(executor, next_chunk)
+            if deadline is None:
+                chunk = await chunk
+            else:
+                chunk = await asyncio.wait_for(chunk, deadline - loop.time())
+            for approach in chunk:
                 yield approach
+            if len(chunk) < chunk_size:
+                return
+
+    def query_page(self, filters=(), page_size=10, cursor=None):
+        """Fetch one page of the close approaches matching the filters.
+
+        Pages follow internal order, like `query`. The first page starts at
+        the beginning; each later page is requested with the cursor returned
+        alongside the previous one, and resumes the scan right after the last
+        approach of that page instead of re-scanning every earlier match. A
+        query whose results are cached is paged through the cached positions.
+
+        :param filters: A collection of filters capturing user-specified
+        criteria.
+        :param page_size: The maximum number of approaches in the page.
+        :param cursor: The cursor returned with the previous page, or None for
+            the first page.
+        :return: A tuple of the list of matching `CloseApproach` objects in
+            this page and the cursor of the next page, or None if this is the
+            last page.
+        :raises cursor.CursorError: If the cursor is malformed or was issued
+            for a different query.
+        :raises ValueError: If the page size isn't positive.
+        """
+        if page_size < 1:
+            raise ValueError("The page size must be positive.")
+        filters = list(filters)
+        fingerprint = filters_fingerprint(filters, len(self._approaches))
+        start = 0 if cursor is None else decode_cursor(cursor,
+                                                       fingerprint) + 1
+
+        key = filters_key(filters) if self._cache.max_entries > 0 else None
+        cached = self._cache.get(key) if key is not None else None
+        if cached is not None:
+            first = bisect.bisect_left(cached, start)
+            positions = cached[first:first + page_size + 1]
+        else:
+            positions = list(itertools.islice(self._scan(filters, start),
+                                              page_size + 1))
+
+        # One extra match was fetched to tell whether there is a next page.
+        next_cursor = None
+        if len(positions) > page_size:
+            positions = positions[:page_size]
+            next_cursor = encode_cursor(positions[-1], fingerprint)
+        approaches = self._approaches
+        return [approaches[position] for position in positions], next_cursor
+
+    def _scan(self, filters, start=0, stop=None, profile=None):
+        """Scan the approaches for the positions matching every filter.
+
+        The filters left to check after planning are fused into a single
+        predicate with `filters.compile_filters`; if they contradict each
+        other, nothing is scanned at all. When profiled, they are checked one
+        at a time instead, so that each can be counted.
+
+        :param filters: A collection of filters capturing user-specified
+        criteria.
+        :param start: The first position to scan.
+        :param stop: The position after the last one to scan, or None.
+        :param profile: An `explain.QueryProfile` of the query, or None.
+        :return: A stream of matching approach positions, in internal order.
+        """
+        positions, filters = self._plan(filters, profile)
+        predicate = compile_filters(filters)
+        if predicate is None:
+            if profile is not None:
+                profile.plan += "; the other filters contradict each other"
+            return
+        if start > 0 or stop is not None:
+            stop = len(self._approaches) if stop is None else stop
+            positions = positions[bisect.bisect_left(positions, start):
+                                  bisect.bisect_left(positions, stop)]
+        yield from self._check(positions, filters, predicate, profile)
+
+    def _check(self, positions, filters, predicate, profile=None):
+        """Check the filters left after planning on some planned positions.
+
+        :param positions: The approach positions to visit, in internal order.
+        :param filters: The filters left to check, as returned by `_plan`.
+        :param predicate: Those filters, fused by `filters.compile_filters`.
+        :param profile: An `explain.QueryProfile` of the query, or None.
+        :return: A stream of matching approach positions, in internal order.
+        """
+        approaches = self._approaches
+        if profile is not None:
+            yield from profile.scan(approaches, positions, filters)
+            return
+        for position in positions:
+            if predicate(approaches[position]):
+                yield position
+
+    def _scan_sharded(self, filters, workers, limit=None, profile=None):
+        """Scan the approaches in shards, with a pool of worker processes.
+
+        The query is planned once, in this process, and its candidate
+        positions are split into contiguous shards with as many candidates
+        each. The workers are forked from this process, so they share this
+        database and the plan without pickling them, and each fuses the
+        remaining filters into a predicate once for all its shards. Shard
+        results are consumed in order, and the pool is terminated as soon as
+        `limit` positions have been produced or the stream is closed. Where
+        processes can't be forked, the shards are scanned serially.
+
+        :param filters: A collection of filters capturing user-specified
+        criteria.
+        :param workers: The number of worker processes.
+        :param limit: The maximum number of positions to produce, or None.
+        :param profile: An `explain.QueryProfile` of the query, or None. The
+            counters of every shard are added to it.
+        :return: A stream of matching approach positions, in internal order.
+        """
+        try:
+            context = multiprocessing.get_context('fork')
+        except ValueError:
+            yield from itertools.islice(self._scan(filters, profile=profile),
+                                        limit)
+            return
+
+        positions, remaining = self._plan(filters, profile)
+        if compile_filters(remaining) is None:
+            if profile is not None:
+                profile.plan += "; the other filters contradict each other"
+            return
+        candidates = len(positions)
+        shards = min(candidates, workers * SHARDS_PER_WORKER) or 1
+        if profile is not None:
+            profile.plan += f", in {shards} shards over {workers} workers"
+        bounds = [candidates * i // shards for i in range(shards + 1)]
+        tasks = [(start, stop, limit)
+                 for start, stop in zip(bounds, bounds[1:])]
+
+        pool = context.Pool(workers, _share_scan,
+                            (self, positions, filters, remaining,
+                             profile is not None))
+        try:
+            produced = 0
+            for matches, shard_profile in pool.imap(_scan_shard, tasks):
+                if shard_profile is not None:
+                    profile.merge(shard_profile)
+                for position in matches:
+                    yield position
+                    produced += 1
+                    if produced == limit:
+                        return
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def _index(self, filter_class):
+        """Return the sorted index for a filter class, building it if needed.
+
+        Approaches whose key is NaN (such as those of NEOs with an unknown
+        diameter) are left out, as no comparison can match them.
+
+        :param filter_class: A class from `INDEXED_FILTERS`.
+        :return: The `SortedIndex` of that filter's attribute.
+        """
+        if filter_class not in self._indexes:
+            get_key, _, typecode = INDEXED_FILTERS[filter_class]
+            keys = ((get_key(approach), position)
+                    for position, approach in enumerate(self._approaches))
+            self._indexes[filter_class] = SortedIndex(
+                ((key, position) for key, position in keys if key == key),
+                typecode)
+        return self._indexes[filter_class]
+
+    def _estimate(self, filter_class, group):
+        """Estimate the number of approaches a group of criteria accepts.
+
+        The count is exact if the group's index has already been built, and
+        is otherwise extrapolated from the approaches at evenly spaced
+        positions, at most `PLAN_SAMPLE_SIZE` of them.
+
+        :param filter_class: A class from `INDEXED_FILTERS`.
+        :param group: The range criteria of the query of that class.
+        :return: The (estimated) number of accepted approaches.
+        """
+        size = len(self._approaches)
+        if filter_class in self._indexes:
+            lower, upper, include_lower, include_upper = criteria_range(
+                group, key=INDEXED_FILTERS[filter_class][1])
+            start, stop = self._indexes[filter_class].span(
+                lower, upper, include_lower, include_upper)
+            return stop - start
+        sample = self._approaches[::max(1, size // PLAN_SAMPLE_SIZE)]
+        if not sample:
+            return 0
+        accepted = sum(1 for approach in sample
+                       if all(criterion(approach) for criterion in group))
+        return accepted * size // len(sample)
+
+    def _neo_positions(self):
+        """Return the approach positions of each NEO, building them if needed.
+
+        :return: A dictionary mapping an NEO's designation to an `array` of
+            the positions of its approaches, in internal order.
+        """
+        if self._positions_by_neo is None:
+            positions_by_neo = {}
+            for position, approach in enumerate(self._approaches):
+                positions = positions_by_neo.get(approach.designation)
+                if positions is None:
+                    positions = positions_by_neo[approach.designation] = (
+                        array.array('l'))
+                positions.append(position)
+            self._positions_by_neo = positions_by_neo
+        return self._positions_by_neo
+
+    def _plan(self, filters, profile=None):
+        """Choose which approaches a query visits, and what it checks on them.
+
+        Criteria on indexed attributes are grouped by filter class, and the
+        number of approaches each group accepts is estimated with `_estimate`,
+        without building any index. The group accepting the fewest drives the
+        scan: it's intersected into a range of its index, and every other
+        filter is checked on the candidates in that range.
+
+        Criteria on NEO attributes are also checked on every NEO, and the
+        approaches of the qualifying NEOs, merged back into internal order,
+        are candidates too. They drive the scan when there are fewer of them
+        than the best group's estimate, and at most `NEO_PLAN_MAX_SHARE` of
+        all approaches.
+
+        Only the index of the driving group is ever built, and only once its
+        filter class has driven `INDEX_AFTER_QUERIES` queries: sorting every
+        approach costs several linear scans, so a one-off query (such as one
+        from the command line) scans linearly instead.
+
+        With the columnar engine, the plan is the mask it computes instead.
+
+        :param filters: A collection of filters capturing user-specified
+        criteria.
+        :param profile: An `explain.QueryProfile` recording the plan, or None.
+        :return: A tuple of the approach positions to visit, in internal
+        order, and the filters that still need to be checked on them.
+        """
+        size = len(self._approaches)
+        if self._columns is not None:
+            positions, remaining = self._columns.plan(filters)
+            if profile is not None:
+                profile.set_plan(
+                    f"columnar mask selecting {len(positions)} of {size} "
+                    f"approaches",
+                    [criterion for criterion in filters
+                     if all(criterion is not other for other in remaining)])
+            return positions, remaining
+
+        groups = {}
+        for criterion in filters:
+            if (type(criterion) in INDEXED_FILTERS
+                    and is_range_criterion(criterion)):
+                groups.setdefault(type(criterion), []).append(criterion)
+
+        estimates = [(self._estimate(filter_class, group), filter_class,
+                      group) for filter_class, group in groups.items()]
+        best = min(estimates, key=operator.itemgetter(0), default=None)
+
+        neo_criteria = [criterion for criterion in filters
+                        if type(criterion) in NEO_FILTERS]
+        if neo_criteria:
+            positions_by_neo = self._neo_positions()
+            neos = self._neos
+            for criterion in neo_criteria:
+                get, op, value = (NEO_FILTERS[type(criterion)],
+                                  criterion.op, criterion.value)
+                neos = [neo for neo in neos if op(get(neo), value)]
+            runs = [positions_by_neo[neo.designation] for neo in neos
+                    if neo.designation in positions_by_neo]
+            candidates = sum(len(run) for run in runs)
+            if (candidates <= size * NEO_PLAN_MAX_SHARE
+                    and (best is None or candidates < best[0])):
+                remaining = [criterion for criterion in filters
+                             if all(criterion is not other
+                                    for other in neo_criteria)]
+                if profile is not None:
+                    profile.set_plan(f"NEO filters selecting {len(runs)} NEOs "
+                                     f"with {candidates} of {size} "
+                                     f"approaches", neo_criteria)
+                # Each run is already in internal order, which Timsort
+                # detects and merges: sorting their concatenation outruns
+                # `heapq.merge` by far.
+                return sorted(itertools.chain.from_iterable(runs)), remaining
+
+        deferred = None
+        if best is not None and best[1] not in self._indexes:
+            demand = self._index_demand.get(best[1], 0) + 1
+            self._index_demand[best[1]] = demand
+            if demand < INDEX_AFTER_QUERIES:
+                # Fall back on the best index that's already built, if any.
+                deferred = best[1]
+                best = min((estimate for estimate in estimates
+                            if estimate[1] in self._indexes),
+                           key=operator.itemgetter(0), default=None)
+
+        if best is None:
+            if profile is not None:
+                plan = f"full scan of {size} approaches"
+                if deferred is not None:
+                    plan += (f" (indexing {deferred.__name__} if it's "
+                             f"queried again)")
+                profile.set_plan(plan)
+            return range(size), list(filters)
+
+        _, filter_class, group = best
+        index = self._index(filter_class)
+        lower, upper, include_lower, include_upper = criteria_range(
+            group, key=INDEXED_FILTERS[filter_class][1])
+        start, stop = index.span(lower, upper, include_lower, include_upper)
+        remaining = [criterion for criterion in filters
+                     if all(criterion is not other for other in group)]
+        if profile is not None:
+            profile.set_plan(f"sorted index on {type(group[0]).__name__} "
+                             f"selecting {stop - start} of {size} approaches",
+                             group)
+        return index.positions_between(start, stop), remaining
+
+
+def _days(moment):
+    """Return a date or datetime as a fractional number of days.
+
+    :param moment: A `datetime.date` or `datetime.datetime`.
+    :return: The proleptic Gregorian ordinal of its day, plus the fraction of
+        the day elapsed at that time.
+    """
+    return (moment.toordinal()
+            + (getattr(moment, 'hour', 0) * 60 + getattr(moment, 'minute', 0))
+            / 1440)
+
+
+def _share_scan(database, positions, filters, remaining, profiled):
+    """Remember the planned scan a forked worker process scans shards of.
+
+    :param database: The `NEODatabase` being queried.
+    :param positions: The candidate positions of its plan.
+    :param filters: The filters of the query.
+    :param remaining: The filters left to check on the candidates.
+    :param profiled: Whether to profile the scan of each shard.
+    """
+    global _shared_scan
+    _shared_scan = (database, positions, filters, remaining,
+                    compile_filters(remaining), profiled)
+
+
+def _scan_shard(task):
+    """Scan one shard of the shared planned scan, in a worker process.
+
+    :param task: A tuple of the first and past-the-last offsets of the shard
+        into the candidate positions, and the maximum number of matches to
+        return.
+    :return: A tuple of a list of the matching positions in the shard and the
+        shard's `QueryProfile` (or None).
+    """
+    start, stop, limit = task
+    database, positions, filters, remaining, predicate, profiled = (
+        _shared_scan)
+    profile = QueryProfile(filters) if profiled else None
+    matches = list(itertools.islice(
+        database._check(positions[start:stop], remaining, predicate,
+                        profile), limit))
+    return matches, profile
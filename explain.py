@@ -0,0 +1,196 @@
+"""
+Profile a query, to explain what `NEODatabase.query` did and where time went.
+
+A `QueryProfile` is passed to `NEODatabase.query` to record how the query was
+planned (which filters an index, the NEOs or the cache answered) and, for the
+filters checked approach by approach, how often each was evaluated and how
+often it rejected an approach. Those filters are checked one at a time rather
+than through the fused predicate of `filters.compile_filters`, so that each
+can be counted.
+
+The profile also times the stages of the pipeline that consumes the query -
+such as the scan itself, `filters.limit` and a writer - by wrapping each
+stage's stream with `timed` (or its blocking call with `time`). Since every
+stage pulls from the previous one, the time reported for a stage excludes the
+time spent in the stages before it.
+
+A profile is rendered as text with `str`, or as a JSON-compatible dictionary
+with `serialize`.
+"""
+import contextlib
+import time
+
+from filters import OPERATOR_SYMBOLS
+
+
+def describe(criterion):
+    """Return a short, human-readable description of a filter.
+
+    :param criterion: A filter, such as one returned by `create_filters`.
+    :return: A string such as 'DistanceFilter <= 0.1'.
+    """
+    op = getattr(criterion, 'op', None)
+    if op in OPERATOR_SYMBOLS:
+        return (f'{type(criterion).__name__} {OPERATOR_SYMBOLS[op]} '
+                f'{criterion.value}')
+    return repr(criterion)
+
+
+class QueryProfile:
+    """Counters and timings of one query, for `--explain`."""
+
+    def __init__(self, filters):
+        """Create a new, empty `QueryProfile`.
+
+        :param filters: The collection of filters of the profiled query.
+        """
+        self.filters = list(filters)
+        self.plan = None
+        self.planned = []
+        self.rows_scanned = 0
+        self.evaluations = [0] * len(self.filters)
+        self.rejections = [0] * len(self.filters)
+        # Each stage is a list of its name, its inclusive time in seconds,
+        # and the number of rows it produced (None for a blocking call).
+        self._stages = []
+
+    def _offset(self, criterion):
+        """Return the offset of a filter among the query's filters."""
+        for i, other in enumerate(self.filters):
+            if other is criterion:
+                return i
+        raise ValueError(f"{criterion!r} isn't a filter of this query.")
+
+    def set_plan(self, plan, planned=()):
+        """Record how the query chose the approaches it visits.
+
+        :param plan: A description of the plan.
+        :param planned: The filters answered by the plan itself, which aren't
+            checked approach by approach.
+        """
+        self.plan = plan
+        self.planned = [self._offset(criterion) for criterion in planned]
+
+    def scan(self, approaches, positions, filters):
+        """Check filters one at a time on some approaches, counting them.
+
+        :param approaches: The approaches of the database, in internal order.
+        :param positions: The positions of the approaches to check.
+        :param filters: The filters to check, all among the query's filters.
+        :return: A stream of the positions of the approaches passing every
+            filter.
+        """
+        checks = [(criterion, self._offset(criterion))
+                  for criterion in filters]
+        evaluations, rejections = self.evaluations, self.rejections
+        for position in positions:
+            self.rows_scanned += 1
+            approach = approaches[position]
+            for criterion, i in checks:
+                evaluations[i] += 1
+                if not criterion(approach):
+                    rejections[i] += 1
+                    break
+            else:
+                yield position
+
+    def merge(self, other):
+        """Add the scan counters of another profile of the same filters.
+
+        :param other: A `QueryProfile`, such as one from a worker process.
+        """
+        self.rows_scanned += other.rows_scanned
+        for i in range(len(self.filters)):
+            self.evaluations[i] += other.evaluations[i]
+            self.rejections[i] += other.rejections[i]
+
+    def timed(self, name, iterable):
+        """Wrap the stream of a stage, timing it and counting its rows.
+
+        :param name: The name of the stage.
+        :param iterable: The stream the stage produces.
+        :return: The same stream.
+        """
+        stage = [name, 0.0, 0]
+        self._stages.append(stage)
+        return self._timed(stage, iter(iterable))
+
+    @staticmethod
+    def _timed(stage, iterator):
+        """Generate the items of an iterator, timing each step."""
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                stage[1] += time.perf_counter() - start
+                return
+            stage[1] += time.perf_counter() - start
+            stage[2] += 1
+            yield item
+
+    @contextlib.contextmanager
+    def time(self, name):
+        """Time a blocking stage, such as a writer consuming the stream.
+
+        :param name: The name of the stage.
+        """
+        stage = [name, 0.0, None]
+        self._stages.append(stage)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage[1] += time.perf_counter() - start
+
+    @property
+    def rows_emitted(self):
+        """Return the number of rows produced by the last timed stream."""
+        counts = [rows for _, _, rows in self._stages if rows is not None]
+        return counts[-1] if counts else 0
+
+    def stages(self):
+        """Return the time spent in each stage, excluding earlier stages.
+
+        :return: A list of (name, seconds) tuples, in pipeline order.
+        """
+        result = []
+        previous = 0.0
+        for name, inclusive, _ in self._stages:
+            result.append((name, max(inclusive - previous, 0.0)))
+            previous = inclusive
+        return result
+
+    def serialize(self):
+        """Return a JSON-compatible dictionary of the profile."""
+        return {
+            'filters': [
+                {'filter': describe(criterion),
+                 'planned': i in self.planned,
+                 'evaluations': self.evaluations[i],
+                 'rejections': self.rejections[i]}
+                for i, criterion in enumerate(self.filters)],
+            'plan': self.plan,
+            'rows_scanned': self.rows_scanned,
+            'rows_emitted': self.rows_emitted,
+            'stages': {name: seconds for name, seconds in self.stages()},
+        }
+
+    def __str__(self):
+        """Return `str(self)`, a human-readable report of the profile."""
+        lines = ['Query plan:', f'  {self.plan}', 'Filters:']
+        if not self.filters:
+            lines.append('  (none)')
+        for i, criterion in enumerate(self.filters):
+            if i in self.planned:
+                counts = 'answered by the plan'
+            else:
+                counts = (f'evaluated {self.evaluations[i]}, '
+                          f'rejected {self.rejections[i]}')
+            lines.append(f'  {describe(criterion)}: {counts}')
+        lines.append(f'Rows scanned: {self.rows_scanned}')
+        lines.append(f'Rows emitted: {self.rows_emitted}')
+        lines.append('Stages:')
+        for name, seconds in self.stages():
+            lines.append(f'  {name}: {seconds * 1000:.3f} ms')
+        return '\n'.join(lines)
@@ -6,53 +6,359 @@ described in the project instructions, into a collection of `NearEarthObject`s.
 
 The `load_approaches` function extracts close approach data from a JSON file,
 formatted as described in the project instructions, into a collection of
-`CloseApproach` objects.
+`CloseApproach` objects. It's built on `iter_approaches`, which streams the
+`data` array record by record instead of decoding the whole document at once.
+
+Every loader transparently decompresses files compressed with gzip, bzip2 or
+xz, which are recognized by their leading bytes.
+
+The `load_columnar` function reads the columns of close approaches saved by
+`write.write_to_columnar` back as arrays, without parsing any text, through
+the `neocol` module shared by both.
 
 The main module calls these functions with the arguments provided at the
 command line, and uses the resulting collections to build an `NEODatabase`.
 
 You'll edit this file in Task 2.
 """
+import codecs
+import concurrent.futures
 import csv
+import itertools
 import json
+import operator
+import os
+import re
 
+import compression
+from helpers import cd_to_datetime
 from models import NearEarthObject, CloseApproach
+from neocol import read_columns
+
 
+# Smallest NEO file, in bytes, that is worth parsing with a process pool.
+PARALLEL_MIN_SIZE = 8 << 20
 
-def load_neos(neo_csv_path="./data/neos.csv"):
+# Number of byte ranges handed to each worker, to even out their load.
+_CHUNKS_PER_WORKER = 4
+
+
+def load_neos(neo_csv_path="./data/neos.csv", workers=None):
     """Read near-Earth object information from a CSV file.
 
+    Large files are split into byte ranges aligned on line boundaries, which
+    are parsed in parallel by a pool of `workers` processes and merged back in
+    file order. Files smaller than `PARALLEL_MIN_SIZE` bytes (or a single
+    worker) are parsed serially, where a pool would only add overhead. The
+    split assumes that no record spans several lines, which holds for SBDB
+    exports.
+
     :param neo_csv_path: A path to a CSV file containing data about near-Earth
     objects.
+    :param workers: The number of worker processes, or None to use one per
+    CPU.
     :return: A collection of `NearEarthObject`s.
 
     Following paraments are stored in files:
         id,spkid,full_name,pdes,name,prefix,neo,pha,H,G,M1,M2,K1,K2,PC,diameter
     Function loads only following: pdes, name,pha, diameter
+
+    A compressed file can't be split into byte ranges, so it's always parsed
+    serially, as it's decompressed.
     """
-    loaded_neos = list()
-    nm_lines = 0
-    with open(neo_csv_path) as csv_file:
+    codec = compression.sniff_codec(neo_csv_path)
+    if codec is not None:
+        return _load_compressed_neos(neo_csv_path, codec)
+
+    with open(neo_csv_path, 'rb') as csv_file:
+        header = next(csv.reader([csv_file.readline().decode('utf-8')]), [])
+        data_start = csv_file.tell()
+        size = csv_file.seek(0, 2)
+    columns = _neo_columns(header)
+    if columns is None:
+        return None
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or size < PARALLEL_MIN_SIZE:
+        return [NearEarthObject(*row) for row in
+                _neo_rows(neo_csv_path, data_start, size, columns)]
+
+    bounds = _line_aligned_bounds(neo_csv_path, data_start, size,
+                                  workers * _CHUNKS_PER_WORKER)
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        chunks = executor.map(_parse_neo_range,
+                              itertools.repeat(neo_csv_path),
+                              bounds[:-1], bounds[1:],
+                              itertools.repeat(columns))
+        return [NearEarthObject(*row) for row in
+                itertools.chain.from_iterable(chunks)]
+
+
+def _neo_columns(header):
+    """Find the `pdes`, `name`, `diameter` and `pha` columns of a CSV header.
+
+    :return: A tuple of the column indices, or None if one is missing.
+    """
+    try:
+        return (header.index('pdes'), header.index('name'),
+                header.index('diameter'), header.index('pha'))
+    except ValueError as error:
+        print(f'Error: No valid indexes found: {error}')
+        return None
+
+
+def _load_compressed_neos(neo_csv_path, codec):
+    """Parse the NEOs of a compressed CSV file, as it's decompressed.
+
+    :param codec: The file's codec, from `compression.sniff_codec`.
+    :return: A collection of `NearEarthObject`s.
+    """
+    with compression.open_codec(codec, neo_csv_path, 'rt', encoding='utf-8',
+                                newline='') as csv_file:
         reader = csv.reader(csv_file)
-        for line in reader:
-            if nm_lines == 0:
-                try:
-                    pdes_i = line.index('pdes')
-                    name_i = line.index('name')
-                    pha_i = line.index('pha')
-                    diameter_i = line.index('diameter')
-                except ValueError as error:
-                    print(f'Error: No valid indexes found: {error}')
-                    return None
+        columns = _neo_columns(next(reader, []))
+        if columns is None:
+            return None
+        project = operator.itemgetter(*columns)
+        return [NearEarthObject(*project(line)) for line in reader]
+
+
+def _line_aligned_bounds(neo_csv_path, start, end, n):
+    """Split a byte range of a file into (at most) `n` line-aligned ranges.
+
+    :return: A sorted list of offsets; consecutive pairs delimit the ranges.
+    """
+    bounds = [start]
+    with open(neo_csv_path, 'rb') as csv_file:
+        for i in range(1, n):
+            csv_file.seek(start + (end - start) * i // n)
+            csv_file.readline()
+            offset = min(csv_file.tell(), end)
+            if offset > bounds[-1]:
+                bounds.append(offset)
+    if bounds[-1] < end:
+        bounds.append(end)
+    return bounds
+
+
+def _parse_neo_range(neo_csv_path, start, end, columns):
+    """Parse the NEO rows in a line-aligned byte range of a CSV file.
+
+    This runs in the worker processes, so it returns plain tuples of the
+    `pdes`, `name`, `diameter` and `pha` columns, which are much cheaper to
+    send back to the parent process than `NearEarthObject`s.
+
+    :return: A list of (pdes, name, diameter, pha) tuples, in file order.
+    """
+    return list(_neo_rows(neo_csv_path, start, end, columns))
+
+
+def _neo_rows(neo_csv_path, start, end, columns):
+    """Stream the NEO rows in a line-aligned byte range of a CSV file.
+
+    The lines are read one at a time, up to the end of the range, and each is
+    decoded as is: like a file opened with `newline=''`, as `csv` requires,
+    line endings are left for the reader to handle.
+
+    :return: A generator of (pdes, name, diameter, pha) tuples, in file order.
+    """
+    project = operator.itemgetter(*columns)
+    with open(neo_csv_path, 'rb') as csv_file:
+        csv_file.seek(start)
+        lines = codecs.iterdecode(_lines_until(csv_file, end), 'utf-8')
+        for line in csv.reader(lines):
+            yield project(line)
+
+
+def _lines_until(binary_file, end):
+    """Yield the lines of a binary file, from its position up to an offset."""
+    position = binary_file.tell()
+    for line in binary_file:
+        if position >= end:
+            return
+        position += len(line)
+        yield line
+
+
+# Number of characters (or bytes) read from the JSON file at a time.
+_CHUNK_SIZE = 1 << 16
+
+# Matches the key of the `fields` header, which SBDB writes after `data`.
+_FIELDS_KEY = re.compile(rb'"fields"\s*:\s*')
+
+# Matches (possibly empty) insignificant whitespace between JSON tokens.
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class _JSONStream:
+    """Incrementally decode the tokens and values of a JSON text file.
+
+    Only a window of the file is held in memory: values are decoded from the
+    buffer with `json.JSONDecoder.raw_decode`, and the buffer is refilled
+    whenever a value runs past its end.
+    """
+
+    def __init__(self, text_file):
+        """Create a new `_JSONStream` reading from an open text file."""
+        self._file = text_file
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """Drop the consumed part of the buffer and read another chunk."""
+        chunk = self._file.read(_CHUNK_SIZE)
+        if not chunk:
+            self._eof = True
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+
+    def peek(self):
+        """Skip whitespace and return the next character ('' at the end)."""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer) or self._eof:
+                return self._buffer[self._pos:self._pos + 1]
+            self._fill()
+
+    def expect(self, characters):
+        """Consume and return the next character, one of `characters`."""
+        char = self.peek()
+        if not char or char not in characters:
+            raise json.JSONDecodeError(f'Expecting one of {characters!r}',
+                                       self._buffer, self._pos)
+        self._pos += 1
+        return char
+
+    def value(self):
+        """Decode and return the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
             else:
-                loaded_neos.append(
-                    NearEarthObject(
-                        line[pdes_i],
-                        line[name_i],
-                        line[diameter_i],
-                        line[pha_i]))
-            nm_lines += 1
-    return loaded_neos
+                # A number at the very end of the buffer may be truncated.
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            self._fill()
+
+    def array(self):
+        """Yield the values of the next JSON array one at a time."""
+        self.expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(',]') == ']':
+                return
+
+    def members(self):
+        """Yield the keys of the next JSON object one at a time.
+
+        After each key is yielded, the caller must consume its value (with
+        `value` or `array`) before resuming iteration.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.expect(',}') == '}':
+                return
+
+
+def _load_cad_fields(cad_json_path):
+    """Find and decode the `fields` header of a close approach JSON file.
+
+    The header is located with a raw byte search, so the (much larger) `data`
+    array is never decoded. SBDB writes the header at the end of the document,
+    so the tail of the file is searched first - unless the file is
+    compressed, in which case it's searched from the start, since seeking to
+    its end would decompress it anyway.
+
+    :param cad_json_path: A path to a JSON file of close approach data.
+    :return: The list of field names, or None if there's no header.
+    """
+    codec = compression.sniff_codec(cad_json_path)
+    with _open_input(cad_json_path, codec, 'rb') as json_file:
+        if codec is None:
+            starts = (max(0, json_file.seek(0, 2) - _CHUNK_SIZE), 0)
+        else:
+            starts = (0,)
+        for start in starts:
+            json_file.seek(start)
+            overlap = b''
+            for chunk in iter(lambda: json_file.read(_CHUNK_SIZE), b''):
+                window = overlap + chunk
+                match = _FIELDS_KEY.search(window)
+                if match:
+                    rest = window[match.end():] + json_file.read(_CHUNK_SIZE)
+                    text = rest.decode('utf-8', 'replace')
+                    return json.JSONDecoder().raw_decode(text)[0]
+                overlap = window[-64:]
+    return None
+
+
+def iter_approaches(cad_json_path="./data/cad.json"):
+    """Stream close approaches from a JSON file, one record at a time.
+
+    Only the `des`, `cd`, `dist` and `v_rel` columns of each record are kept,
+    and each record is turned into a `CloseApproach` as soon as it's decoded,
+    so the memory used stays close to that of the resulting objects. Many
+    approaches share a timestamp, so each distinct `cd` string is parsed once
+    per call, and its `datetime` is shared by those approaches.
+
+    :param cad_json_path: A path to a JSON file containing data about close
+      approaches.
+    :yield: The `CloseApproach`es in the file, in file order.
+    """
+    fields = _load_cad_fields(cad_json_path) or []
+    try:
+        project = operator.itemgetter(fields.index('des'),
+                                      fields.index('cd'),
+                                      fields.index('dist'),
+                                      fields.index('v_rel'))
+    except ValueError as error:
+        print(f'Error: No valid indexes found: {error}')
+        return
+
+    dates = {}
+    codec = compression.sniff_codec(cad_json_path)
+    with _open_input(cad_json_path, codec, 'r') as json_file:
+        stream = _JSONStream(json_file)
+        for key in stream.members():
+            if key != 'data':
+                stream.value()
+                continue
+            for record in stream.array():
+                designation, cd, distance, velocity = project(record)
+                if cd:
+                    # An empty `cd` is left to `CloseApproach` to reject.
+                    cd = cd_to_datetime(cd, dates)
+                yield CloseApproach(designation, cd, distance, velocity)
+
+
+def _open_input(path, codec, mode, **kwargs):
+    """Open an input file, through its codec if it's compressed.
+
+    :param path: A path to the input file.
+    :param codec: The file's codec, from `compression.sniff_codec`, or None.
+    :param mode: A mode for `open`, such as 'r' or 'rb'.
+    :return: A file object.
+    """
+    if codec is None:
+        return open(path, mode, **kwargs)
+    return compression.open_codec(codec, path, mode, **kwargs)
 
 
 def load_approaches(cad_json_path="./data/cad.json"):
@@ -84,28 +390,19 @@ def load_approaches(cad_json_path="./data/cad.json"):
     Function loads only following :
         des,cd,dist,v_rel
     """
-    loaded_approaches = list()
+    return list(iter_approaches(cad_json_path))
 
-    with open(cad_json_path) as json_file:
-        data = json.load(json_file)
 
-    fields = data['fields']
-    try:
-        des_index = fields.index('des')
-        cd_index = fields.index('cd')
-        dist_index = fields.index('dist')
-        v_rel_index = fields.index('v_rel')
-    except ValueError as error:
-        print(f'Error: No valid indexes found: {error}')
-        return None
-    else:
-        list_approaches = data['data']
-        for record in list_approaches:
-            loaded_approaches.append(
-                                CloseApproach(
-                                    record[des_index],
-                                    record[cd_index],
-                                    record[dist_index],
-                                    record[v_rel_index]))
-
-    return loaded_approaches
+def load_columnar(columnar_path):
+    """Read close approach columns from a file saved by `write_to_columnar`.
+
+    :param columnar_path: A path to a binary columnar file.
+    :return: A tuple of a dictionary mapping each column name to an
+      `array.array` of its values, and a dictionary mapping the name of each
+      `string` column to the list of its values, indexed by the codes in the
+      column (a code of -1 stands for a missing value).
+    :raises ValueError: If the file isn't a valid columnar file.
+    """
+    codec = compression.sniff_codec(columnar_path)
+    with _open_input(columnar_path, codec, 'rb') as columnar_fl:
+        return read_columns(columnar_fl, columnar_path)
@@ -12,14 +12,28 @@ from a comparator (from the `operator` module), a reference value, and a class
 method `get` that subclasses can override to fetch an attribute of interest
 from the supplied `CloseApproach`.
 
+The `compile_filters` function fuses a collection of filters into a single
+generated predicate function, which reads the attributes of interest directly
+and checks each attribute's bounds in one chained comparison.
+
 The `limit` function simply limits the maximum number of values produced by an
-iterator.
+iterator, and the `sort` function orders a stream of close approaches by one of
+the attributes in `SORT_KEYS`, keeping only the top values when limited.
 
 You'll edit this file in Tasks 3a and 3c.
 """
+import heapq
 import operator
 import itertools
 
+from index import criteria_range, is_range_criterion
+
+
+# Comparators with an infix operator, mapped to its symbol - as inlined by
+# `compile_filters` and shown by `explain.describe`.
+OPERATOR_SYMBOLS = {operator.eq: '==', operator.ne: '!=', operator.lt: '<',
+                    operator.le: '<=', operator.gt: '>', operator.ge: '>='}
+
 
 class UnsupportedCriterionError(NotImplementedError):
     """A filter criterion is unsupported."""
@@ -39,8 +53,16 @@ class AttributeFilter:
 
     Concrete subclasses can override the `get` classmethod to provide custom
     behavior to fetch a desired attribute from the given `CloseApproach`.
+
+    Subclasses may also define an `expression` - Python source that reads the
+    same attribute as `get` from a variable named `approach`, bypassing the
+    public properties - which `compile_filters` inlines into its predicate.
+    The `expression` only applies to the class that defines it, so a subclass
+    that overrides `get` is always evaluated through `get`.
     """
 
+    expression = None
+
     def __init__(self, op, value):
         """
         Construct a new `AttributeFilter.
@@ -83,6 +105,8 @@ class AttributeFilter:
 class DistanceFilter(AttributeFilter):
     """Distance Filter implements get method to return distance for filter."""
 
+    expression = 'approach._distance'
+
     @classmethod
     def get(cls, approach):
         """Return distance."""
@@ -92,6 +116,8 @@ class DistanceFilter(AttributeFilter):
 class DateFilter(AttributeFilter):
     """Date Filter implements get method to return time.date() for filter."""
 
+    expression = 'approach._time.date()'
+
     @classmethod
     def get(cls, approach):
         """Return time of approach."""
@@ -101,6 +127,8 @@ class DateFilter(AttributeFilter):
 class VelocityFilter(AttributeFilter):
     """VelocityFilter implements get method to return velocity."""
 
+    expression = 'approach._velocity'
+
     @classmethod
     def get(cls, approach):
         """Return velocity."""
@@ -110,6 +138,8 @@ class VelocityFilter(AttributeFilter):
 class DiameterFilter(AttributeFilter):
     """Diameter Filter implements get method to return diameter."""
 
+    expression = 'approach._neo._diameter'
+
     @classmethod
     def get(cls, approach):
         """Return diameter."""
@@ -119,6 +149,8 @@ class DiameterFilter(AttributeFilter):
 class HazardousFilter(AttributeFilter):
     """Hazardous Filter implements get method to return hazardous."""
 
+    expression = 'approach._neo._hazardous'
+
     @classmethod
     def get(cls, approach):
         """Return hazardous."""
@@ -199,6 +231,67 @@ def create_filters(date=None, start_date=None, end_date=None,
     return (filters)
 
 
+def compile_filters(filters):
+    """Fuse a collection of filters into a single predicate function.
+
+    Filters whose class defines an `expression` are grouped by expression,
+    and the comparisons in each group are intersected into a single range
+    that is checked with one chained comparison (`lo <= x <= hi`), or with an
+    equality test when the range is a single value. Any other filter is
+    called as usual. The generated predicate short-circuits on the first
+    failing check.
+
+    :param filters: A collection of filters capturing user-specified criteria.
+    :return: A 1-argument predicate on a `CloseApproach`, or None if the
+        filters contradict each other, so that no approach can match.
+    """
+    namespace = {}
+    checks = []
+    groups = {}
+
+    def bind(value):
+        name = f'_v{len(namespace)}'
+        namespace[name] = value
+        return name
+
+    for criterion in filters:
+        expression = type(criterion).__dict__.get('expression')
+        if expression is not None and is_range_criterion(criterion):
+            if expression not in groups:
+                groups[expression] = []
+                checks.append(expression)
+            groups[expression].append(criterion)
+        elif expression is not None and criterion.op in OPERATOR_SYMBOLS:
+            checks.append(f'{expression} {OPERATOR_SYMBOLS[criterion.op]} '
+                          f'{bind(criterion.value)}')
+        else:
+            checks.append(f'{bind(criterion)}(approach)')
+
+    for i, check in enumerate(checks):
+        if check not in groups:
+            continue
+        lower, upper, include_lower, include_upper = criteria_range(
+            groups[check])
+        if lower is not None and upper is not None:
+            if lower > upper or (lower == upper and not (include_lower
+                                                         and include_upper)):
+                return None
+            if lower == upper:
+                checks[i] = f'{check} == {bind(lower)}'
+                continue
+        parts = [check]
+        if lower is not None:
+            parts.insert(0, f"{bind(lower)} {'<=' if include_lower else '<'}")
+        if upper is not None:
+            parts.append(f"{'<=' if include_upper else '<'} {bind(upper)}")
+        checks[i] = ' '.join(parts)
+
+    source = ('def predicate(approach):\n'
+              f"    return {' and '.join(checks) or 'True'}\n")
+    exec(source, namespace)
+    return namespace['predicate']
+
+
 def limit(iterator, n=None):
     """Produce a limited stream of values from an iterator.
 
@@ -211,3 +304,41 @@ def limit(iterator, n=None):
     if n == 0:
         n = None
     return itertools.islice(iterator, n)
+
+
+# Attributes that a stream of close approaches can be sorted by.
+SORT_KEYS = {
+    'time': lambda approach: approach.time,
+    'distance': lambda approach: approach.distance,
+    'velocity': lambda approach: approach.velocity,
+    'diameter': lambda approach: approach.neo.diameter,
+}
+
+
+def sort(iterator, by, n=None, reverse=False):
+    """Produce a stream of close approaches ordered by an attribute.
+
+    If `n` is 0 or None, the whole stream is sorted. Otherwise only the first
+    `n` values in that order are kept, with a bounded heap, so the memory used
+    stays proportional to `n` rather than to the length of the stream.
+
+    Either way, equal values keep their original relative order, and unknown
+    values (NaN diameters) are placed last.
+
+    :param iterator: An iterator of `CloseApproach` objects.
+    :param by: The attribute to order by - a key of `SORT_KEYS`.
+    :param n: The maximum number of values to produce.
+    :param reverse: Whether to order from the largest value to the smallest.
+    :return: A list of (at most) `n` values, in the requested order.
+    """
+    get = SORT_KEYS[by]
+
+    def key(approach):
+        value = get(approach)
+        return (value != value) != reverse, value
+
+    if not n:
+        return sorted(iterator, key=key, reverse=reverse)
+    if reverse:
+        return heapq.nlargest(n, iterator, key=key)
+    return heapq.nsmallest(n, iterator, key=key)
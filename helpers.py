@@ -3,7 +3,9 @@
 NASA's dataset provides timestamps as naive datetimes (corresponding to UTC).
 
 The `cd_to_datetime` function converts a string, formatted as the `cd` field of
-NASA's close approach data, into a Python `datetime`
+NASA's close approach data, into a Python `datetime`. It slices the fixed-width
+format directly and only falls back to `datetime.strptime` for anything that
+doesn't look canonical, so it accepts and rejects exactly what `strptime` does.
 
 The `datetime_to_str` function converts a Python `datetime` into a string.
 Although `datetime`s already have human-readable string representations, those
@@ -13,7 +15,17 @@ provide that level of resolution, so the output format also will not.
 import datetime
 
 
-def cd_to_datetime(calendar_date):
+# The format of the `cd` field, as understood by `datetime.strptime`.
+CD_FORMAT = "%Y-%b-%d %H:%M"
+
+# English month abbreviations, as used by the `cd` field.
+_MONTHS = {'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+           'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12}
+
+_DIGITS = frozenset('0123456789')
+
+
+def cd_to_datetime(calendar_date, cache=None):
     """Convert a NASA-formatted calendar date/time description into a datetime.
 
     NASA's format, at least in the `cd` field of close approach data, uses the
@@ -24,11 +36,34 @@ def cd_to_datetime(calendar_date):
     This will become the Python object
         `datetime.datetime(2020, 12, 31, 12, 0)`.
 
+    Many approaches share a timestamp, so a `cache` dictionary can be supplied
+    to parse each distinct string once and share the resulting (immutable)
+    `datetime` between them.
+
     :param calendar_date: A calendar date in YYYY-bb-DD hh:mm format.
+    :param cache: An optional dictionary of already parsed calendar dates.
     :return: A naive `datetime` corresponding to the given calendar date and
     time.
     """
-    return datetime.datetime.strptime(calendar_date, "%Y-%b-%d %H:%M")
+    if cache is not None:
+        try:
+            return cache[calendar_date]
+        except KeyError:
+            result = cache[calendar_date] = cd_to_datetime(calendar_date)
+            return result
+
+    cd = calendar_date
+    if (len(cd) == 17 and cd[4] == '-' and cd[8] == '-' and cd[11] == ' '
+            and cd[14] == ':' and cd[5:8] in _MONTHS
+            and _DIGITS.issuperset(cd[:4] + cd[9:11] + cd[12:14] + cd[15:])):
+        try:
+            return datetime.datetime(int(cd[:4]), _MONTHS[cd[5:8]],
+                                     int(cd[9:11]), int(cd[12:14]),
+                                     int(cd[15:]))
+        except ValueError:
+            # Out-of-range fields - let `strptime` raise its usual error.
+            pass
+    return datetime.datetime.strptime(calendar_date, CD_FORMAT)
 
 
 def datetime_to_str(dt):
@@ -40,7 +75,14 @@ def datetime_to_str(dt):
     date in the usual ISO 8601 YYYY-MM-DD format to avoid ambiguities with
     locale-specific month names.
 
+    Exports format one datetime per row, so the string comes from the
+    datetime's `isoformat`, which is several times faster than `strftime`.
+    Years before 1000 are still left to `strftime`, whose padding of short
+    years depends on the platform (`isoformat` always pads them to 4 digits).
+
     :param dt: A naive Python datetime.
     :return: That datetime, as a human-readable string without seconds.
     """
-    return datetime.datetime.strftime(dt, "%Y-%m-%d %H:%M")
+    if dt.year < 1000:
+        return datetime.datetime.strftime(dt, "%Y-%m-%d %H:%M")
+    return dt.isoformat(' ', 'minutes')
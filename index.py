@@ -0,0 +1,129 @@
+"""
+Sorted secondary indexes over the close approaches of an `NEODatabase`.
+
+A `SortedIndex` holds a numeric key for some of the approaches of a database,
+sorted together with the position of each approach in the database's internal
+order. A range of keys then maps, with two bisections, to a slice of positions
+- so a query constrained on an indexed attribute only visits the approaches in
+that range instead of scanning every approach.
+
+The `criteria_range` function intersects a collection of comparison filters
+on a single attribute into the bounds of one such range.
+"""
+import array
+import bisect
+import operator
+
+
+# Comparators that bound a range from below or from above, mapped to whether
+# the bound itself is included.
+_LOWER_BOUNDS = {operator.ge: True, operator.gt: False}
+_UPPER_BOUNDS = {operator.le: True, operator.lt: False}
+
+
+class SortedIndex:
+    """A sorted index from numeric keys to approach positions.
+
+    Approaches without a meaningful key (such as an unknown diameter) can be
+    left out of the index entirely - no range of keys ever includes them.
+    """
+
+    def __init__(self, entries, typecode='d'):
+        """Create a new `SortedIndex`.
+
+        :param entries: An iterable of (key, position) pairs.
+        :param typecode: The `array` typecode used to store the keys.
+        """
+        entries = sorted(entries)
+        self.keys = array.array(typecode, (key for key, _ in entries))
+        self.positions = array.array('l', (pos for _, pos in entries))
+        # Whether key order matches internal order, as it usually does for
+        # approach times - positions can then be sliced without re-sorting.
+        self.in_order = all(a < b for a, b in zip(self.positions,
+                                                  self.positions[1:]))
+
+    def __len__(self):
+        """Return the number of indexed approaches."""
+        return len(self.keys)
+
+    def span(self, lower=None, upper=None,
+             include_lower=True, include_upper=True):
+        """Find the slice of the index whose keys fall within a range.
+
+        :param lower: The lower bound of the range, or None if unbounded.
+        :param upper: The upper bound of the range, or None if unbounded.
+        :param include_lower: Whether a key equal to `lower` is in range.
+        :param include_upper: Whether a key equal to `upper` is in range.
+        :return: A (start, stop) pair of offsets into the index.
+        """
+        if lower is None:
+            start = 0
+        elif include_lower:
+            start = bisect.bisect_left(self.keys, lower)
+        else:
+            start = bisect.bisect_right(self.keys, lower)
+
+        if upper is None:
+            stop = len(self.keys)
+        elif include_upper:
+            stop = bisect.bisect_right(self.keys, upper)
+        else:
+            stop = bisect.bisect_left(self.keys, upper)
+
+        return start, max(start, stop)
+
+    def positions_between(self, start, stop):
+        """Return the positions in a slice of the index, in internal order.
+
+        :param start: The first offset into the index, as from `span`.
+        :param stop: The offset past the last one, as from `span`.
+        :return: A sorted sequence of approach positions.
+        """
+        positions = self.positions[start:stop]
+        if self.in_order:
+            return positions
+        return sorted(positions)
+
+
+def criteria_range(filters, key=None):
+    """Intersect comparison filters on one attribute into a single range.
+
+    :param filters: A collection of `AttributeFilter`s on the same attribute,
+        whose comparators are `eq`, `ge`, `gt`, `le` or `lt`.
+    :param key: A function mapping a filter's reference value to an index key.
+    :return: A (lower, upper, include_lower, include_upper) tuple suitable for
+        `SortedIndex.span`.
+    """
+    lower = upper = None
+    include_lower = include_upper = True
+    for criterion in filters:
+        value = key(criterion.value) if key else criterion.value
+        if criterion.op is operator.eq:
+            bounds = ((True, value, True), (False, value, True))
+        elif criterion.op in _LOWER_BOUNDS:
+            bounds = ((True, value, _LOWER_BOUNDS[criterion.op]),)
+        else:
+            bounds = ((False, value, _UPPER_BOUNDS[criterion.op]),)
+
+        for is_lower, value, inclusive in bounds:
+            if is_lower:
+                if (lower is None or value > lower
+                        or (value == lower and not inclusive)):
+                    lower, include_lower = value, inclusive
+            elif (upper is None or value < upper
+                    or (value == upper and not inclusive)):
+                upper, include_upper = value, inclusive
+
+    return lower, upper, include_lower, include_upper
+
+
+def is_range_criterion(criterion):
+    """Return whether a filter can be expressed as a range of an index.
+
+    That requires a comparator understood by `criteria_range` and a reference
+    value that isn't NaN (a NaN never compares true, but would confuse the
+    bisection of the index).
+    """
+    return ((criterion.op is operator.eq or criterion.op in _LOWER_BOUNDS
+             or criterion.op in _UPPER_BOUNDS)
+            and criterion.value == criterion.value)
@@ -0,0 +1,105 @@
+"""
+Find the nearest points to a target with a k-dimensional tree.
+
+A `KDTree` recursively splits a set of points at the median of the coordinate
+along which they're most spread out, down to small leaf buckets. A query
+descends to the leaf containing the target, and then visits the other side of
+a split only if the splitting plane is closer than the k-th nearest point
+found so far, so most of the tree is never visited.
+
+Distances are Euclidean, with an optional weight per coordinate that can
+differ from query to query: pruning stays exact because a weighted distance
+is never smaller than the weighted distance to a splitting plane.
+"""
+import heapq
+import math
+
+
+class KDTree:
+    """A static k-dimensional tree of points, for nearest-neighbor queries."""
+
+    # Maximum number of points in a leaf bucket.
+    LEAF_SIZE = 16
+
+    def __init__(self, points):
+        """Create a new `KDTree`.
+
+        :param points: A sequence of points, each a tuple of as many float
+            coordinates as there are dimensions.
+        """
+        self._points = list(points)
+        self._dimensions = len(self._points[0]) if self._points else 0
+        # One list per dimension, with that coordinate of every point.
+        self._coordinates = [[point[axis] for point in self._points]
+                             for axis in range(self._dimensions)]
+        self._root = (self._build(list(range(len(self._points))))
+                      if self._points else None)
+
+    def __len__(self):
+        """Return the number of points in the tree."""
+        return len(self._points)
+
+    def _build(self, indices):
+        """Build the subtree holding the points at some indices.
+
+        :param indices: A list of point indices.
+        :return: A leaf (a list of point indices) or an internal node (a tuple
+            of the splitting axis, the splitting value, and the subtrees of
+            the points below and above it).
+        """
+        if len(indices) <= self.LEAF_SIZE:
+            return indices
+
+        def spread(axis):
+            values = list(map(self._coordinates[axis].__getitem__, indices))
+            return max(values) - min(values)
+
+        axis = max(range(self._dimensions), key=spread)
+        indices.sort(key=self._coordinates[axis].__getitem__)
+        middle = len(indices) // 2
+        return (axis, self._coordinates[axis][indices[middle]],
+                self._build(indices[:middle]), self._build(indices[middle:]))
+
+    def nearest(self, target, k=1, weights=None):
+        """Find the points nearest to a target.
+
+        :param target: A tuple of coordinates.
+        :param k: The number of points to find.
+        :param weights: A tuple of non-negative weights, one per coordinate,
+            or None to weigh every coordinate equally.
+        :return: A list of up to `k` (point index, distance) tuples, from the
+            nearest point to the farthest.
+        :raises ValueError: If there isn't one weight per coordinate.
+        """
+        if self._root is None or k < 1:
+            return []
+        if weights is not None and len(weights) != self._dimensions:
+            raise ValueError(f"Expected {self._dimensions} weights, got "
+                             f"{len(weights)}.")
+        weights = weights or (1.0,) * self._dimensions
+        squared = [weight * weight for weight in weights]
+        points = self._points
+        # A max-heap of the best points so far, as (-distance², index).
+        best = []
+
+        def visit(node):
+            if isinstance(node, list):
+                for i in node:
+                    point = points[i]
+                    distance = sum(w * (p - t) * (p - t) for w, p, t
+                                   in zip(squared, point, target))
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, i))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, i))
+                return
+            axis, split, below, above = node
+            offset = target[axis] - split
+            near, far = (below, above) if offset < 0 else (above, below)
+            visit(near)
+            if len(best) < k or squared[axis] * offset * offset < -best[0][0]:
+                visit(far)
+
+        visit(self._root)
+        return [(i, math.sqrt(-distance))
+                for distance, i in sorted(best, reverse=True)]
@@ -5,7 +5,7 @@ See `README.md` for a detailed discussion of this project.
 
 This script can be invoked from the command line::
 
-    $ python3 main.py {inspect,query,interactive} [args]
+    $ python3 main.py {inspect,query,stats,near,interactive} [args]
 
 The `inspect` subcommand looks up an NEO by name or by primary designation, and
 optionally lists all of that NEO's known close approaches:
@@ -14,6 +14,18 @@ optionally lists all of that NEO's known close approaches:
     $ python3 main.py inspect --name Halley
     $ python3 main.py inspect --verbose --name Halley
 
+Candidate NEOs can also be listed by a prefix or an approximate spelling of
+their name or designation, in ranked order:
+
+    $ python3 main.py inspect --name-prefix Apo
+    $ python3 main.py inspect --fuzzy Apohpis --limit 3
+
+A watch list of NEOs, one designation or name per line, can be inspected in a
+single run, optionally saving the NEOs and their close approaches to a CSV or
+JSON file:
+
+    $ python3 main.py inspect --from-file watchlist.txt --outfile watchlist.csv
+
 The `query` subcommand searches for close approaches that match given criteria:
 
     $ python3 main.py query --date 1969-07-29
@@ -33,31 +45,112 @@ or JSON format:
     $ python3 main.py query --limit 5 --outfile results.csv
     $ python3 main.py query --limit 15 --outfile results.json
 
+Large exports can instead be saved as NDJSON (one JSON document per line), or
+in a binary columnar format that `extract.load_columnar` reads back as arrays:
+
+    $ python3 main.py query --hazardous --outfile hazardous.ndjson
+    $ python3 main.py query --hazardous --outfile hazardous.neocol
+
+Output files whose name ends with `.gz`, `.bz2` or `.xz` are compressed, and
+compressed data files are decompressed as they're read:
+
+    $ python3 main.py --neofile neos.csv.xz --cadfile cad.json.gz query
+        --outfile results.csv.gz --compress-level 6
+
+Several output files (and `-`, for stdout) can be written from a single scan,
+and each file can have its own limit after a colon:
+
+    $ python3 main.py query --hazardous --limit 5 --outfile hazardous.csv
+        hazardous.json.gz:100 -
+
+Results can be ordered by time, distance, velocity or diameter; with a limit,
+only the top matches are kept while scanning:
+
+    $ python3 main.py query --hazardous --start-date 2000-01-01
+        --sort-by distance --limit 10
+
+Results can also be fetched one page at a time. Each page prints a cursor that
+resumes the scan where that page stopped:
+
+    $ python3 main.py query --hazardous --page-size 100
+    $ python3 main.py query --hazardous --page-size 100 --cursor <cursor>
+
+The plan of a query, the work done by each filter and the time spent in each
+stage are printed to standard error with `--explain`, or as JSON with
+`--explain-json`:
+
+    $ python3 main.py query --hazardous --max-distance 0.05 --explain
+
+Scans of large catalogs can be split across several worker processes:
+
+    $ python3 main.py query --workers 4 --min-velocity 30 --outfile fast.csv
+
+The `stats` subcommand summarizes the distances and velocities of the close
+approaches that match the same criteria, without collecting them, optionally
+grouped by year, month, NEO or hazardous flag. The summaries are printed as a
+table or saved to a JSON file:
+
+    $ python3 main.py stats --hazardous --group-by year
+    $ python3 main.py stats --start-date 2020-01-01 --group-by month
+        --percentiles 10 50 90 --outfile monthly.json
+
+The `near` subcommand finds the close approaches most similar to a target
+distance, velocity and date, optionally weighing these attributes:
+
+    $ python3 main.py near --distance 0.01 --velocity 15 --date 2029-04-13
+    $ python3 main.py near --distance 0.01 --velocity 15 --date 2029-04-13
+        --count 5 --weights 1 1 0.5
+
 The `interactive` subcommand loads the NEO database and spawns an interactive
-command shell that can repeatedly execute `inspect` and `query` commands
-without having to wait to reload the database each time. However,
-it doesn't hot-reload.
+command shell that can repeatedly execute `inspect`, `query`, `stats` and
+`near` commands without having to wait to reload the database each time.
+However, it doesn't hot-reload.
 
 If needed, the script can load data from data files other than the default with
 `--neofile` or `--cadfile`.
+
+The linked database is cached in a binary snapshot (under `.cache/`) keyed by
+a fingerprint of both data files, so later runs skip parsing them. The cache is
+rebuilt automatically whenever a data file changes, and can be bypassed or
+refreshed explicitly:
+
+    $ python3 main.py --no-cache inspect --pdes 433
+    $ python3 main.py --rebuild-cache query --limit 5
 """
 import argparse
 import cmd
 import datetime
+import functools
+import hashlib
+import json
 import pathlib
 import shlex
 import sys
 import time
 
+from compression import LEVELS, format_suffix, suffix_codec
+from explain import QueryProfile
 from extract import load_neos, load_approaches
+from cursor import CursorError
 from database import NEODatabase
-from filters import create_filters, limit
-from write import write_to_csv, write_to_json
+from filters import create_filters, limit, sort, SORT_KEYS
+from stats import GROUP_KEYS, summarize, summaries_to_json, format_table
+from snapshot import fingerprint, read_snapshot, write_snapshot, SnapshotError
+from write import (write_to_csv, write_to_json, write_to_ndjson,
+                   write_to_columnar, write_neos_to_csv, write_neos_to_json,
+                   tee, TeeTarget)
+
 
+# The extensions of the output files of close approaches, and the error
+# printed for any other extension.
+OUTFILE_SUFFIXES = ('.csv', '.json', '.ndjson', '.jsonl', '.neocol')
+OUTFILE_ERROR = """Please use an output file that ends with `.csv`, `.json`,
+              `.ndjson`, `.jsonl` or `.neocol`."""
 
 # Paths to the root of the project and the `data` subfolder.
 PROJECT_ROOT = pathlib.Path(__file__).parent.resolve()
 DATA_ROOT = PROJECT_ROOT / 'data'
+CACHE_ROOT = PROJECT_ROOT / '.cache'
 
 # The current time, for use with the kill-on-change feature of the
 # interactive shell.
@@ -80,52 +173,36 @@ def date_fromisoformat(date_string):
             f"""'{date_string}' is not a valid date. Use YYYY-MM-DD.""")
 
 
-def make_parser():
-    """Create an ArgumentParser for this script.
+def output_target(target):
+    """Parse an output target of the `query` subcommand's `--outfile` option.
 
-    :return: A tuple of the top-level, inspect, and query parsers.
+    :param target: A path to an output file, or '-' for stdout, optionally
+        followed by a colon and the maximum number of results to write to it
+        (e.g. results.csv:100).
+    :return: A tuple of the path (None for stdout) and the limit (None if it
+        wasn't given).
     """
-    parser = argparse.ArgumentParser(
-        description="""
-                    Explore past and future close approaches
-                    of near-Earth objects.
-                    """
-    )
+    path, colon, count = target.rpartition(':')
+    if not colon or not count.isdigit():
+        path, count = target, None
+    elif int(count) == 0:
+        raise argparse.ArgumentTypeError(
+            f"'{target}' has a limit of 0. Omit the limit to write every "
+            f"result.")
+    if not path:
+        raise argparse.ArgumentTypeError(f"'{target}' has no path.")
+    return (None if path == '-' else pathlib.Path(path),
+            int(count) if count else None)
 
-    # Add arguments for custom data files.
-    parser.add_argument('--neofile', default=(DATA_ROOT / 'neos.csv'),
-                        type=pathlib.Path,
-                        help="Path to CSV file of near-Earth objects.")
-    parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'),
-                        type=pathlib.Path,
-                        help="Path to JSON file of close approach data.")
-    subparsers = parser.add_subparsers(dest='cmd')
 
-    # Add the `inspect` subcommand parser.
-    inspect = subparsers.add_parser('inspect',
-                                    description="""Inspect an NEO by primary
-                                                designation or by name.""")
-    inspect.add_argument('-v', '--verbose', action='store_true',
-                         help="""Additionally, print all known close approaches
-                                of this NEO.""")
-    inspect_id = inspect.add_mutually_exclusive_group(required=True)
-    inspect_id.add_argument('-p', '--pdes',
-                            help="""The primary designation of the NEO
-                            to inspect (e.g. '433').""")
-    inspect_id.add_argument('-n', '--name',
-                            help="""The IAU name of the NEO to inspect
-                                    (e.g. 'Halley').""")
+def add_filter_arguments(parser):
+    """Add the options that `create_filters` accepts to a subcommand parser.
 
-    # Add the `query` subcommand parser.
-    query = subparsers.add_parser('query',
-                                  description="Query for close approaches that"
-                                              "match a collection of "
-                                              "filters.")
-    filters = query.add_argument_group('Filters',
-                                       description="Filter close approaches by"
-                                                   " their attributes "
-                                                   "or the attributes of their"
-                                                   " NEOs.")
+    :param parser: The subparser of a subcommand that filters close approaches.
+    """
+    filters = parser.add_argument_group(
+        'Filters', description="Filter close approaches by their attributes "
+                               "or the attributes of their NEOs.")
     filters.add_argument('-d', '--date', type=date_fromisoformat,
                          help="Only return close approaches on the given date,"
                               " in YYYY-MM-DD format (e.g. 2020-12-31).")
@@ -170,14 +247,184 @@ def make_parser():
                          action='store_false',
                          help="If specified, only return close approaches of "
                               "NEOs that are not potentially hazardous.")
+
+
+def filters_from_args(args):
+    """Create a collection of filters from the parsed filter options.
+
+    :param args: Arguments parsed by a parser with `add_filter_arguments`.
+    :return: A collection of filters for use with `NEODatabase.query`.
+    """
+    return create_filters(
+        date=args.date, start_date=args.start_date, end_date=args.end_date,
+        distance_min=args.distance_min, distance_max=args.distance_max,
+        velocity_min=args.velocity_min, velocity_max=args.velocity_max,
+        diameter_min=args.diameter_min, diameter_max=args.diameter_max,
+        hazardous=args.hazardous
+    )
+
+
+def make_parser():
+    """Create an ArgumentParser for this script.
+
+    :return: A tuple of the top-level, inspect, query, stats, and near
+        parsers.
+    """
+    parser = argparse.ArgumentParser(
+        description="""
+                    Explore past and future close approaches
+                    of near-Earth objects.
+                    """
+    )
+
+    # Add arguments for custom data files.
+    parser.add_argument('--neofile', default=(DATA_ROOT / 'neos.csv'),
+                        type=pathlib.Path,
+                        help="Path to CSV file of near-Earth objects.")
+    parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'),
+                        type=pathlib.Path,
+                        help="Path to JSON file of close approach data.")
+    parser.add_argument('--load-workers', type=int, default=None,
+                        help="Number of processes used to parse the CSV file "
+                             "of near-Earth objects. Defaults to one per CPU; "
+                             "small files are always parsed serially.")
+    parser.add_argument('--columnar', action='store_true',
+                        help="Answer queries with the NumPy-based columnar "
+                             "engine (requires NumPy).")
+    cache = parser.add_mutually_exclusive_group()
+    cache.add_argument('--no-cache', dest='cache', action='store_false',
+                       help="Parse the data files without reading or writing "
+                            "a database snapshot.")
+    cache.add_argument('--rebuild-cache', action='store_true',
+                       help="Parse the data files and overwrite the database "
+                            "snapshot, even if it is up to date.")
+    subparsers = parser.add_subparsers(dest='cmd')
+
+    # Add the `inspect` subcommand parser.
+    inspect = subparsers.add_parser('inspect',
+                                    description="""Inspect an NEO by primary
+                                                designation or by name.""")
+    inspect.add_argument('-v', '--verbose', action='store_true',
+                         help="""Additionally, print all known close approaches
+                                of this NEO.""")
+    inspect_id = inspect.add_mutually_exclusive_group(required=True)
+    inspect_id.add_argument('-p', '--pdes',
+                            help="""The primary designation of the NEO
+                            to inspect (e.g. '433').""")
+    inspect_id.add_argument('-n', '--name',
+                            help="""The IAU name of the NEO to inspect
+                                    (e.g. 'Halley').""")
+    inspect_id.add_argument('--name-prefix',
+                            help="""List the NEOs whose name or designation
+                                    starts with this prefix (e.g. 'Apo').""")
+    inspect_id.add_argument('-f', '--from-file', type=pathlib.Path,
+                            help="""Inspect every NEO listed in this text
+                                    file, one primary designation or name
+                                    per line.""")
+    inspect_id.add_argument('--fuzzy',
+                            help="""List the NEOs whose name or designation
+                                    is closest to this approximate spelling
+                                    (e.g. 'Apohpis').""")
+    inspect.add_argument('-l', '--limit', type=int, default=10,
+                         help="""The maximum number of NEOs listed by
+                                 --name-prefix or --fuzzy. Defaults to 10.""")
+    inspect.add_argument('-o', '--outfile', type=pathlib.Path,
+                         help="""With --from-file, a CSV or JSON file in
+                                 which to save the NEOs and their close
+                                 approaches.""")
+
+    # Add the `query` subcommand parser.
+    query = subparsers.add_parser('query',
+                                  description="Query for close approaches that"
+                                              "match a collection of "
+                                              "filters.")
+    add_filter_arguments(query)
     query.add_argument('-l', '--limit', type=int,
                        help="The maximum number of matches to return. "
                             "Defaults to 10 if no --outfile is given.")
-    query.add_argument('-o', '--outfile', type=pathlib.Path,
-                       help="File in which to save structured results. "
-                            "If omitted, results are printed to "
+    query.add_argument('--sort-by', choices=SORT_KEYS,
+                       help="Order the matches by this attribute. With "
+                            "--limit, only the top matches are kept.")
+    query.add_argument('--desc', action='store_true',
+                       help="With --sort-by, order from the largest value "
+                            "to the smallest.")
+    query.add_argument('--page-size', type=int,
+                       help="Return one page of this many matches, and print "
+                            "the cursor of the next page to standard error.")
+    query.add_argument('--cursor',
+                       help="Resume the query after the page that returned "
+                            "this cursor.")
+    query.add_argument('-w', '--workers', type=int, default=1,
+                       help="Number of processes that scan shards of the "
+                            "close approaches in parallel. Defaults to 1.")
+    explain = query.add_mutually_exclusive_group()
+    explain.add_argument('--explain', action='store_true',
+                         help="Print the query plan, the evaluations and "
+                              "rejections of each filter, and the time spent "
+                              "in each stage to standard error.")
+    explain.add_argument('--explain-json', action='store_true',
+                         help="Like --explain, as a JSON document.")
+    query.add_argument('-o', '--outfile', type=output_target, nargs='+',
+                       metavar='FILE[:LIMIT]',
+                       help="Files in which to save structured results, "
+                            "all written from a single scan. Use - for "
+                            "standard output, and append :LIMIT to a file "
+                            "to limit only its results. If omitted, results "
+                            "are printed to standard output.")
+    query.add_argument('--compress-level', type=int,
+                       help="The compression level of an output file ending "
+                            "with .gz, .bz2 or .xz. Defaults to the codec's "
+                            "default level.")
+
+    # Add the `stats` subcommand parser.
+    stats = subparsers.add_parser('stats',
+                                  description="Summarize the distances and "
+                                              "velocities of the close "
+                                              "approaches that match a "
+                                              "collection of filters.")
+    add_filter_arguments(stats)
+    stats.add_argument('-g', '--group-by', choices=GROUP_KEYS,
+                       help="Summarize each year, month, NEO or hazardous "
+                            "flag separately.")
+    stats.add_argument('-p', '--percentiles', type=float, nargs='+',
+                       default=[50, 90],
+                       help="The percentiles to estimate, between 0 and 100. "
+                            "Defaults to 50 and 90.")
+    stats.add_argument('-o', '--outfile', type=pathlib.Path,
+                       help="JSON file in which to save the summaries. "
+                            "If omitted, a table is printed to "
                             "standard output.")
 
+    # Add the `near` subcommand parser.
+    near = subparsers.add_parser('near',
+                                 description="Find the close approaches most "
+                                             "similar to a target distance, "
+                                             "velocity and date.")
+    near.add_argument('--distance', type=float, required=True,
+                      help="The target distance, in astronomical units.")
+    near.add_argument('--velocity', type=float, required=True,
+                      help="The target relative velocity, in kilometers per "
+                           "second.")
+    near.add_argument('-d', '--date', type=date_fromisoformat, required=True,
+                      help="The target date, in YYYY-MM-DD format "
+                           "(e.g. 2029-04-13).")
+    near.add_argument('-k', '--count', type=int, default=10,
+                      help="The number of close approaches to find. "
+                           "Defaults to 10.")
+    near.add_argument('--weights', type=float, nargs=3, default=None,
+                      metavar=('DISTANCE', 'VELOCITY', 'TIME'),
+                      help="Relative weights of the distance, velocity and "
+                           "time, after scaling each of them by its standard "
+                           "deviation. Defaults to 1 1 1.")
+    near.add_argument('-o', '--outfile', type=pathlib.Path,
+                      help="File in which to save the close approaches, in "
+                           "CSV or JSON format. If omitted, they are printed "
+                           "to standard output.")
+    near.add_argument('--compress-level', type=int,
+                      help="The compression level of an output file ending "
+                           "with .gz, .bz2 or .xz. Defaults to the codec's "
+                           "default level.")
+
     repl = subparsers.add_parser('interactive',
                                  description="Start an interactive command "
                                  "session to repeatedly run `interact` "
@@ -185,10 +432,65 @@ def make_parser():
     repl.add_argument('-a', '--aggressive', action='store_true',
                       help="If specified, kill the session whenever a project"
                            " file is modified.")
-    return parser, inspect, query
+    return parser, inspect, query, stats, near
+
 
+def load_database(neofile, cadfile, cache=True, rebuild=False, workers=None,
+                  columnar=False):
+    """Load the NEO database, through a binary snapshot when possible.
+
+    The snapshot lives in `CACHE_ROOT`, under a name derived from the paths
+    of both data files. It is used only when its fingerprint matches the
+    current data files; otherwise the data files are parsed and a fresh
+    snapshot is written for later runs.
+
+    :param neofile: A path to the CSV file of near-Earth objects.
+    :param cadfile: A path to the JSON file of close approach data.
+    :param cache: Whether to read and write a snapshot at all.
+    :param rebuild: Whether to ignore an existing snapshot and overwrite it.
+    :param workers: The number of processes used to parse the NEO file.
+    :param columnar: Whether the database uses the columnar query engine.
+    :return: A linked `NEODatabase`.
+    """
+    if not cache:
+        return NEODatabase(load_neos(neofile, workers),
+                           load_approaches(cadfile), columnar)
 
-def inspect(database, pdes=None, name=None, verbose=False):
+    source_fingerprint = fingerprint(neofile, cadfile)
+    key = hashlib.blake2b(repr(tuple(path for path, *_ in source_fingerprint))
+                          .encode(), digest_size=8).hexdigest()
+    snapshot_path = CACHE_ROOT / f'{key}.neodb'
+
+    if not rebuild:
+        start = time.perf_counter()
+        try:
+            neos, approaches, parse_seconds = read_snapshot(
+                snapshot_path, source_fingerprint)
+        except SnapshotError:
+            pass
+        else:
+            database = NEODatabase(neos, approaches, columnar)
+            elapsed = time.perf_counter() - start
+            print(f"Loaded database snapshot in {elapsed:.2f}s (parsing the "
+                  f"data files took {parse_seconds:.2f}s, saved "
+                  f"{parse_seconds - elapsed:.2f}s).", file=sys.stderr)
+            return database
+
+    start = time.perf_counter()
+    neos = load_neos(neofile, workers)
+    approaches = load_approaches(cadfile)
+    parse_seconds = time.perf_counter() - start
+    database = NEODatabase(neos, approaches, columnar)
+    try:
+        write_snapshot(snapshot_path, neos, approaches, source_fingerprint,
+                       parse_seconds)
+    except OSError as error:
+        print(f"Unable to write database snapshot: {error}", file=sys.stderr)
+    return database
+
+
+def inspect(database, pdes=None, name=None, verbose=False, prefix=None,
+            fuzzy=None, limit=10):
     """Perform the `inspect` subcommand.
 
     This function fetches an NEO by designation or by name. If a matching NEO
@@ -196,8 +498,13 @@ def inspect(database, pdes=None, name=None, verbose=False):
     for all of the NEO's known close approaches is printed if `verbose=True`).
     Otherwise, a message is printed noting that there are no matching NEOs.
 
-    At least one of `pdes` and `name` must be given. If both are given, prefer
-    to look up the NEO by the primary designation.
+    At least one of `pdes`, `name`, `prefix` and `fuzzy` must be given. If
+    both `pdes` and `name` are given, prefer to look up the NEO by the primary
+    designation.
+
+    With `prefix` or `fuzzy`, the candidate NEOs whose name or designation
+    starts with the prefix, or is closest to the approximate spelling, are
+    listed in ranked order instead.
 
     :param database: The `NEODatabase` containing data on NEOs and their close
         approaches.
@@ -205,8 +512,32 @@ def inspect(database, pdes=None, name=None, verbose=False):
     :param name: The name of an NEO for which to search.
     :param verbose: Whether to additionally print all of a matching NEO's
         close approaches.
-    :return: The matching `NearEarthObject`, or None if not found.
+    :param prefix: The beginning of the names or designations of NEOs for
+        which to search.
+    :param fuzzy: An approximate name or designation of NEOs for which to
+        search.
+    :param limit: The maximum number of candidates listed.
+    :return: The matching `NearEarthObject`, or None if not found; with
+        `prefix` or `fuzzy`, the list of candidate `NearEarthObject`s.
     """
+    if prefix is not None or fuzzy is not None:
+        if prefix is not None:
+            candidates = [(neo, None) for neo in
+                          database.get_neos_by_prefix(prefix, limit)]
+        else:
+            candidates = database.get_neos_by_fuzzy_name(fuzzy, limit)
+        if not candidates:
+            print("No matching NEOs exist in the database.", file=sys.stderr)
+        for rank, (neo, distance) in enumerate(candidates, 1):
+            if distance is None:
+                print(f"{rank}. {neo}")
+            else:
+                print(f"{rank}. {neo} (edit distance: {distance})")
+            if verbose:
+                for approach in neo.approaches:
+                    print(f"   - {approach}")
+        return [neo for neo, _ in candidates]
+
     # Fetch the NEO of interest.
     if pdes:
         neo = database.get_neo_by_designation(pdes)
@@ -227,16 +558,120 @@ def inspect(database, pdes=None, name=None, verbose=False):
     return neo
 
 
+def inspect_batch(database, path, outfile=None, verbose=False):
+    """Perform the `inspect` subcommand for every NEO listed in a file.
+
+    Each non-blank line of the file (other than comments starting with '#')
+    is looked up as a primary designation and, failing that, as a name. The
+    matching NEOs are printed, or streamed with their close approaches to the
+    output file in CSV or JSON format, as inferred from its extension. Lines
+    without a matching NEO are reported together at the end.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close
+        approaches.
+    :param path: A path to the text file listing designations or names.
+    :param outfile: A path to a CSV or JSON file in which to save the NEOs,
+        or None to print them.
+    :param verbose: Whether to additionally print all of each matching NEO's
+        close approaches.
+    :return: The list of lines without a matching NEO.
+    """
+    if (outfile is not None
+            and format_suffix(outfile) not in ('.csv', '.json')):
+        print("""Please use an output file that ends
+              with `.csv` or `.json`.""", file=sys.stderr)
+        return None
+
+    misses = []
+    read_errors = []
+
+    def resolve(lines):
+        try:
+            for line in lines:
+                key = line.strip()
+                if not key or key.startswith('#'):
+                    continue
+                neo = (database.get_neo_by_designation(key)
+                       or database.get_neo_by_name(key))
+                if neo is None:
+                    misses.append(key)
+                else:
+                    yield neo
+        except OSError as error:
+            # Tell errors reading the list from those writing the output.
+            read_errors.append(error)
+            raise
+
+    try:
+        lines = open(path)
+    except OSError as error:
+        print(f"Unable to read NEOs from {path}: {error}", file=sys.stderr)
+        return None
+    with lines:
+        try:
+            if outfile is None:
+                for neo in resolve(lines):
+                    print(neo)
+                    if verbose:
+                        for approach in neo.approaches:
+                            print(f"- {approach}")
+            elif format_suffix(outfile) == '.csv':
+                write_neos_to_csv(resolve(lines), outfile)
+            else:
+                write_neos_to_json(resolve(lines), outfile)
+        except OSError as error:
+            if read_errors:
+                print(f"Unable to read NEOs from {path}: {error}",
+                      file=sys.stderr)
+            else:
+                print(f"Unable to write NEOs to {outfile}: {error}",
+                      file=sys.stderr)
+            return None
+
+    if misses:
+        print(f"No matching NEOs exist in the database for {len(misses)} "
+              f"of the listed NEOs:", file=sys.stderr)
+        for key in misses:
+            print(f"- {key}", file=sys.stderr)
+    return misses
+
+
+def check_inspect_args(parser, args):
+    """Reject combinations of `inspect` arguments that the parser accepts.
+
+    :param parser: The `inspect` subparser.
+    :param args: The arguments it parsed.
+    :raises SystemExit: Through `parser.error`, if `--outfile` was given
+        without `--from-file`.
+    """
+    if args.outfile is not None and args.from_file is None:
+        parser.error("argument -o/--outfile: only allowed with argument "
+                     "-f/--from-file")
+
+
 def query(database, args):
     """Perform the `query` subcommand.
 
     Create a collection of filters with `create_filters` and supply them to the
     database's `query` method to produce a stream of matching results.
 
+    If `--sort-by` was given, order the results by that attribute, keeping
+    only the top entries when they are limited.
+
+    With `--explain` or `--explain-json`, profile the query and print how it
+    was planned, how often each filter was evaluated and rejected an
+    approach, and the time spent in each stage to stderr.
+
+    With `--page-size` or `--cursor`, only fetch one page of the results
+    (resuming after the page that returned the cursor), and print the cursor
+    of the next page to stderr.
+
     If an output file wasn't given, print these results to stdout, limiting to
     10 entries if no limit was specified. If an output file was given, use the
     file's extension to infer whether the file should hold CSV or JSON data,
-    and then write the results to the output file in that format.
+    and then write the results to the output file in that format. With
+    several output files, the results of a single scan are fed to all of
+    them, each up to its own limit.
 
     :param database: The `NEODatabase` containing data on NEOs and their close
         approaches.
@@ -245,29 +680,234 @@ def query(database, args):
     """
     # Construct a collection of filters from arguments supplied
     # at the command line.
-    filters = create_filters(
-        date=args.date, start_date=args.start_date, end_date=args.end_date,
-        distance_min=args.distance_min, distance_max=args.distance_max,
-        velocity_min=args.velocity_min, velocity_max=args.velocity_max,
-        diameter_min=args.diameter_min, diameter_max=args.diameter_max,
-        hazardous=args.hazardous
-    )
-    # Query the database with the collection of filters.
-    results = database.query(filters)
+    filters = filters_from_args(args)
+    targets = args.outfile or [(None, None)]
+    paths = [path for path, _ in targets]
+    if len(set(paths)) < len(paths):
+        print("Each output file can only be given once.", file=sys.stderr)
+        return
+    if any(path is not None and format_suffix(path) not in OUTFILE_SUFFIXES
+           for path in paths):
+        print(OUTFILE_ERROR, file=sys.stderr)
+        return
+    error = compress_level_error(paths, args.compress_level)
+    if error is not None:
+        print(error, file=sys.stderr)
+        return
+
+    if args.page_size is not None or args.cursor is not None:
+        # Fetch a single page of results, resuming from the cursor if given.
+        if args.explain or args.explain_json:
+            print("--explain isn't supported for pages of results.",
+                  file=sys.stderr)
+            return
+        if args.sort_by:
+            print("Pages follow the internal order of the results, and can't "
+                  "be combined with --sort-by.", file=sys.stderr)
+            return
+        page_size = args.page_size or args.limit or 10
+        if page_size < 1:
+            print("The page size must be positive.", file=sys.stderr)
+            return
+        try:
+            results, next_cursor = database.query_page(filters, page_size,
+                                                       args.cursor)
+        except CursorError as error:
+            print(error, file=sys.stderr)
+            return
+        write_outputs(results, targets, args.compress_level)
+        if next_cursor is None:
+            print("This is the last page of results.", file=sys.stderr)
+        else:
+            print(f"Next page: --cursor {next_cursor}", file=sys.stderr)
+        return
+
+    # With --explain, profile the query and time each stage of its pipeline.
+    profile = (QueryProfile(filters)
+               if args.explain or args.explain_json else None)
+
+    def stage(name, results):
+        return results if profile is None else profile.timed(name, results)
+
+    # Query the database with the collection of filters. The limit lets a
+    # sharded query stop scanning early - unless the matches are sorted, in
+    # which case every match has to be considered. Each output keeps its own
+    # limit, or else the --limit; results written to stdout are limited to 10
+    # entries if no limit was specified. The scan stops at the largest limit.
+    targets = [(path, count or (args.limit if path else args.limit or 10)
+                or None)
+               for path, count in targets]
+    limits = [count for _, count in targets]
+    count = None if None in limits else max(limits)
+    results = stage('scan', database.query(
+        filters, workers=args.workers,
+        limit=None if args.sort_by else count, profile=profile))
+    if args.sort_by:
+        def ordered(results):
+            # Sort lazily, so that sorting happens within its timed stage.
+            yield from sort(results, args.sort_by, count, reverse=args.desc)
+
+        results = stage('sort', ordered(results))
+    results = stage('limit', limit(results, count))
+
+    if profile is None:
+        write_outputs(results, targets, args.compress_level)
+        return
+    with profile.time('write'):
+        write_outputs(results, targets, args.compress_level)
+    if args.explain_json:
+        print(json.dumps(profile.serialize(), indent=4), file=sys.stderr)
+    else:
+        print(profile, file=sys.stderr)
 
-    if not args.outfile:
-        # Write the results to stdout, limiting to 10 entries if not specified.
-        for result in limit(results, args.limit or 10):
+
+def compress_level_error(paths, compresslevel):
+    """Check a compression level against the codecs of the output files.
+
+    :param paths: The paths of the output files, where None stands for
+        stdout.
+    :param compresslevel: The requested compression level, or None.
+    :return: A message explaining why the level is invalid (including when
+        no output file is compressed), or None if it's valid for every
+        compressed output file.
+    """
+    if compresslevel is None:
+        return None
+    codecs = [codec for codec in dict.fromkeys(map(suffix_codec, paths))
+              if codec is not None]
+    if not codecs:
+        return ("--compress-level only applies to output files ending with "
+                ".gz, .bz2 or .xz.")
+    for codec in codecs:
+        levels = LEVELS[codec]
+        if compresslevel not in levels:
+            return (f"The {codec} compression level must be between "
+                    f"{levels[0]} and {levels[-1]}.")
+    return None
+
+
+def write_outputs(results, targets, compresslevel=None):
+    """Write one stream of close approaches to several outputs at once.
+
+    With a single output, this is `write_results`. Otherwise, the stream is
+    fed to every output with `write.tee`: the first output printing to
+    stdout (or else the first uncompressed file) is written from this thread,
+    and every other output from a background thread, so that the slower
+    ones don't hold back the scan.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param targets: A list of (path, limit) tuples, where a path of None
+        prints to stdout and a limit of None doesn't limit the output.
+    :param compresslevel: The compression level of compressed output files,
+        or None for the codec's default level.
+    """
+    if len(targets) == 1:
+        path, count = targets[0]
+        write_results(limit(results, count), path, compresslevel)
+        return
+    inline = min(range(len(targets)),
+                 key=lambda i: (targets[i][0] is not None,
+                                suffix_codec(targets[i][0]) is not None, i))
+    tee(results, [TeeTarget(functools.partial(write_results, outfile=path,
+                                              compresslevel=compresslevel),
+                            limit=count, threaded=i != inline)
+                  for i, (path, count) in enumerate(targets)])
+
+
+def write_results(results, outfile=None, compresslevel=None):
+    """Print a stream of close approaches, or write them to an output file.
+
+    The file's extension determines whether it holds CSV, JSON, NDJSON (one
+    JSON document per line) or binary columnar data, and whether it's
+    compressed with gzip (`.gz`), bzip2 (`.bz2`) or xz (`.xz`), as in
+    `results.csv.gz`.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param outfile: A path to the output file, or None to print the results
+        to stdout.
+    :param compresslevel: The compression level of a compressed output file,
+        already checked by `compress_level_error`, or None for the codec's
+        default level.
+    """
+    suffix = format_suffix(outfile) if outfile else None
+    if not outfile:
+        for result in results:
             print(result)
+    elif suffix == '.csv':
+        write_to_csv(results, outfile, compresslevel=compresslevel)
+    elif suffix == '.json':
+        write_to_json(results, outfile, compresslevel=compresslevel)
+    elif suffix in ('.ndjson', '.jsonl'):
+        write_to_ndjson(results, outfile, compresslevel=compresslevel)
+    elif suffix == '.neocol':
+        write_to_columnar(results, outfile, compresslevel=compresslevel)
     else:
-        # Write the results to a file.
-        if args.outfile.suffix == '.csv':
-            write_to_csv(limit(results, args.limit), args.outfile)
-        elif args.outfile.suffix == '.json':
-            write_to_json(limit(results, args.limit), args.outfile)
-        else:
-            print("""Please use an output file that ends
-                  with `.csv` or `.json`.""", file=sys.stderr)
+        print(OUTFILE_ERROR, file=sys.stderr)
+
+
+def stats(database, args):
+    """Perform the `stats` subcommand.
+
+    Summarize the close approaches matching the filters in a single streaming
+    pass over the database's `query` method, without collecting them. If an
+    output file wasn't given, print the summaries as a table to stdout;
+    otherwise, write them to the output file in JSON format.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close
+        approaches.
+    :param args: All arguments from the command line, as parsed by the
+        top-level parser.
+    """
+    for percentile in args.percentiles:
+        if not 0 <= percentile <= 100:
+            print(f"Percentile {percentile:g} is not between 0 and 100.",
+                  file=sys.stderr)
+            return
+
+    summaries = summarize(database.query(filters_from_args(args)),
+                          group_by=args.group_by,
+                          percentiles=args.percentiles)
+    if not summaries:
+        print("No matching close approaches exist in the database.",
+              file=sys.stderr)
+    if not args.outfile:
+        if summaries:
+            print(format_table(summaries, args.group_by))
+    else:
+        with open(args.outfile, 'w') as outfile:
+            json.dump(summaries_to_json(summaries, args.group_by), outfile,
+                      indent=4)
+
+
+def near(database, args):
+    """Perform the `near` subcommand.
+
+    Find the close approaches most similar to the target distance, velocity
+    and date with the database's `nearest` method. If an output file wasn't
+    given, print them, from the most similar, with their dissimilarity;
+    otherwise, write them to the output file in CSV or JSON format.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close
+        approaches.
+    :param args: All arguments from the command line, as parsed by the
+        top-level parser.
+    """
+    error = compress_level_error([args.outfile], args.compress_level)
+    if error is not None:
+        print(error, file=sys.stderr)
+        return
+    try:
+        matches = database.nearest((args.distance, args.velocity, args.date),
+                                   args.count, args.weights)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return
+    if args.outfile:
+        write_results([approach for approach, _ in matches], args.outfile,
+                      args.compress_level)
+        return
+    for rank, (approach, dissimilarity) in enumerate(matches, 1):
+        print(f"{rank}. {approach} (dissimilarity: {dissimilarity:.4f})")
 
 
 class NEOShell(cmd.Cmd):
@@ -289,7 +929,8 @@ class NEOShell(cmd.Cmd):
     prompt = '(neo) '
 
     def __init__(self, database, inspect_parser, query_parser,
-                 aggressive=False, **kwargs):
+                 aggressive=False, stats_parser=None, near_parser=None,
+                 **kwargs):
         """Create a new `NEOShell`.
 
         Creating this object doesn't start the session - for that, use
@@ -301,6 +942,8 @@ class NEOShell(cmd.Cmd):
         :param query_parser: The subparser for the `query` subcommand.
         :param aggressive: Whether to kill the session whenever a project
           file is changed.
+        :param stats_parser: The subparser for the `stats` subcommand.
+        :param near_parser: The subparser for the `near` subcommand.
         :param kwargs: A dictionary of excess keyword arguments passed to
           the superclass.
         """
@@ -309,9 +952,11 @@ class NEOShell(cmd.Cmd):
         self.inspect = inspect_parser
         self.query = query_parser
         self.aggressive = aggressive
+        self.stats = stats_parser
+        self.near = near_parser
 
     @classmethod
-    def parse_arg_with(cls, arg, parser):
+    def parse_arg_with(cls, arg, parser, check=None):
         """Parse the additional text passed to a command, using a given parser.
 
         If any error is encountered (in lexical parsing or argument parsing),
@@ -319,6 +964,9 @@ class NEOShell(cmd.Cmd):
 
         :param arg: The additional text supplied after the command.
         :param parser: An `argparse.ArgumentParser` to parse the arguments.
+        :param check: A function further checking the parsed arguments, which
+            is called with the parser and the arguments and reports an error
+            through `parser.error`, or None.
         :return: A `Namespace` of the arguments (produced by `parse_args`)
             or None.
         """
@@ -331,7 +979,10 @@ class NEOShell(cmd.Cmd):
 
         # Use the ArgumentParser to parse the shell arguments.
         try:
-            return parser.parse_args(args)
+            args = parser.parse_args(args)
+            if check is not None:
+                check(parser, args)
+            return args
         except SystemExit as err:
             # The `parse_args` method doesn't actually surface `ArgumentError`s
             # nor `ArgumentTypeError`s - instead, it calls its own `error`
@@ -353,15 +1004,31 @@ class NEOShell(cmd.Cmd):
         Additionally, list all known close approaches:
 
             (neo) inspect --verbose --name Eros
+
+        List ranked candidates by a prefix or an approximate spelling of their
+        name or designation:
+
+            (neo) inspect --name-prefix Apo
+            (neo) inspect --fuzzy Apohpis --limit 3
+
+        Inspect every NEO listed in a file, one designation or name per line,
+        optionally saving them and their close approaches to a file:
+
+            (neo) inspect --from-file watchlist.txt --outfile watchlist.csv
         """
-        args = self.parse_arg_with(arg, self.inspect)
+        args = self.parse_arg_with(arg, self.inspect, check_inspect_args)
         if not args:
             return
 
         # Run the `inspect` subcommand.
+        if args.from_file:
+            inspect_batch(self.db, args.from_file, outfile=args.outfile,
+                          verbose=args.verbose)
+            return
         inspect(self.db,
                 pdes=args.pdes, name=args.name,
-                verbose=args.verbose)
+                verbose=args.verbose, prefix=args.name_prefix,
+                fuzzy=args.fuzzy, limit=args.limit)
 
     def do_q(self, arg):
         """Shorthand for `query`."""
@@ -385,11 +1052,36 @@ class NEOShell(cmd.Cmd):
 
             (neo) query --limit 2
 
+        The matches can be ordered by `time`, `distance`, `velocity` or
+        `diameter` with `--sort-by`, from the largest value with `--desc`:
+
+            (neo) query --hazardous --sort-by distance --limit 10
+
+        Results can be paged through with `--page-size`, passing the cursor
+        printed after each page to `--cursor` to fetch the next one:
+
+            (neo) query --hazardous --page-size 100
+            (neo) query --hazardous --page-size 100 --cursor <cursor>
+
+        Add `--explain` (or `--explain-json`) to see how the query was planned,
+        how each filter fared and where the time went:
+
+            (neo) query --hazardous --max-distance 0.05 --explain
+
+        Large scans can be split across worker processes with `--workers`:
+
+            (neo) query --workers 4 --min-velocity 30
+
         The results can be saved to a file (instead of displayed to stdout)
         with `--outfile`:
 
             (neo) query --limit 5 --outfile results.csv
             (neo) query --limit 5 --outfile results.json
+
+        Several files can be written from a single scan, each optionally with
+        its own limit:
+
+            (neo) query --limit 5 --outfile results.csv results.json:50
         """
         args = self.parse_arg_with(arg, self.query)
         if not args:
@@ -398,6 +1090,49 @@ class NEOShell(cmd.Cmd):
         # Run the `inspect` subcommand.
         query(self.db, args)
 
+    def do_stats(self, arg):
+        """Perform the `stats` subcommand within the REPL session.
+
+        Summarize the close approaches matching any of the `query` filters,
+        optionally grouped by `year`, `month`, `neo` or `hazardous`:
+
+            (neo) stats --hazardous --group-by year
+            (neo) stats --start-date 2020-01-01 --group-by month -p 10 50 90
+
+        The summaries can be saved to a JSON file with `--outfile`:
+
+            (neo) stats --group-by neo --outfile stats.json
+        """
+        if self.stats is None:
+            print("The `stats` command is unavailable.", file=sys.stderr)
+            return
+        args = self.parse_arg_with(arg, self.stats)
+        if not args:
+            return
+
+        # Run the `stats` subcommand.
+        stats(self.db, args)
+
+    def do_near(self, arg):
+        """Perform the `near` subcommand within the REPL session.
+
+        Find the close approaches most similar to a target distance (in au),
+        velocity (in km/s) and date, optionally weighing these attributes:
+
+            (neo) near --distance 0.01 --velocity 15 --date 2029-04-13
+            (neo) near --distance 0.01 --velocity 15 --date 2029-04-13 -k 3
+                --weights 1 1 0.5
+        """
+        if self.near is None:
+            print("The `near` command is unavailable.", file=sys.stderr)
+            return
+        args = self.parse_arg_with(arg, self.near)
+        if not args:
+            return
+
+        # Run the `near` subcommand.
+        near(self.db, args)
+
     def do_EOF(self, _arg):
         """Exit the interactive session."""
         return True
@@ -428,21 +1163,36 @@ class NEOShell(cmd.Cmd):
 
 def main():
     """Run the main script."""
-    parser, inspect_parser, query_parser = make_parser()
+    (parser, inspect_parser, query_parser, stats_parser,
+     near_parser) = make_parser()
     args = parser.parse_args()
+    if args.cmd == 'inspect':
+        check_inspect_args(inspect_parser, args)
 
-    # Extract data from the data files into structured Python objects.
-    database = NEODatabase(load_neos(args.neofile),
-                           load_approaches(args.cadfile))
+    # Extract data from the data files (or their snapshot) into structured
+    # Python objects.
+    database = load_database(args.neofile, args.cadfile,
+                             cache=args.cache, rebuild=args.rebuild_cache,
+                             workers=args.load_workers,
+                             columnar=args.columnar)
 
     # Run the chosen subcommand.
-    if args.cmd == 'inspect':
-        inspect(database, pdes=args.pdes, name=args.name, verbose=args.verbose)
+    if args.cmd == 'inspect' and args.from_file:
+        inspect_batch(database, args.from_file, outfile=args.outfile,
+                      verbose=args.verbose)
+    elif args.cmd == 'inspect':
+        inspect(database, pdes=args.pdes, name=args.name, verbose=args.verbose,
+                prefix=args.name_prefix, fuzzy=args.fuzzy, limit=args.limit)
     elif args.cmd == 'query':
         query(database, args)
+    elif args.cmd == 'stats':
+        stats(database, args)
+    elif args.cmd == 'near':
+        near(database, args)
     elif args.cmd == 'interactive':
         NEOShell(database, inspect_parser, query_parser,
-                 aggressive=args.aggressive).cmdloop()
+                 aggressive=args.aggressive, stats_parser=stats_parser,
+                 near_parser=near_parser).cmdloop()
 
 
 if __name__ == '__main__':
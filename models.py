@@ -15,10 +15,16 @@ The functions that construct these objects use information extracted from the
 data files from NASA, so these objects should be able to handle all of the
 quirks of the data set, such as missing names and unknown diameters.
 
+Both classes declare `__slots__`, so a full catalog of hundreds of thousands of
+approaches doesn't carry a per-instance `__dict__`, and designations are
+interned, so each NEO and all of its approaches share a single string.
+
 You'll edit this file in Task 1.
 """
 from helpers import cd_to_datetime, datetime_to_str
+import datetime
 import math
+import sys
 
 
 class NearEarthObject:
@@ -34,6 +40,9 @@ class NearEarthObject:
     `NEODatabase` constructor.
     """
 
+    __slots__ = ('_designation', '_name', '_diameter', '_hazardous',
+                 '_approaches')
+
     def __init__(self, designation, name, diameter, hazardous):
         """Create a new `NearEarthObject`.
 
@@ -48,7 +57,7 @@ class NearEarthObject:
         if designation == "":
             raise NameError("value of 'designation' should never be empty")
         else:
-            self._designation = designation
+            self._designation = sys.intern(designation)
 
         if name == "":
             self._name = None
@@ -177,11 +186,14 @@ class CloseApproach:
     `NEODatabase` constructor.
     """
 
+    __slots__ = ('_designation', '_time', '_distance', '_velocity', '_neo')
+
     def __init__(self, designation, time=None, distance=0.0, velocity=0.0):
         """Create a new `CloseApproach`.
 
         :param time: The date and time, in UTC, at which the NEO passes
-            closest to Earth.
+            closest to Earth - either NASA's `cd` string or an already
+            parsed `datetime`.
         :param distance: The nominal approach distance, in astronomical units,
             of the NEO to Earth at the closest point.
         :param velocity: The velocity, in kilometers per second, of the NEO
@@ -192,7 +204,7 @@ class CloseApproach:
         if designation == "":
             raise NameError("Error: Wrong value of designation")
         else:
-            self._designation = designation
+            self._designation = sys.intern(designation)
 
         if velocity == "":
             raise NameError("Error: Wrong value of velocity")
@@ -201,6 +213,8 @@ class CloseApproach:
 
         if time == "":
             raise NameError("Error: Wrong value of time")
+        elif isinstance(time, datetime.datetime):
+            self._time = time
         else:
             self._time = cd_to_datetime(time)
 
@@ -0,0 +1,174 @@
+"""
+Search NEOs by a prefix or an approximate spelling of their name or
+designation.
+
+A `NameIndex` is built from the name and designation lookups of an
+`NEODatabase`. It keeps every (lowercased) name and designation in a sorted
+list, so the keys starting with a prefix form one contiguous range found by
+binary search, and it keeps posting lists of the character trigrams of every
+key, so the keys sharing the most trigrams with a misspelled query can be
+counted without comparing the query to every key. Those candidates are then
+ranked by their edit distance to the query.
+"""
+import array
+import bisect
+import collections
+
+
+def trigrams(text):
+    """Return the set of character trigrams of a padded, lowercased text.
+
+    The text is padded so that its first and last characters also start and
+    end trigrams, which lets short texts and prefixes match.
+
+    :param text: The text to split.
+    :return: A set of three-character strings.
+    """
+    padded = f'  {text.lower()} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b):
+    """Return the edit distance between two strings.
+
+    Insertions, deletions, substitutions and transpositions of adjacent
+    characters each count as one edit (the optimal string alignment
+    distance).
+
+    This is the bit-parallel algorithm of Myers, with the transposition
+    extension of Hyyrö: each column of the dynamic programming matrix is
+    encoded in the bits of a few integers, so the distance takes a handful of
+    integer operations per character of `b`, however long `a` is.
+
+    :param a: A string.
+    :param b: Another string.
+    :return: The smallest number of edits turning `a` into `b`.
+    """
+    if not a:
+        return len(b)
+    # The positions of each character of `a`, as a bit mask.
+    masks = {}
+    for i, char in enumerate(a):
+        masks[char] = masks.get(char, 0) | 1 << i
+
+    full = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+    positive, negative = full, 0
+    diagonal = previous_match = 0
+    distance = len(a)
+    for char in b:
+        match = masks.get(char, 0)
+        transposed = (((~diagonal) & match) << 1) & previous_match
+        diagonal = ((((match & positive) + positive) ^ positive)
+                    | match | negative | transposed)
+        horizontal_positive = negative | ~(diagonal | positive)
+        horizontal_negative = diagonal & positive
+        if horizontal_positive & last:
+            distance += 1
+        elif horizontal_negative & last:
+            distance -= 1
+        horizontal_positive = (horizontal_positive << 1) | 1
+        horizontal_negative <<= 1
+        positive = (horizontal_negative
+                    | ~(diagonal | horizontal_positive)) & full
+        negative = horizontal_positive & diagonal & full
+        previous_match = match
+    return distance
+
+
+class NameIndex:
+    """A prefix and fuzzy search index over NEO names and designations."""
+
+    # Number of candidates, per requested result, whose edit distance is
+    # computed during a fuzzy search.
+    CANDIDATES_PER_RESULT = 4
+
+    # Trigrams found in more than this fraction (as a divisor) of the keys
+    # are too common to select candidates.
+    COMMON_TRIGRAM_FRACTION = 16
+
+    def __init__(self, neos_by_name, neos_by_des):
+        """Create a new `NameIndex`.
+
+        :param neos_by_name: A dictionary mapping lowercased names to NEOs.
+        :param neos_by_des: A dictionary mapping designations to NEOs.
+        """
+        entries = sorted(
+            [(name, neo) for name, neo in neos_by_name.items()]
+            + [(designation.lower(), neo)
+               for designation, neo in neos_by_des.items()],
+            key=lambda entry: entry[0])
+        self._keys = [key for key, _ in entries]
+        self._neos = [neo for _, neo in entries]
+        # Trigram posting lists, built on the first fuzzy search.
+        self._postings = None
+
+    def __len__(self):
+        """Return the number of indexed names and designations."""
+        return len(self._keys)
+
+    def prefix(self, prefix, limit=10):
+        """Find the NEOs whose name or designation starts with a prefix.
+
+        The matching is case-insensitive.
+
+        :param prefix: The beginning of a name or designation.
+        :param limit: The maximum number of NEOs to return, or None.
+        :return: A list of matching `NearEarthObject`s, in alphabetical order
+            of their matching name or designation.
+        """
+        prefix = prefix.lower()
+        keys = self._keys
+        results = []
+        for i in range(bisect.bisect_left(keys, prefix), len(keys)):
+            if len(results) == limit or not keys[i].startswith(prefix):
+                break
+            if all(self._neos[i] is not neo for neo in results):
+                results.append(self._neos[i])
+        return results
+
+    def fuzzy(self, query, limit=10):
+        """Find the NEOs whose name or designation is closest to a query.
+
+        The keys sharing the most (rare enough) trigrams with the query are
+        the candidates, and the candidates are ranked by their edit distance
+        to the query (ties are broken by the number of shared trigrams, then
+        alphabetically).
+
+        :param query: An approximate name or designation.
+        :param limit: The maximum number of NEOs to return, or None to rank
+            every candidate.
+        :return: A list of (`NearEarthObject`, edit distance) tuples, from the
+            closest match to the farthest.
+        """
+        query = query.lower()
+        if self._postings is None:
+            postings = collections.defaultdict(lambda: array.array('l'))
+            for i, key in enumerate(self._keys):
+                for trigram in trigrams(key):
+                    postings[trigram].append(i)
+            self._postings = dict(postings)
+
+        # Trigrams shared by a large fraction of the keys (such as the year
+        # of most designations) say little about a key, and counting their
+        # postings would dominate the search, so only the rarest trigrams
+        # (at least one of them) are counted.
+        postings = sorted((self._postings.get(trigram, ())
+                           for trigram in trigrams(query)), key=len)
+        common = max(len(self._keys) // self.COMMON_TRIGRAM_FRACTION, 1)
+        shared = collections.Counter()
+        for i, posting in enumerate(postings):
+            if i and len(posting) > common:
+                break
+            shared.update(posting)
+        candidates = (None if limit is None
+                      else limit * self.CANDIDATES_PER_RESULT)
+        distances = {}
+        for i, count in shared.most_common(candidates):
+            key, neo = self._keys[i], self._neos[i]
+            rank = (edit_distance(query, key), -count, key)
+            if neo not in distances or rank < distances[neo]:
+                distances[neo] = rank
+
+        ranked = sorted(distances.items(), key=lambda item: item[1])
+        return [(neo, rank[0]) for neo, rank in ranked[:limit]]
@@ -0,0 +1,190 @@
+"""
+Encode and decode the binary columnar format of close approaches.
+
+A columnar file (`.neocol`) holds the columns of a stream of close approaches
+as packed, typed arrays, which can be read back without parsing any text. It
+starts with `COLUMNAR_MAGIC` and a header, a length-prefixed JSON document
+listing the name and type of each column. A sequence of batches follows, each
+holding:
+
+- the number of rows of the batch, as a little-endian uint32;
+- for each `string` column, the values it adds to the column's dictionary:
+  their number, their UTF-8 byte lengths and their concatenated bytes;
+- the packed values of each column, in header order.
+
+Dictionary codes refer to the values added by all the batches so far, so each
+designation and name is stored once per file.
+
+The `write_columns` function encodes a stream of close approaches to an open
+binary file, and the `read_columns` function decodes one back. Opening (and
+compressing) the files is left to `write.write_to_columnar` and
+`extract.load_columnar`.
+"""
+import array
+import datetime
+import itertools
+import json
+import struct
+import sys
+
+
+# Leading bytes of every columnar file, including the format version.
+COLUMNAR_MAGIC = b'NEOCOL\x00\x01'
+
+# The columns of the columnar output of close approaches, with their types
+# and how to get them from a `CloseApproach`. Times are whole minutes since
+# 1970-01-01 00:00 UTC, and the `string` columns are dictionary-encoded.
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MINUTE = datetime.timedelta(minutes=1)
+_COLUMNS = (
+    ('datetime_utc', 'int64',
+     lambda result: (result.time - _EPOCH) // _MINUTE),
+    ('distance_au', 'float64', lambda result: result.distance),
+    ('velocity_km_s', 'float64', lambda result: result.velocity),
+    ('designation', 'string', lambda result: result.designation),
+    ('name', 'string', lambda result: result.neo.name),
+    ('diameter_km', 'float64', lambda result: result.neo.diameter),
+    ('potentially_hazardous', 'bool', lambda result: result.neo.hazardous),
+)
+
+# The `array` typecode in which each column type is stored, little-endian.
+# A `string` column is stored as the int64 codes of its values (-1 for
+# None) in the column's dictionary.
+COLUMNAR_TYPECODES = {'int64': 'q', 'float64': 'd', 'bool': 'b',
+                      'string': 'q'}
+
+
+def write_columns(results, columnar_fl, batch_size):
+    """Encode an iterable of `CloseApproach` objects to a columnar file.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param columnar_fl: A binary file object, open for writing.
+    :param batch_size: The number of rows per batch.
+    """
+    header = json.dumps({
+        'columns': [[name, kind] for name, kind, _ in _COLUMNS],
+        'time_unit': 'minutes since 1970-01-01 00:00 UTC',
+    }).encode()
+    dictionaries = {name: {} for name, kind, _ in _COLUMNS
+                    if kind == 'string'}
+    results = iter(results)
+    columnar_fl.write(COLUMNAR_MAGIC)
+    columnar_fl.write(struct.pack('<I', len(header)) + header)
+    for batch in iter(lambda: list(itertools.islice(results, batch_size)),
+                      []):
+        columnar_fl.write(_encode_batch(batch, dictionaries))
+
+
+def _encode_batch(batch, dictionaries):
+    """Encode a batch of `CloseApproach`es in the columnar format.
+
+    :param batch: A list of `CloseApproach` objects.
+    :param dictionaries: A dictionary mapping the name of each `string` column
+        to a dictionary of the codes of its values, updated in place.
+    :return: The bytes of the batch.
+    """
+    chunks = [struct.pack('<I', len(batch))]
+    columns = []
+    for name, kind, get in _COLUMNS:
+        values = [get(result) for result in batch]
+        if kind == 'string':
+            codes, added = _dictionary_encode(values, dictionaries[name])
+            encoded = [value.encode() for value in added]
+            chunks.append(struct.pack('<I', len(encoded)))
+            chunks.append(_little_endian(array.array(
+                'q', [len(value) for value in encoded])))
+            chunks.append(b''.join(encoded))
+            columns.append(_little_endian(codes))
+        else:
+            columns.append(_little_endian(
+                array.array(COLUMNAR_TYPECODES[kind], values)))
+    return b''.join(chunks + columns)
+
+
+def _dictionary_encode(values, dictionary):
+    """Replace values with their codes in a dictionary, extending it.
+
+    :param values: A list of strings or None.
+    :param dictionary: A dictionary mapping values to their codes.
+    :return: A tuple of an `array.array` of the codes (-1 for None) and the
+        list of values added to the dictionary, in code order.
+    """
+    codes = array.array('q')
+    added = []
+    for value in values:
+        if value is None:
+            codes.append(-1)
+            continue
+        code = dictionary.get(value)
+        if code is None:
+            code = dictionary[value] = len(dictionary)
+            added.append(value)
+        codes.append(code)
+    return codes, added
+
+
+def _little_endian(column):
+    """Return the bytes of an `array.array`, in little-endian order."""
+    if sys.byteorder == 'big':
+        column = array.array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def read_columns(columnar_fl, name):
+    """Decode the columns of close approaches from a columnar file.
+
+    :param columnar_fl: A binary file object, open for reading.
+    :param name: The name of the file, for error messages.
+    :return: A tuple of a dictionary mapping each column name to an
+      `array.array` of its values, and a dictionary mapping the name of each
+      `string` column to the list of its values, indexed by the codes in the
+      column (a code of -1 stands for a missing value).
+    :raises ValueError: If the file isn't a valid columnar file.
+    """
+    if columnar_fl.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+        raise ValueError(f'{name} is not a columnar file.')
+    try:
+        return _read_batches(columnar_fl)
+    except (KeyError, TypeError, ValueError, struct.error) as error:
+        raise ValueError(f'{name} is corrupt: {error}') from error
+
+
+def _read_batches(columnar_fl):
+    """Read the header and the batches of a columnar file."""
+    def read(size):
+        data = columnar_fl.read(size)
+        if len(data) != size:
+            raise ValueError('unexpected end of file')
+        return data
+
+    def read_count():
+        return struct.unpack('<I', read(4))[0]
+
+    def read_array(typecode, count):
+        column = array.array(typecode)
+        column.frombytes(read(count * column.itemsize))
+        if sys.byteorder == 'big':
+            column.byteswap()
+        return column
+
+    header = json.loads(read(read_count()))
+    kinds = dict(header['columns'])
+    columns = {name: array.array(COLUMNAR_TYPECODES[kind])
+               for name, kind in kinds.items()}
+    dictionaries = {name: [] for name, kind in kinds.items()
+                    if kind == 'string'}
+    for prefix in iter(lambda: columnar_fl.read(4), b''):
+        if len(prefix) != 4:
+            raise ValueError('unexpected end of file')
+        rows = struct.unpack('<I', prefix)[0]
+        for values in dictionaries.values():
+            lengths = read_array('q', read_count())
+            data = read(sum(lengths))
+            offset = 0
+            for length in lengths:
+                values.append(data[offset:offset + length].decode())
+                offset += length
+        for name, column in columns.items():
+            column.extend(read_array(column.typecode, rows))
+    return columns, dictionaries
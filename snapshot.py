@@ -0,0 +1,166 @@
+"""
+Cache a fully linked NEO database in a compact binary snapshot file.
+
+Parsing `neos.csv` and `cad.json` dominates the wall time of a one-shot
+`inspect` or `query` invocation. A snapshot stores the already extracted NEOs
+and close approaches (including which NEO each approach belongs to) as a few
+packed columns, so a later run can rebuild the `NEODatabase` without touching
+the text parsers at all.
+
+Each snapshot is keyed by a fingerprint of its source files - their size,
+modification time and a hash of their content. A snapshot whose fingerprint
+doesn't match the current source files is stale and is simply rebuilt.
+
+The `fingerprint` function computes the key for a set of source files, the
+`write_snapshot` function saves NEOs and approaches to a snapshot file, and the
+`read_snapshot` function loads them back.
+"""
+import array
+import datetime
+import hashlib
+import marshal
+import os
+import sys
+
+from models import NearEarthObject, CloseApproach
+
+
+# Leading bytes of every snapshot file, including the format version.
+MAGIC = b'NEOSNAP\x01'
+
+# Approach times are stored as whole minutes since this (naive, UTC) epoch.
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MINUTE = datetime.timedelta(minutes=1)
+
+# Size of the blocks fed to the hash function.
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+class SnapshotError(Exception):
+    """A snapshot file is missing, stale or can't be decoded."""
+
+
+def fingerprint(*paths):
+    """Compute a fingerprint of a collection of source files.
+
+    The fingerprint holds, for each file, its resolved path, its size, its
+    modification time and a BLAKE2 hash of its content.
+
+    :param paths: Path-like objects pointing to the source files.
+    :return: A tuple that compares equal only for unchanged source files.
+    """
+    result = []
+    for path in paths:
+        stat = os.stat(path)
+        digest = hashlib.blake2b(digest_size=20)
+        with open(path, 'rb') as source:
+            for block in iter(lambda: source.read(_HASH_BLOCK_SIZE), b''):
+                digest.update(block)
+        result.append((os.path.realpath(path), stat.st_size,
+                       stat.st_mtime_ns, digest.hexdigest()))
+    return tuple(result)
+
+
+def write_snapshot(path, neos, approaches, source_fingerprint,
+                   parse_seconds=0.0):
+    """Write NEOs and their close approaches to a snapshot file.
+
+    The snapshot is written to a temporary file first and then moved into
+    place, so a concurrent reader never sees a partially written snapshot.
+
+    :param path: A Path-like object pointing to where the snapshot should
+        be saved.
+    :param neos: A collection of `NearEarthObject`s.
+    :param approaches: A collection of `CloseApproach`es of those NEOs.
+    :param source_fingerprint: The `fingerprint` of the source files.
+    :param parse_seconds: How long it took to parse the source files, so a
+        later load can report the time it saved.
+    """
+    neos = list(neos)
+    neo_index = {neo.designation: i for i, neo in enumerate(neos)}
+
+    approach_neo = array.array('l')
+    approach_time = array.array('q')
+    distances = array.array('d')
+    velocities = array.array('d')
+    for approach in approaches:
+        approach_neo.append(neo_index[approach.designation])
+        approach_time.append((approach.time - _EPOCH) // _MINUTE)
+        distances.append(approach.distance)
+        velocities.append(approach.velocity)
+
+    header = {'python': tuple(sys.version_info[:2]),
+              'fingerprint': source_fingerprint,
+              'parse_seconds': parse_seconds}
+    payload = ([neo.designation for neo in neos],
+               [neo.name for neo in neos],
+               array.array('d', (neo.diameter for neo in neos)).tobytes(),
+               bytes(neo.hazardous for neo in neos),
+               approach_neo.tobytes(),
+               approach_time.tobytes(),
+               distances.tobytes(),
+               velocities.tobytes())
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temporary = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(temporary, 'wb') as snapshot_fl:
+            snapshot_fl.write(MAGIC)
+            marshal.dump(header, snapshot_fl)
+            marshal.dump(payload, snapshot_fl)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def read_snapshot(path, source_fingerprint):
+    """Read NEOs and their close approaches from a snapshot file.
+
+    The returned objects haven't been linked yet, exactly as if they had just
+    been returned by `extract.load_neos` and `extract.load_approaches`.
+
+    :param path: A Path-like object pointing to the snapshot file.
+    :param source_fingerprint: The `fingerprint` of the current source files.
+    :return: A tuple of the list of `NearEarthObject`s, the list of
+        `CloseApproach`es and the number of seconds the original parse took.
+    :raises SnapshotError: If the snapshot is missing, stale or corrupt.
+    """
+    try:
+        with open(path, 'rb') as snapshot_fl:
+            if snapshot_fl.read(len(MAGIC)) != MAGIC:
+                raise SnapshotError(f'{path} is not a database snapshot.')
+            header = marshal.load(snapshot_fl)
+            if header['python'] != tuple(sys.version_info[:2]):
+                raise SnapshotError(f'{path} was written by another Python.')
+            if header['fingerprint'] != source_fingerprint:
+                raise SnapshotError(f'{path} is stale.')
+            (designations, names, diameters, hazardous, approach_neo,
+             approach_time, distances, velocities) = marshal.load(snapshot_fl)
+    except FileNotFoundError as error:
+        raise SnapshotError(f'{path} does not exist.') from error
+    except (EOFError, ValueError, TypeError, KeyError) as error:
+        raise SnapshotError(f'{path} is corrupt: {error}') from error
+
+    neos = [NearEarthObject(designation, name, diameter,
+                            'Y' if is_hazardous else 'N')
+            for designation, name, diameter, is_hazardous
+            in zip(designations, names, _unpack('d', diameters), hazardous)]
+
+    approaches = [CloseApproach(designations[neo_i],
+                                _EPOCH + minutes * _MINUTE,
+                                distance, velocity)
+                  for neo_i, minutes, distance, velocity
+                  in zip(_unpack('l', approach_neo),
+                         _unpack('q', approach_time),
+                         _unpack('d', distances),
+                         _unpack('d', velocities))]
+
+    return neos, approaches, header['parse_seconds']
+
+
+def _unpack(typecode, data):
+    """Unpack the bytes of a packed column into an `array.array`."""
+    column = array.array(typecode)
+    column.frombytes(data)
+    return column
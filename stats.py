@@ -0,0 +1,221 @@
+"""
+Summarize a stream of close approaches in a single pass.
+
+The `summarize` function consumes a stream of `CloseApproach` objects (such as
+the output of `NEODatabase.query`) once, and accumulates, for each group of
+approaches, the count and the minimum, maximum, mean and percentiles of their
+distances and velocities. Groups are formed by one of the keys in
+`GROUP_KEYS` - the year or month of the approach, its NEO, or whether that NEO
+is potentially hazardous - or the whole stream is a single group.
+
+Memory stays constant per group: each `Summary` holds a handful of running
+values, and percentiles are estimated with the P-square algorithm
+(`P2Quantile`) instead of keeping every value.
+
+The `format_table` function renders the summaries as a text table, and
+`summaries_to_json` as a JSON-compatible structure.
+"""
+import math
+
+
+# Ways to group approaches, mapped to a function computing an approach's group.
+GROUP_KEYS = {
+    'year': lambda approach: approach.time.year,
+    'month': lambda approach: f'{approach.time.year:04d}-'
+                              f'{approach.time.month:02d}',
+    'neo': lambda approach: approach.neo.fullname,
+    'hazardous': lambda approach: approach.neo.hazardous,
+}
+
+# The summarized attributes, mapped to their output names.
+ATTRIBUTES = {
+    'distance_au': lambda approach: approach.distance,
+    'velocity_km_s': lambda approach: approach.velocity,
+}
+
+
+class P2Quantile:
+    """A constant-memory running estimate of one quantile of a stream.
+
+    This is the P-square algorithm of Jain and Chlamtac (1985): five markers
+    track the minimum, the maximum, the desired quantile and two quantiles
+    halfway to the extremes, and are adjusted with a piecewise-parabolic
+    interpolation as values arrive. Until five values have been seen, the
+    quantile is computed exactly.
+    """
+
+    def __init__(self, p):
+        """Create a new `P2Quantile`.
+
+        :param p: The quantile to estimate, between 0 and 1.
+        """
+        self.p = p
+        self._heights = []
+        self._positions = [1, 2, 3, 4, 5]
+        self._desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self._increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, value):
+        """Add a value of the stream to the estimate."""
+        heights = self._heights
+        if len(heights) < 5:
+            heights.append(value)
+            heights.sort()
+            return
+
+        if value < heights[0]:
+            heights[0] = value
+            k = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            k = 3
+        else:
+            k = 0
+            while value >= heights[k + 1]:
+                k += 1
+
+        positions = self._positions
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        for i in range(1, 4):
+            offset = self._desired[i] - positions[i]
+            if ((offset >= 1 and positions[i + 1] - positions[i] > 1)
+                    or (offset <= -1
+                        and positions[i - 1] - positions[i] < -1)):
+                step = 1 if offset > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = (heights[i]
+                              + step * (heights[i + step] - heights[i])
+                              / (positions[i + step] - positions[i]))
+                heights[i] = height
+                positions[i] += step
+
+    def _parabolic(self, i, step):
+        """Return the piecewise-parabolic adjustment of marker `i`."""
+        q, n = self._heights, self._positions
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    @property
+    def value(self):
+        """Return the current estimate, or NaN if no value was added."""
+        heights = self._heights
+        if not heights:
+            return float('nan')
+        if len(heights) < 5 or self._positions[4] == 5:
+            # Interpolate exactly between the (at most five) sorted values.
+            rank = self.p * (len(heights) - 1)
+            below = math.floor(rank)
+            above = min(below + 1, len(heights) - 1)
+            return heights[below] + (heights[above] - heights[below]) * (
+                rank - below)
+        return heights[2]
+
+
+class Summary:
+    """Running count, minimum, maximum, mean and percentiles of values."""
+
+    def __init__(self, percentiles=(50, 90)):
+        """Create a new, empty `Summary`.
+
+        :param percentiles: The percentiles (between 0 and 100) to estimate.
+        """
+        self.count = 0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.total = 0.0
+        self._quantiles = {percentile: P2Quantile(percentile / 100)
+                           for percentile in percentiles}
+
+    def add(self, value):
+        """Add a value to the summary."""
+        self.count += 1
+        self.total += value
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+        for quantile in self._quantiles.values():
+            quantile.add(value)
+
+    @property
+    def mean(self):
+        """Return the mean of the values, or NaN if there are none."""
+        return self.total / self.count if self.count else float('nan')
+
+    def serialize(self):
+        """Return a dictionary of the summary statistics."""
+        result = {'min': self.minimum, 'max': self.maximum, 'mean': self.mean}
+        for percentile, quantile in self._quantiles.items():
+            result[f'p{percentile:g}'] = quantile.value
+        return result
+
+
+def summarize(approaches, group_by=None, percentiles=(50, 90)):
+    """Summarize the distances and velocities of a stream of approaches.
+
+    :param approaches: An iterable of `CloseApproach` objects.
+    :param group_by: A key of `GROUP_KEYS`, or None for a single group.
+    :param percentiles: The percentiles (between 0 and 100) to estimate.
+    :return: A dictionary mapping each group, in sorted order, to a
+        dictionary mapping each name in `ATTRIBUTES` to its `Summary`.
+    """
+    get_group = GROUP_KEYS[group_by] if group_by else (lambda approach: 'all')
+    groups = {}
+    for approach in approaches:
+        group = get_group(approach)
+        summaries = groups.get(group)
+        if summaries is None:
+            summaries = groups[group] = {name: Summary(percentiles)
+                                         for name in ATTRIBUTES}
+        for name, get in ATTRIBUTES.items():
+            summaries[name].add(get(approach))
+    return {group: groups[group] for group in sorted(groups)}
+
+
+def summaries_to_json(summaries, group_by=None):
+    """Convert the output of `summarize` into a JSON-compatible structure.
+
+    :param summaries: The dictionary returned by `summarize`.
+    :param group_by: The key the approaches were grouped by, or None.
+    :return: A dictionary with the grouping and a list of groups.
+    """
+    groups = []
+    for group, attributes in summaries.items():
+        entry = {'group': group,
+                 'count': next(iter(attributes.values())).count}
+        for name, summary in attributes.items():
+            entry[name] = summary.serialize()
+        groups.append(entry)
+    return {'group_by': group_by, 'groups': groups}
+
+
+def format_table(summaries, group_by=None):
+    """Render the output of `summarize` as a human-readable text table.
+
+    :param summaries: The dictionary returned by `summarize`.
+    :param group_by: The key the approaches were grouped by, or None.
+    :return: The table, as a string of lines.
+    """
+    groups = summaries_to_json(summaries, group_by)['groups']
+    stats = list(groups[0]['distance_au']) if groups else []
+    header = [group_by or 'group', 'count'] + [
+        f'{name.split("_")[0][:4]}_{stat}'
+        for name in ATTRIBUTES for stat in stats]
+    rows = [header]
+    for entry in groups:
+        row = [str(entry['group']), str(entry['count'])]
+        for name in ATTRIBUTES:
+            row.extend(f'{value:.4g}' for value in entry[name].values())
+        rows.append(row)
+
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    return '\n'.join(' '.join(cell.rjust(width) if i else cell.ljust(width)
+                              for i, (cell, width)
+                              in enumerate(zip(row, widths)))
+                     for row in rows)
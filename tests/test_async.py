@@ -0,0 +1,127 @@
+"""Check that the database can be queried and written from asyncio code.
+
+`NEODatabase.aquery` streams the same matches as `query`, chunk by chunk, and
+supports a deadline and cancellation. The `awrite_to_csv` and `awrite_to_json`
+coroutines produce the same files as their synchronous counterparts.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_async
+"""
+import asyncio
+import concurrent.futures
+import datetime
+import pathlib
+import tempfile
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from write import write_to_csv, write_to_json, awrite_to_csv, awrite_to_json
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+async def collect(stream):
+    return [item async for item in stream]
+
+
+class TestAsyncQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE),
+                             load_approaches(TEST_CAD_FILE), cache_entries=0)
+        cls.filters = create_filters(start_date=datetime.date(2020, 6, 1),
+                                     distance_max=0.2)
+
+    def test_aquery_matches_query(self):
+        expected = list(self.db.query(self.filters))
+        results = asyncio.run(collect(self.db.aquery(self.filters,
+                                                     chunk_size=16)))
+        self.assertGreater(len(expected), 16)
+        self.assertEqual(results, expected)
+
+    def test_aquery_limit(self):
+        results = asyncio.run(collect(self.db.aquery(self.filters, limit=5,
+                                                     chunk_size=2)))
+        self.assertEqual(results, list(self.db.query(self.filters))[:5])
+
+    def test_concurrent_aqueries(self):
+        other = create_filters(velocity_min=20)
+
+        async def both():
+            return await asyncio.gather(
+                collect(self.db.aquery(self.filters, chunk_size=8)),
+                collect(self.db.aquery(other, chunk_size=8)))
+
+        first, second = asyncio.run(both())
+        self.assertEqual(first, list(self.db.query(self.filters)))
+        self.assertEqual(second, list(self.db.query(other)))
+
+    def test_aquery_deadline(self):
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(collect(self.db.aquery(self.filters, timeout=0)))
+
+    def test_aquery_cancellation(self):
+        async def cancel():
+            task = asyncio.ensure_future(
+                collect(self.db.aquery(chunk_size=1)))
+            await asyncio.sleep(0)
+            task.cancel()
+            await task
+
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(cancel())
+        self.assertEqual(len(list(self.db.query(self.filters))),
+                         len(asyncio.run(collect(self.db.aquery(self.filters)))))
+
+
+class TestAsyncWrite(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE),
+                             load_approaches(TEST_CAD_FILE))
+        cls.filters = create_filters(distance_max=0.05)
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = pathlib.Path(self.tmp.name)
+
+    def assertSameOutput(self, write, awrite, suffix, **kwargs):
+        expected, actual = (self.root / f'expected{suffix}',
+                            self.root / f'actual{suffix}')
+        write(self.db.query(self.filters), expected)
+        asyncio.run(awrite(self.db.aquery(self.filters), actual, **kwargs))
+        self.assertEqual(actual.read_bytes(), expected.read_bytes())
+
+    def test_awrite_to_csv_matches_write_to_csv(self):
+        self.assertSameOutput(write_to_csv, awrite_to_csv, '.csv',
+                              batch_size=7)
+
+    def test_awrite_to_json_matches_write_to_json(self):
+        self.assertSameOutput(write_to_json, awrite_to_json, '.json',
+                              batch_size=7)
+
+    def test_awrite_closes_the_file_on_the_executor(self):
+        class RecordingExecutor(concurrent.futures.ThreadPoolExecutor):
+            def submit(self, fn, *args, **kwargs):
+                calls.append(getattr(fn, '__name__', None))
+                return super().submit(fn, *args, **kwargs)
+
+        for awrite, suffix in ((awrite_to_csv, '.csv'),
+                               (awrite_to_json, '.json')):
+            calls = []
+            with RecordingExecutor(1) as executor:
+                asyncio.run(awrite(self.db.aquery(self.filters),
+                                   self.root / f'closed{suffix}',
+                                   executor=executor))
+            self.assertEqual(calls[-1], 'close')
+
+
+if __name__ == '__main__':
+    unittest.main()
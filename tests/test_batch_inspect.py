@@ -0,0 +1,120 @@
+"""Check that a watch list of NEOs can be inspected in a single run.
+
+The `inspect_batch` function resolves each listed designation or name, and
+reports the entries that don't match any NEO. The `write_neos_to_csv` and
+`write_neos_to_json` functions save the matching NEOs with all of their close
+approaches.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_batch_inspect
+"""
+import contextlib
+import csv
+import io
+import json
+import pathlib
+import tempfile
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from main import inspect_batch, make_parser, check_inspect_args
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+WATCH_LIST = """\
+# A watch list.
+99942
+2020 AB2
+
+apophis
+not an NEO
+"""
+
+
+class TestInspectBatch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE),
+                             load_approaches(TEST_CAD_FILE))
+        cls.neos = [cls.db.get_neo_by_designation('99942'),
+                    cls.db.get_neo_by_designation('2020 AB2'),
+                    cls.db.get_neo_by_name('Apophis')]
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = pathlib.Path(self.tmp.name)
+        self.watch_list = self.root / 'watchlist.txt'
+        self.watch_list.write_text(WATCH_LIST)
+
+    def inspect_batch(self, outfile=None):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), \
+                contextlib.redirect_stderr(stderr):
+            misses = inspect_batch(self.db, self.watch_list, outfile)
+        return misses, stdout.getvalue(), stderr.getvalue()
+
+    def test_resolves_designations_and_names(self):
+        misses, stdout, stderr = self.inspect_batch()
+        self.assertEqual(misses, ['not an NEO'])
+        self.assertEqual(stdout.splitlines(), [str(neo) for neo in self.neos])
+        self.assertIn('- not an NEO', stderr)
+
+    def test_writes_neos_with_approaches_to_csv(self):
+        outfile = self.root / 'watchlist.csv'
+        self.inspect_batch(outfile)
+        with open(outfile) as infile:
+            rows = list(csv.DictReader(infile))
+        self.assertEqual(len(rows),
+                         sum(len(neo.approaches) for neo in self.neos))
+        self.assertEqual(rows[0]['designation'], '99942')
+        self.assertEqual(rows[0]['name'], 'Apophis')
+        self.assertEqual(rows[0]['datetime_utc'],
+                         self.neos[0].approaches[0].time_str)
+
+    def test_writes_neos_with_approaches_to_json(self):
+        outfile = self.root / 'watchlist.json'
+        self.inspect_batch(outfile)
+        with open(outfile) as infile:
+            data = json.load(infile)
+        self.assertEqual([neo['designation'] for neo in data],
+                         ['99942', '2020 AB2', '99942'])
+        self.assertEqual(len(data[1]['approaches']),
+                         len(self.neos[1].approaches))
+        self.assertEqual(set(data[1]['approaches'][0]),
+                         {'datetime_utc', 'distance_au', 'velocity_km_s'})
+
+    def test_unsupported_outfile_is_rejected(self):
+        misses, _, stderr = self.inspect_batch(self.root / 'watchlist.txt2')
+        self.assertIsNone(misses)
+        self.assertIn('.csv', stderr)
+
+    def test_read_and_write_errors_are_told_apart(self):
+        self.watch_list.unlink()
+        misses, _, stderr = self.inspect_batch()
+        self.assertIsNone(misses)
+        self.assertIn(f'Unable to read NEOs from {self.watch_list}', stderr)
+
+        self.watch_list.write_text(WATCH_LIST)
+        outfile = self.root / 'missing' / 'watchlist.csv'
+        misses, _, stderr = self.inspect_batch(outfile)
+        self.assertIsNone(misses)
+        self.assertIn(f'Unable to write NEOs to {outfile}', stderr)
+
+    def test_outfile_requires_from_file(self):
+        inspect_parser = make_parser()[1]
+        args = inspect_parser.parse_args(['--pdes', '433', '--outfile',
+                                          'neo.csv'])
+        with contextlib.redirect_stderr(io.StringIO()) as stderr, \
+                self.assertRaises(SystemExit):
+            check_inspect_args(inspect_parser, args)
+        self.assertIn('--from-file', stderr.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""Check that query results are cached, bounded and reused correctly.
+
+A `QueryCache` evicts its least recently used entries to stay within its entry
+and byte limits. An `NEODatabase` caches the positions matched by a fully
+consumed query under an order-independent key of its filters, and streams a
+repeated query from the cache.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_cache
+"""
+import array
+import datetime
+import pathlib
+import unittest
+
+from cache import QueryCache, filters_key
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, limit
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestQueryCache(unittest.TestCase):
+    def test_get_counts_hits_and_misses(self):
+        cache = QueryCache()
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', [1, 2])
+        self.assertEqual(list(cache.get('a')), [1, 2])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_entry_limit_evicts_least_recently_used(self):
+        cache = QueryCache(max_entries=2)
+        cache.put('a', [1])
+        cache.put('b', [2])
+        cache.get('a')
+        cache.put('c', [3])
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_byte_limit_evicts_and_rejects(self):
+        itemsize = array.array('l').itemsize
+        cache = QueryCache(max_bytes=8 * itemsize)
+        cache.put('a', range(5))
+        cache.put('b', range(5))
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.nbytes, 5 * itemsize)
+        cache.put('c', range(9))
+        self.assertIsNone(cache.get('c'))
+
+    def test_filters_key_ignores_order(self):
+        filters = create_filters(distance_max=0.1, velocity_min=5)
+        self.assertEqual(filters_key(filters), filters_key(filters[::-1]))
+        self.assertNotEqual(filters_key(filters), filters_key(filters[:1]))
+
+
+class TestCachedQuery(unittest.TestCase):
+    def setUp(self):
+        self.approaches = load_approaches(TEST_CAD_FILE)
+        self.db = NEODatabase(load_neos(TEST_NEO_FILE), self.approaches)
+        self.filters = create_filters(start_date=datetime.date(2020, 3, 1),
+                                      distance_max=0.1)
+
+    def test_repeated_query_is_served_from_cache(self):
+        first = list(self.db.query(self.filters))
+        second = list(self.db.query(self.filters[::-1]))
+        self.assertGreater(len(first), 0)
+        self.assertEqual(first, second)
+        self.assertEqual((self.db.cache.hits, self.db.cache.misses), (1, 1))
+
+    def test_limited_query_does_not_populate_cache(self):
+        limited = list(limit(self.db.query(self.filters), 3))
+        self.assertEqual(len(limited), 3)
+        self.assertEqual(len(self.db.cache), 0)
+
+        full = list(self.db.query(self.filters))
+        self.assertEqual(full[:3], limited)
+        self.assertEqual(list(limit(self.db.query(self.filters), 3)), limited)
+        self.assertEqual(self.db.cache.hits, 1)
+
+    def test_disabled_cache(self):
+        db = NEODatabase(load_neos(TEST_NEO_FILE), self.approaches,
+                         cache_entries=0)
+        list(db.query(self.filters))
+        self.assertEqual(len(db.cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
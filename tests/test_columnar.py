@@ -0,0 +1,51 @@
+"""Check that the columnar query engine matches the default query engine.
+
+Every test from `tests.test_query` is re-run against an `NEODatabase` that
+answers queries with the NumPy-based `ColumnarEngine`. These tests are skipped
+when NumPy isn't installed.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_columnar
+"""
+import operator
+import unittest
+
+from columnar import numpy
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import AttributeFilter, create_filters
+from tests import test_query
+
+
+class OddVelocityFilter(AttributeFilter):
+    @classmethod
+    def get(cls, approach):
+        return int(approach.velocity) % 2
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed.")
+class TestColumnarQuery(test_query.TestQuery):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(test_query.TEST_NEO_FILE)
+        cls.approaches = load_approaches(test_query.TEST_CAD_FILE)
+        cls.db = NEODatabase(cls.neos, cls.approaches, columnar=True)
+
+    def test_query_preserves_internal_order(self):
+        filters = create_filters(distance_max=0.05, hazardous=False)
+        expected = [approach for approach in self.approaches
+                    if all(f(approach) for f in filters)]
+        self.assertEqual(list(self.db.query(filters)), expected)
+
+    def test_query_checks_custom_filters(self):
+        filters = create_filters(velocity_min=10) + [
+            OddVelocityFilter(operator.eq, 1)]
+        expected = [approach for approach in self.approaches
+                    if all(f(approach) for f in filters)]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(list(self.db.query(filters)), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
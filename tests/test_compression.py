@@ -0,0 +1,154 @@
+"""Check that compressed data files and output files are handled transparently.
+
+Inputs compressed with gzip, bzip2 or xz are recognized by their leading bytes
+and must load exactly like the uncompressed files, and outputs whose name ends
+with `.gz`, `.bz2` or `.xz` must decompress to exactly the uncompressed output.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_compression
+"""
+import bz2
+import gzip
+import lzma
+import pathlib
+import tempfile
+import unittest
+
+from compression import (CODECS, sniff_codec, suffix_codec, format_suffix,
+                         open_codec)
+from database import NEODatabase
+from extract import load_neos, load_approaches, load_columnar
+from filters import create_filters
+from write import (write_to_csv, write_to_json, write_to_ndjson,
+                   write_to_columnar)
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+MODULES = {'gzip': gzip, 'bz2': bz2, 'xz': lzma}
+
+
+class TestDetection(unittest.TestCase):
+    def test_suffix_codec(self):
+        self.assertEqual(suffix_codec('results.csv.gz'), 'gzip')
+        self.assertEqual(suffix_codec(pathlib.Path('a/b.json.BZ2')), 'bz2')
+        self.assertEqual(suffix_codec('results.neocol.xz'), 'xz')
+        self.assertIsNone(suffix_codec('results.csv'))
+        self.assertIsNone(suffix_codec(None))
+
+    def test_format_suffix(self):
+        self.assertEqual(format_suffix('results.csv.gz'), '.csv')
+        self.assertEqual(format_suffix('results.ndjson'), '.ndjson')
+        self.assertEqual(format_suffix('results.gz'), '')
+
+    def test_invalid_level(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaises(ValueError):
+                open_codec('bz2', pathlib.Path(tmp) / 'a.bz2', 'w', level=0)
+
+
+class TestCompressedInputs(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.root = pathlib.Path(cls.tmp.name)
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def compress(self, path, codec):
+        # The name hides the codec, so it can only be sniffed.
+        compressed = self.root / f'{codec}-{path.name}'
+        compressed.write_bytes(MODULES[codec].compress(path.read_bytes()))
+        self.assertEqual(sniff_codec(compressed), codec)
+        return compressed
+
+    def test_uncompressed_files_are_not_sniffed(self):
+        self.assertIsNone(sniff_codec(TEST_NEO_FILE))
+        self.assertIsNone(sniff_codec(TEST_CAD_FILE))
+
+    def test_load_neos(self):
+        for codec in CODECS:
+            with self.subTest(codec=codec):
+                neos = load_neos(self.compress(TEST_NEO_FILE, codec))
+                self.assertEqual([(neo.designation, neo.name, neo.hazardous)
+                                  for neo in neos],
+                                 [(neo.designation, neo.name, neo.hazardous)
+                                  for neo in self.neos])
+
+    def test_load_neos_keeps_quoted_line_breaks(self):
+        source = self.root / 'quoted.csv'
+        source.write_bytes(b'pdes,name,pha,diameter\r\n'
+                           b'2101,"Two\r\nLines",Y,0.6\r\n')
+        for codec in CODECS:
+            with self.subTest(codec=codec):
+                neos = load_neos(self.compress(source, codec))
+                self.assertEqual([neo.name for neo in neos], ['Two\r\nLines'])
+
+    def test_load_approaches(self):
+        for codec in CODECS:
+            with self.subTest(codec=codec):
+                approaches = load_approaches(self.compress(TEST_CAD_FILE,
+                                                           codec))
+                self.assertEqual(
+                    [(a.designation, a.time, a.distance, a.velocity)
+                     for a in approaches],
+                    [(a.designation, a.time, a.distance, a.velocity)
+                     for a in self.approaches])
+
+
+class TestCompressedOutputs(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        db = NEODatabase(load_neos(TEST_NEO_FILE),
+                         load_approaches(TEST_CAD_FILE), cache_entries=0)
+        cls.results = list(db.query(create_filters(distance_max=0.1)))
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = pathlib.Path(self.tmp.name)
+
+    def test_writers(self):
+        for write, suffix in ((write_to_csv, '.csv'), (write_to_json, '.json'),
+                              (write_to_ndjson, '.ndjson'),
+                              (write_to_columnar, '.neocol')):
+            plain = self.root / f'plain{suffix}'
+            write(self.results, plain)
+            for codec, (codec_suffix, _, _) in CODECS.items():
+                with self.subTest(suffix=suffix, codec=codec):
+                    path = self.root / f'out{suffix}{codec_suffix}'
+                    write(self.results, path, compresslevel=1)
+                    self.assertEqual(sniff_codec(path), codec)
+                    self.assertEqual(
+                        MODULES[codec].decompress(path.read_bytes()),
+                        plain.read_bytes())
+
+    def test_compression_level(self):
+        fast, small = self.root / 'fast.csv.gz', self.root / 'small.csv.gz'
+        write_to_csv(self.results * 5, fast, compresslevel=1)
+        write_to_csv(self.results * 5, small, compresslevel=9)
+        self.assertLess(small.stat().st_size, fast.stat().st_size)
+
+    def test_load_compressed_columnar(self):
+        plain, path = self.root / 'out.neocol', self.root / 'out.neocol.xz'
+        write_to_columnar(self.results, plain)
+        write_to_columnar(self.results, path)
+        columns, dictionaries = load_columnar(path)
+        plain_columns, plain_dictionaries = load_columnar(plain)
+        self.assertEqual(dictionaries, plain_dictionaries)
+        # Compare the bytes, since the missing diameters are NaN.
+        self.assertEqual({name: column.tobytes()
+                          for name, column in columns.items()},
+                         {name: column.tobytes()
+                          for name, column in plain_columns.items()})
+
+
+if __name__ == '__main__':
+    unittest.main()
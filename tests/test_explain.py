@@ -0,0 +1,124 @@
+"""Check that profiled queries explain their plan and their work correctly.
+
+A `QueryProfile` passed to `NEODatabase.query` records how the query was
+planned and counts, for each filter checked approach by approach, how often
+it was evaluated and how often it rejected an approach - without changing the
+results. It also times the stages of the pipeline consuming the query.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_explain
+"""
+import datetime
+import json
+import pathlib
+import unittest
+
+from database import NEODatabase
+from explain import QueryProfile, describe
+from extract import load_neos, load_approaches
+from filters import create_filters, limit
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestQueryProfile(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+
+    def setUp(self):
+        self.db = NEODatabase(self.neos, self.approaches)
+
+    def profiled(self, filters, **kwargs):
+        profile = QueryProfile(filters)
+        results = list(self.db.query(filters, profile=profile, **kwargs))
+        return results, profile
+
+    def test_profiled_query_counts_each_filter(self):
+        filters = create_filters(start_date=datetime.date(2020, 3, 1),
+                                 distance_max=0.05, velocity_min=10)
+        # The first query scans linearly, and the second one builds and uses
+        # the index.
+        self.db = NEODatabase(self.neos, self.approaches, cache_entries=0)
+        expected = list(self.db.query(filters))
+        results, profile = self.profiled(filters)
+        self.assertEqual(results, expected)
+
+        checked = [i for i in range(len(filters)) if i not in profile.planned]
+        self.assertEqual(len(profile.planned), 1)
+        self.assertIn('sorted index', profile.plan)
+        self.assertEqual(profile.evaluations[checked[0]], profile.rows_scanned)
+        self.assertEqual(sum(profile.rejections),
+                         profile.rows_scanned - len(results))
+        for i in profile.planned:
+            self.assertEqual(profile.evaluations[i], 0)
+
+    def test_full_scan_plan(self):
+        results, profile = self.profiled([])
+        self.assertEqual(profile.plan, f'full scan of {len(self.approaches)} '
+                                       f'approaches')
+        self.assertEqual(profile.rows_scanned, len(self.approaches))
+        self.assertEqual(len(results), len(self.approaches))
+
+    def test_one_off_query_plan(self):
+        filters = create_filters(distance_max=0.05, velocity_min=10)
+        results, profile = self.profiled(filters)
+        self.assertTrue(profile.plan.startswith(
+            f'full scan of {len(self.approaches)} approaches'))
+        self.assertEqual(profile.rows_scanned, len(self.approaches))
+        self.assertEqual(profile.planned, [])
+
+    def test_cached_query_plan(self):
+        filters = create_filters(distance_max=0.05)
+        list(self.db.query(filters))
+        results, profile = self.profiled(filters)
+        self.assertTrue(profile.plan.startswith('cached result'))
+        self.assertEqual(profile.rows_scanned, 0)
+        self.assertEqual(profile.planned, [0])
+
+    def test_contradictory_neo_filters(self):
+        filters = (create_filters(hazardous=True)
+                   + create_filters(hazardous=False))
+        results, profile = self.profiled(filters)
+        self.assertEqual(results, [])
+        self.assertIn('selecting 0 NEOs', profile.plan)
+        self.assertEqual(profile.rows_scanned, 0)
+
+    def test_sharded_profile_adds_up_shards(self):
+        filters = create_filters(velocity_min=10, distance_max=0.2)
+        serial_results, serial = self.profiled(filters)
+        db = NEODatabase(self.neos, self.approaches, cache_entries=0)
+        profile = QueryProfile(filters)
+        results = list(db.query(filters, workers=2, profile=profile))
+        self.assertEqual(results, serial_results)
+        self.assertEqual(profile.rows_scanned, serial.rows_scanned)
+        self.assertEqual(profile.rejections, serial.rejections)
+
+    def test_stages_and_serialization(self):
+        filters = create_filters(distance_max=0.1)
+        profile = QueryProfile(filters)
+        results = profile.timed('scan', self.db.query(filters,
+                                                      profile=profile))
+        results = profile.timed('limit', limit(results, 5))
+        with profile.time('write'):
+            written = list(results)
+        self.assertEqual(len(written), 5)
+        self.assertEqual(profile.rows_emitted, 5)
+        self.assertEqual([name for name, _ in profile.stages()],
+                         ['scan', 'limit', 'write'])
+        self.assertTrue(all(seconds >= 0 for _, seconds in profile.stages()))
+
+        data = json.loads(json.dumps(profile.serialize()))
+        self.assertEqual(data['filters'][0]['filter'],
+                         describe(filters[0]))
+        self.assertEqual(set(data['stages']), {'scan', 'limit', 'write'})
+        self.assertIn('Rows emitted: 5', str(profile))
+
+
+if __name__ == '__main__':
+    unittest.main()
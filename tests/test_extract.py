@@ -12,11 +12,15 @@ These tests should pass when Task 2 is complete.
 """
 import collections.abc
 import datetime
+import json
 import pathlib
 import math
+import tempfile
+import types
 import unittest
+import unittest.mock
 
-from extract import load_neos, load_approaches
+from extract import load_neos, load_approaches, iter_approaches
 from models import NearEarthObject, CloseApproach
 
 
@@ -78,6 +82,43 @@ class TestLoadNEOs(unittest.TestCase):
         self.assertEqual(neo.hazardous, True)
 
 
+class TestLoadNEOsInParallel(unittest.TestCase):
+    @classmethod
+    @unittest.mock.patch('extract.PARALLEL_MIN_SIZE', 0)
+    def setUpClass(cls):
+        cls.serial = load_neos(TEST_NEO_FILE, workers=1)
+        cls.parallel = load_neos(TEST_NEO_FILE, workers=3)
+
+    def test_parallel_load_contains_all_elements(self):
+        self.assertEqual(len(self.parallel), len(self.serial))
+
+    def test_parallel_load_preserves_file_order(self):
+        self.assertEqual([neo.designation for neo in self.parallel],
+                         [neo.designation for neo in self.serial])
+
+    def test_parallel_load_matches_serial_load(self):
+        for neo, other in zip(self.parallel, self.serial):
+            self.assertEqual(neo.name, other.name)
+            self.assertEqual(neo.hazardous, other.hazardous)
+            self.assertEqual(str(neo.diameter), str(other.diameter))
+
+    @unittest.mock.patch('extract.PARALLEL_MIN_SIZE', 0)
+    def test_crlf_line_endings_are_left_to_the_csv_reader(self):
+        text = ('pdes,name,pha,diameter\r\n'
+                '2101,Adonis,Y,0.6\r\n'
+                '2019 SC8,,N,\r\n'
+                '4581,Asclepius,Y,\r\n')
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = pathlib.Path(tmpdir) / 'neos.csv'
+            path.write_bytes(text.encode('utf-8'))
+            for workers in (1, 2):
+                neos = load_neos(path, workers=workers)
+                self.assertEqual([neo.designation for neo in neos],
+                                 ['2101', '2019 SC8', '4581'])
+                self.assertEqual(neos[0].diameter, 0.6)
+                self.assertTrue(neos[2].hazardous)
+
+
 class TestLoadApproaches(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -118,5 +159,52 @@ class TestLoadApproaches(unittest.TestCase):
         self.assertIsInstance(approach.velocity, float)
 
 
+class TestIterApproaches(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+
+    def test_iter_approaches_is_a_generator(self):
+        self.assertIsInstance(iter_approaches(TEST_CAD_FILE),
+                              types.GeneratorType)
+
+    def test_iter_approaches_matches_json_load(self):
+        with open(TEST_CAD_FILE) as f:
+            data = json.load(f)
+        fields = data['fields']
+        records = data['data']
+        streamed = tuple(iter_approaches(TEST_CAD_FILE))
+        self.assertEqual(len(streamed), len(records))
+        for approach, record in zip(streamed, records):
+            self.assertEqual(approach.designation, record[fields.index('des')])
+            self.assertEqual(approach.distance,
+                             float(record[fields.index('dist')]))
+            self.assertEqual(approach.velocity,
+                             float(record[fields.index('v_rel')]))
+
+    def test_iter_approaches_accepts_fields_before_data(self):
+        document = {
+            'fields': ['v_rel', 'cd', 'des', 'dist'],
+            'count': '2',
+            'data': [['5.5', '2020-Jan-01 00:54', '2020 AY1', '0.02'],
+                     ['7.25', '2020-Feb-29 23:59', '433', '0.15']],
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = pathlib.Path(tmpdir) / 'cad.json'
+            path.write_text(json.dumps(document))
+            streamed = tuple(iter_approaches(path))
+
+        self.assertEqual([a.designation for a in streamed], ['2020 AY1', '433'])
+        self.assertEqual(streamed[1].time, datetime.datetime(2020, 2, 29, 23, 59))
+        self.assertEqual(streamed[1].distance, 0.15)
+        self.assertEqual(streamed[1].velocity, 7.25)
+
+    def test_iter_approaches_shares_equal_timestamps(self):
+        by_time = {}
+        for approach in iter_approaches(TEST_CAD_FILE):
+            shared = by_time.setdefault(approach.time, approach.time)
+            self.assertIs(approach.time, shared)
+
+
 if __name__ == '__main__':
     unittest.main()
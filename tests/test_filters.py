@@ -0,0 +1,129 @@
+"""Check that `compile_filters` fuses filters into an equivalent predicate.
+
+The generated predicate must accept exactly the approaches that pass every
+filter, including custom `AttributeFilter` subclasses, and must report
+contradictory bounds as None.
+
+Also check that `sort` orders approaches like `sorted`, keeping only the top
+values when limited and placing unknown diameters last.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_filters
+"""
+import datetime
+import itertools
+import math
+import operator
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import (create_filters, compile_filters, AttributeFilter,
+                     DistanceFilter, sort, SORT_KEYS)
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class RoundedDistanceFilter(DistanceFilter):
+    @classmethod
+    def get(cls, approach):
+        return round(approach.distance, 1)
+
+
+class OddVelocityFilter(AttributeFilter):
+    @classmethod
+    def get(cls, approach):
+        return int(approach.velocity) % 2
+
+
+class TestCompileFilters(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        NEODatabase(load_neos(TEST_NEO_FILE), cls.approaches)
+
+    def assertFusedMatchesFilters(self, filters):
+        predicate = compile_filters(filters)
+        for approach in self.approaches:
+            expected = all(f(approach) for f in filters)
+            self.assertEqual(predicate(approach), expected, msg=filters)
+
+    def test_no_filters_accept_everything(self):
+        self.assertFusedMatchesFilters([])
+
+    def test_combinations_of_criteria(self):
+        criteria = {
+            'start_date': datetime.date(2020, 3, 1),
+            'end_date': datetime.date(2020, 5, 31),
+            'distance_min': 0.01, 'distance_max': 0.2,
+            'velocity_min': 5, 'velocity_max': 25,
+            'diameter_min': 0.05, 'diameter_max': 1.5,
+            'hazardous': False,
+        }
+        for pair in itertools.combinations(criteria, 2):
+            self.assertFusedMatchesFilters(
+                create_filters(**{name: criteria[name] for name in pair}))
+        self.assertFusedMatchesFilters(create_filters(**criteria))
+
+    def test_equal_bounds_become_equality(self):
+        date = datetime.date(2020, 3, 2)
+        self.assertFusedMatchesFilters(create_filters(start_date=date,
+                                                      end_date=date))
+
+    def test_custom_filters_are_called(self):
+        self.assertFusedMatchesFilters(
+            create_filters(distance_max=0.3)
+            + [OddVelocityFilter(operator.eq, 1),
+               RoundedDistanceFilter(operator.le, 0.1)])
+
+    def test_non_range_comparators(self):
+        self.assertFusedMatchesFilters([DistanceFilter(operator.ne, 0.1),
+                                        DistanceFilter(operator.ge,
+                                                       float('nan'))])
+
+    def test_contradictory_bounds_compile_to_none(self):
+        self.assertIsNone(compile_filters(
+            create_filters(distance_min=0.2, distance_max=0.1)))
+        self.assertIsNone(compile_filters(
+            [DistanceFilter(operator.gt, 0.1), DistanceFilter(operator.le, 0.1)]))
+
+
+class TestSort(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        NEODatabase(load_neos(TEST_NEO_FILE), cls.approaches)
+
+    def test_full_sort_matches_sorted(self):
+        for by, get in SORT_KEYS.items():
+            if by == 'diameter':
+                continue
+            self.assertEqual(sort(iter(self.approaches), by),
+                             sorted(self.approaches, key=get))
+            self.assertEqual(sort(iter(self.approaches), by, reverse=True),
+                             sorted(self.approaches, key=get, reverse=True))
+
+    def test_top_k_is_prefix_of_full_sort(self):
+        for by in SORT_KEYS:
+            for reverse in (False, True):
+                full = sort(iter(self.approaches), by, reverse=reverse)
+                top = sort(iter(self.approaches), by, 10, reverse=reverse)
+                self.assertEqual(top, full[:10])
+
+    def test_unknown_diameters_are_last(self):
+        for reverse in (False, True):
+            ordered = sort(iter(self.approaches), 'diameter', reverse=reverse)
+            known = [a.neo.diameter for a in ordered
+                     if not math.isnan(a.neo.diameter)]
+            self.assertEqual(known, sorted(known, reverse=reverse))
+            self.assertFalse(math.isnan(ordered[0].neo.diameter))
+            self.assertTrue(math.isnan(ordered[-1].neo.diameter))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""Check that `cd_to_datetime` parses exactly like `datetime.strptime`.
+
+The fast parser slices NASA's fixed-width `cd` format by hand, so these tests
+compare it against `strptime` on randomly generated timestamps and on a set of
+malformed (or merely unusual) strings. Likewise, the fast `datetime_to_str`
+must format exactly like `datetime.strftime`.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_helpers
+"""
+import datetime
+import random
+import unittest
+
+from helpers import cd_to_datetime, datetime_to_str, CD_FORMAT
+
+
+def strptime_or_error(calendar_date):
+    try:
+        return datetime.datetime.strptime(calendar_date, CD_FORMAT)
+    except ValueError:
+        return ValueError
+
+
+def cd_to_datetime_or_error(calendar_date):
+    try:
+        return cd_to_datetime(calendar_date)
+    except ValueError:
+        return ValueError
+
+
+class TestCdToDatetime(unittest.TestCase):
+    def setUp(self):
+        self.random = random.Random(2020)
+
+    def random_datetime(self):
+        start = datetime.datetime(1900, 1, 1)
+        minutes = self.random.randrange(300 * 366 * 24 * 60)
+        return start + datetime.timedelta(minutes=minutes)
+
+    def test_parses_example(self):
+        self.assertEqual(cd_to_datetime('2020-Dec-31 12:00'),
+                         datetime.datetime(2020, 12, 31, 12, 0))
+
+    def test_matches_strptime_on_random_timestamps(self):
+        for _ in range(5000):
+            dt = self.random_datetime()
+            calendar_date = dt.strftime(CD_FORMAT)
+            self.assertEqual(cd_to_datetime(calendar_date), dt, calendar_date)
+
+    def test_matches_strptime_on_mutated_timestamps(self):
+        alphabet = '0123456789-: abcJFMANy١+_'
+        for _ in range(5000):
+            chars = list(self.random_datetime().strftime(CD_FORMAT))
+            for _ in range(self.random.randint(1, 2)):
+                chars[self.random.randrange(len(chars))] = \
+                    self.random.choice(alphabet)
+            calendar_date = ''.join(chars)
+            self.assertEqual(cd_to_datetime_or_error(calendar_date),
+                             strptime_or_error(calendar_date), calendar_date)
+
+    def test_matches_strptime_on_unusual_strings(self):
+        for calendar_date in ('', '2020-Dec-31', '2020-Dec-31 12:00 ',
+                              '2020-dec-31 12:00', '2020-Dec-1 2:05',
+                              '2020-Feb-30 12:00', '2020-Dec-31 24:00',
+                              '2020-Dec-31 12:60', '0000-Jan-01 00:00',
+                              '2020-Dec-31T12:00', '2020/Dec/31 12:00',
+                              '+020-Dec-31 12:00', '2_20-Dec-31 12:00'):
+            self.assertEqual(cd_to_datetime_or_error(calendar_date),
+                             strptime_or_error(calendar_date), calendar_date)
+
+    def test_cache_shares_datetimes(self):
+        cache = {}
+        first = cd_to_datetime('2020-Jan-01 00:54', cache)
+        second = cd_to_datetime('2020-Jan-01 00:54', cache)
+        self.assertIs(first, second)
+        self.assertEqual(cache, {'2020-Jan-01 00:54': first})
+
+
+class TestDatetimeToStr(unittest.TestCase):
+    def test_formats_example(self):
+        self.assertEqual(datetime_to_str(datetime.datetime(2020, 1, 2, 3, 4)),
+                         '2020-01-02 03:04')
+
+    def test_matches_strftime(self):
+        rng = random.Random(2020)
+        for _ in range(5000):
+            dt = datetime.datetime(rng.randrange(1, 10000),
+                                   rng.randrange(1, 13), rng.randrange(1, 29),
+                                   rng.randrange(24), rng.randrange(60))
+            self.assertEqual(datetime_to_str(dt),
+                             dt.strftime('%Y-%m-%d %H:%M'), dt)
+
+    def test_matches_strftime_on_early_years(self):
+        for year in (1, 9, 10, 99, 100, 999, 1000):
+            dt = datetime.datetime(year, 12, 31, 23, 59)
+            self.assertEqual(datetime_to_str(dt),
+                             dt.strftime('%Y-%m-%d %H:%M'), dt)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+"""Check that sorted indexes answer range lookups like a linear scan.
+
+A `SortedIndex` maps a range of keys to the positions of the matching
+approaches, and `criteria_range` intersects comparison filters into such a
+range. An `NEODatabase` uses them to answer date, distance, velocity and
+diameter criteria, and checks NEO criteria on its NEOs first, which must give
+the same results, in internal order, as checking every approach.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_index
+"""
+import datetime
+import operator
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, AttributeFilter, DistanceFilter
+from index import SortedIndex, criteria_range
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestSortedIndex(unittest.TestCase):
+    def setUp(self):
+        self.keys = [5, 1, 3, 3, 9, 7]
+        self.index = SortedIndex(((key, pos) for pos, key in enumerate(self.keys)), 'l')
+
+    def positions(self, *args):
+        return list(self.index.positions_between(*self.index.span(*args)))
+
+    def expected(self, predicate):
+        return [pos for pos, key in enumerate(self.keys) if predicate(key)]
+
+    def test_span_inclusive(self):
+        self.assertEqual(self.positions(3, 7), self.expected(lambda k: 3 <= k <= 7))
+
+    def test_span_exclusive(self):
+        self.assertEqual(self.positions(3, 7, False, False),
+                         self.expected(lambda k: 3 < k < 7))
+
+    def test_span_unbounded(self):
+        self.assertEqual(self.positions(None, 3), self.expected(lambda k: k <= 3))
+        self.assertEqual(self.positions(5, None), self.expected(lambda k: k >= 5))
+        self.assertEqual(self.positions(), list(range(len(self.keys))))
+
+    def test_span_empty(self):
+        self.assertEqual(self.positions(8, 2), [])
+        self.assertEqual(self.positions(4, 4), [])
+
+
+class TestCriteriaRange(unittest.TestCase):
+    def test_equality_bounds_both_sides(self):
+        filters = [AttributeFilter(operator.eq, 4)]
+        self.assertEqual(criteria_range(filters), (4, 4, True, True))
+
+    def test_tightest_bounds_win(self):
+        filters = [AttributeFilter(operator.ge, 1), AttributeFilter(operator.gt, 2),
+                   AttributeFilter(operator.le, 8), AttributeFilter(operator.lt, 8)]
+        self.assertEqual(criteria_range(filters), (2, 8, False, False))
+
+
+class TestIndexedQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Reverse the approaches so that internal order isn't time order.
+        cls.approaches = load_approaches(TEST_CAD_FILE)[::-1]
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), cls.approaches)
+
+    def assertQueryMatchesScan(self, **criteria):
+        filters = create_filters(**criteria)
+        expected = [approach for approach in self.approaches
+                    if all(f(approach) for f in filters)]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(list(self.db.query(filters)), expected)
+
+    def test_date_query_in_internal_order(self):
+        self.assertQueryMatchesScan(date=datetime.date(2020, 3, 2))
+
+    def test_date_range_query_in_internal_order(self):
+        self.assertQueryMatchesScan(start_date=datetime.date(2020, 3, 1),
+                                    end_date=datetime.date(2020, 3, 31),
+                                    distance_max=0.1)
+
+    def test_distance_query_in_internal_order(self):
+        self.assertQueryMatchesScan(distance_max=0.001)
+
+    def test_velocity_range_query_in_internal_order(self):
+        self.assertQueryMatchesScan(velocity_min=20, velocity_max=25)
+
+    def test_diameter_query_skips_unknown_diameters(self):
+        self.assertQueryMatchesScan(diameter_max=0.5)
+
+    def test_combined_query_in_internal_order(self):
+        self.assertQueryMatchesScan(start_date=datetime.date(2020, 1, 1),
+                                    distance_max=0.2, velocity_min=10,
+                                    diameter_min=0.1, hazardous=False)
+
+    def test_nan_criterion_matches_nothing(self):
+        filters = create_filters(distance_min=float('nan'))
+        self.assertEqual(list(self.db.query(filters)), [])
+
+    def test_plan_is_driven_by_most_selective_criterion(self):
+        filters = create_filters(start_date=datetime.date(2020, 1, 1),
+                                 distance_max=0.001)
+        db = NEODatabase(self.db._neos, self.approaches)
+        db._plan(filters)
+        positions, remaining = db._plan(filters)
+        close = [a for a in self.approaches if a.distance <= 0.001]
+        self.assertEqual(len(positions), len(close))
+        self.assertEqual(remaining, filters[:1])
+
+    def test_first_plan_scans_without_building_an_index(self):
+        filters = create_filters(start_date=datetime.date(2020, 1, 1),
+                                 distance_max=0.001)
+        db = NEODatabase(self.db._neos, self.approaches)
+        positions, remaining = db._plan(filters)
+        self.assertEqual(positions, range(len(self.approaches)))
+        self.assertEqual(remaining, filters)
+        self.assertEqual(db._indexes, {})
+
+        db._plan(filters)
+        self.assertEqual(list(db._indexes), [DistanceFilter])
+
+    def test_neo_criteria_query_in_internal_order(self):
+        self.assertQueryMatchesScan(diameter_min=1, hazardous=True)
+        self.assertQueryMatchesScan(hazardous=True, velocity_min=15)
+
+    def test_plan_is_driven_by_qualifying_neos(self):
+        filters = create_filters(diameter_min=1, hazardous=True,
+                                 distance_max=0.3)
+        positions, remaining = self.db._plan(filters)
+        qualifying = [a for a in self.approaches
+                      if a.neo.diameter >= 1 and a.neo.hazardous]
+        self.assertEqual(len(positions), len(qualifying))
+        self.assertEqual(list(positions), sorted(positions))
+        self.assertEqual(remaining, filters[:1])
+
+    def test_broad_neo_criteria_scan_linearly(self):
+        filters = create_filters(hazardous=False)
+        positions, remaining = self.db._plan(filters)
+        self.assertEqual(positions, range(len(self.approaches)))
+        self.assertEqual(remaining, filters)
+
+    def test_date_range_query_without_matches(self):
+        filters = create_filters(start_date=datetime.date(2020, 4, 1),
+                                 end_date=datetime.date(2020, 3, 1))
+        self.assertEqual(list(self.db.query(filters)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
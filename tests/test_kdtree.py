@@ -0,0 +1,119 @@
+"""Check that nearest-neighbor searches agree with exhaustive comparisons.
+
+A `KDTree` finds the points nearest to a target, for any per-coordinate
+weights, and `NEODatabase.nearest` uses one to find the close approaches most
+similar to a target distance, velocity and time.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_kdtree
+"""
+import datetime
+import math
+import pathlib
+import random
+import statistics
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from kdtree import KDTree
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def brute_force(points, target, k, weights):
+    distances = sorted(
+        (math.sqrt(sum((w * (p - t)) ** 2
+                       for w, p, t in zip(weights, point, target))), i)
+        for i, point in enumerate(points))
+    return [distance for distance, _ in distances[:k]]
+
+
+class TestKDTree(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(7)
+        cls.points = [(rng.random(), rng.gauss(0, 1), round(rng.random(), 1))
+                      for _ in range(2000)]
+        cls.tree = KDTree(cls.points)
+        cls.targets = [(rng.random(), rng.gauss(0, 1), rng.random())
+                       for _ in range(20)]
+
+    def assertNearest(self, k, weights):
+        for target in self.targets:
+            results = self.tree.nearest(target, k, weights)
+            self.assertEqual(len(results), min(k, len(self.points)))
+            expected = brute_force(self.points, target, k,
+                                   weights or (1, 1, 1))
+            for (_, distance), other in zip(results, expected):
+                self.assertAlmostEqual(distance, other)
+
+    def test_nearest_matches_brute_force(self):
+        self.assertNearest(1, None)
+        self.assertNearest(10, None)
+
+    def test_weighted_nearest_matches_brute_force(self):
+        self.assertNearest(5, (1, 3, 0.5))
+        self.assertNearest(5, (0, 1, 1))
+
+    def test_more_neighbors_than_points(self):
+        tree = KDTree([(0.0, 0.0), (1.0, 1.0)])
+        self.assertEqual([i for i, _ in tree.nearest((0.9, 0.9), 5)], [1, 0])
+
+    def test_one_weight_per_coordinate(self):
+        tree = KDTree([(0.0, 0.0), (1.0, 1.0)])
+        with self.assertRaises(ValueError):
+            tree.nearest((0.9, 0.9), 1, (1, 1, 1))
+
+    def test_empty_tree(self):
+        self.assertEqual(KDTree([]).nearest((0, 0, 0), 3), [])
+
+
+class TestNearestApproaches(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), cls.approaches)
+
+    def coordinates(self, approach):
+        return (approach.distance, approach.velocity,
+                approach.time.toordinal()
+                + (approach.time.hour * 60 + approach.time.minute) / 1440)
+
+    def test_nearest_matches_brute_force(self):
+        target = (0.01, 15, datetime.date(2020, 6, 1))
+        weights = (1, 2, 0.5)
+        points = [self.coordinates(a) for a in self.approaches]
+        scales = [statistics.pstdev(column) for column in zip(*points)]
+        scaled = [tuple(v / s for v, s in zip(point, scales))
+                  for point in points]
+        scaled_target = (0.01 / scales[0], 15 / scales[1],
+                         target[2].toordinal() / scales[2])
+
+        results = self.db.nearest(target, 5, weights)
+        expected = brute_force(scaled, scaled_target, 5, weights)
+        self.assertEqual(len(results), 5)
+        for (_, dissimilarity), other in zip(results, expected):
+            self.assertAlmostEqual(dissimilarity, other)
+
+    def test_invalid_weights_are_rejected(self):
+        target = (0.1, 10, datetime.datetime(2020, 6, 1))
+        for weights in ((1, 1), (1, 1, 1, 1), (1, -1, 1)):
+            with self.subTest(weights=weights), \
+                    self.assertRaises(ValueError):
+                self.db.nearest(target, 5, weights)
+
+    def test_exact_approach_is_nearest(self):
+        approach = self.approaches[1234]
+        results = self.db.nearest((approach.distance, approach.velocity,
+                                   approach.time), 1)
+        self.assertIs(results[0][0], approach)
+        self.assertAlmostEqual(results[0][1], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""Check that NEOs can be found by a prefix or a misspelling of their name.
+
+The `edit_distance` function counts insertions, deletions, substitutions and
+transpositions. An `NEODatabase` lists the NEOs whose name or designation
+starts with a prefix, or is closest to an approximate spelling, through a
+`NameIndex`.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_names
+"""
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from names import edit_distance, trigrams
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestEditDistance(unittest.TestCase):
+    def test_identical_and_empty_strings(self):
+        self.assertEqual(edit_distance('apophis', 'apophis'), 0)
+        self.assertEqual(edit_distance('', 'eros'), 4)
+        self.assertEqual(edit_distance('eros', ''), 4)
+
+    def test_single_edits(self):
+        self.assertEqual(edit_distance('apophis', 'apopis'), 1)
+        self.assertEqual(edit_distance('apophis', 'apophiss'), 1)
+        self.assertEqual(edit_distance('apophis', 'apaphis'), 1)
+        self.assertEqual(edit_distance('apophis', 'apohpis'), 1)
+
+    def test_distance_is_symmetric(self):
+        self.assertEqual(edit_distance('kitten', 'sitting'), 3)
+        self.assertEqual(edit_distance('sitting', 'kitten'), 3)
+
+    def test_long_strings(self):
+        a = 'a' * 70 + 'b'
+        self.assertEqual(edit_distance(a, 'a' * 70), 1)
+
+    def test_trigrams_are_padded_and_lowercased(self):
+        self.assertEqual(trigrams('Ab'), {'  a', ' ab', 'ab '})
+
+
+class TestNameSearch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.db = NEODatabase(cls.neos, load_approaches(TEST_CAD_FILE))
+
+    def test_prefix_matches_names_and_designations(self):
+        self.assertEqual([neo.name for neo in self.db.get_neos_by_prefix('apo')],
+                         ['Apophis'])
+        neos = self.db.get_neos_by_prefix('2020 AB', limit=100)
+        expected = sorted(neo.designation for neo in self.neos
+                          if neo.designation.startswith('2020 AB'))
+        self.assertEqual([neo.designation for neo in neos], expected)
+
+    def test_prefix_respects_limit(self):
+        self.assertEqual(len(self.db.get_neos_by_prefix('2020', limit=3)), 3)
+        self.assertEqual(self.db.get_neos_by_prefix('no such prefix'), [])
+
+    def test_fuzzy_ranks_closest_spelling_first(self):
+        neo, distance = self.db.get_neos_by_fuzzy_name('Apohpis')[0]
+        self.assertEqual((neo.name, distance), ('Apophis', 1))
+
+    def test_fuzzy_exact_designation_comes_first(self):
+        results = self.db.get_neos_by_fuzzy_name('2020 AB2', limit=5)
+        self.assertEqual(results[0][0].designation, '2020 AB2')
+        self.assertEqual(results[0][1], 0)
+        distances = [distance for _, distance in results]
+        self.assertEqual(distances, sorted(distances))
+        self.assertEqual(len({id(neo) for neo, _ in results}), len(results))
+
+    def test_fuzzy_without_limit(self):
+        results = self.db.get_neos_by_fuzzy_name('Apohpis', limit=None)
+        self.assertEqual(results[0][0].name, 'Apophis')
+        self.assertEqual(results,
+                         self.db.get_neos_by_fuzzy_name('Apohpis', limit=1000))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""Check that query results can be paged through with opaque cursors.
+
+Each page of `NEODatabase.query_page` resumes right after the previous one,
+so concatenating every page gives the same results, in the same order, as a
+single query - whether or not the results are cached. A cursor can only
+resume the query that issued it.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_pagination
+"""
+import datetime
+import pathlib
+import unittest
+
+from cursor import CursorError, encode_cursor
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestQueryPage(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+
+    def setUp(self):
+        self.db = NEODatabase(self.neos, self.approaches)
+        self.filters = create_filters(start_date=datetime.date(2020, 6, 1),
+                                      distance_max=0.05)
+
+    def pages(self, page_size):
+        results, cursor = self.db.query_page(self.filters, page_size)
+        pages = [results]
+        while cursor is not None:
+            results, cursor = self.db.query_page(self.filters, page_size,
+                                                 cursor)
+            pages.append(results)
+        return pages
+
+    def test_pages_concatenate_to_query(self):
+        expected = list(self.db.query(self.filters))
+        self.assertGreater(len(expected), 20)
+        pages = self.pages(7)
+        self.assertTrue(all(len(page) == 7 for page in pages[:-1]))
+        self.assertEqual([a for page in pages for a in page], expected)
+
+    def test_pages_of_cached_query(self):
+        expected = list(self.db.query(self.filters))
+        hits = self.db.cache.hits
+        pages = self.pages(10)
+        self.assertGreater(self.db.cache.hits, hits)
+        self.assertEqual([a for page in pages for a in page], expected)
+
+    def test_last_page_has_no_cursor(self):
+        count = len(list(self.db.query(self.filters)))
+        results, cursor = self.db.query_page(self.filters, count)
+        self.assertEqual(len(results), count)
+        self.assertIsNone(cursor)
+
+    def test_cursor_of_another_query_is_rejected(self):
+        _, cursor = self.db.query_page(self.filters, 5)
+        other = create_filters(distance_max=0.05)
+        with self.assertRaises(CursorError):
+            self.db.query_page(other, 5, cursor)
+
+    def test_cursor_ignores_filter_order(self):
+        _, cursor = self.db.query_page(self.filters, 5)
+        results, _ = self.db.query_page(self.filters[::-1], 5, cursor)
+        self.assertEqual(results, list(self.db.query(self.filters))[5:10])
+
+    def test_malformed_cursor_is_rejected(self):
+        for cursor in ('garbage', encode_cursor(3, 'x')[:-2], ''):
+            with self.assertRaises(CursorError):
+                self.db.query_page(self.filters, 5, cursor)
+
+    def test_page_size_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            self.db.query_page(self.filters, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""Check that sharded queries match serial queries, in the same order.
+
+A query with several `workers` scans shards of the close approaches in forked
+worker processes and merges their results back in internal order. With a
+`limit`, it must produce exactly the first matches of the serial query.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_sharded_query
+"""
+import datetime
+import multiprocessing
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+@unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(),
+                     "Sharded queries need the fork start method.")
+class TestShardedQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE),
+                             load_approaches(TEST_CAD_FILE), cache_entries=0)
+
+    def assertShardedMatchesSerial(self, limit=None, **criteria):
+        filters = create_filters(**criteria)
+        serial = list(self.db.query(filters, limit=limit))
+        sharded = list(self.db.query(filters, workers=3, limit=limit))
+        self.assertGreater(len(serial), 0)
+        self.assertEqual(sharded, serial)
+
+    def test_sharded_query_all(self):
+        self.assertShardedMatchesSerial()
+
+    def test_sharded_query_with_filters(self):
+        self.assertShardedMatchesSerial(distance_max=0.1, velocity_min=10)
+
+    def test_sharded_query_with_index(self):
+        self.assertShardedMatchesSerial(start_date=datetime.date(2020, 6, 1),
+                                        hazardous=True)
+
+    def test_sharded_query_with_limit(self):
+        self.assertShardedMatchesSerial(limit=25, distance_min=0.2)
+
+    def test_sharded_query_without_matches(self):
+        filters = create_filters(distance_min=10)
+        self.assertEqual(list(self.db.query(filters, workers=2)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""Check that a database snapshot round-trips NEOs and close approaches.
+
+A snapshot written from freshly extracted NEOs and close approaches should
+load back into equivalent objects, and should be rejected once its source
+fingerprint no longer matches.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_snapshot
+"""
+import math
+import pathlib
+import tempfile
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from snapshot import fingerprint, read_snapshot, write_snapshot, SnapshotError
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestSnapshot(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.fingerprint = fingerprint(TEST_NEO_FILE, TEST_CAD_FILE)
+
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.path = pathlib.Path(cls.tmpdir.name) / 'test.neodb'
+        write_snapshot(cls.path, cls.neos, cls.approaches, cls.fingerprint,
+                       parse_seconds=1.5)
+        cls.loaded_neos, cls.loaded_approaches, cls.parse_seconds = \
+            read_snapshot(cls.path, cls.fingerprint)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_snapshot_preserves_neos(self):
+        self.assertEqual(len(self.loaded_neos), len(self.neos))
+        for neo, loaded in zip(self.neos, self.loaded_neos):
+            self.assertEqual(neo.designation, loaded.designation)
+            self.assertEqual(neo.name, loaded.name)
+            self.assertEqual(neo.hazardous, loaded.hazardous)
+            if math.isnan(neo.diameter):
+                self.assertTrue(math.isnan(loaded.diameter))
+            else:
+                self.assertEqual(neo.diameter, loaded.diameter)
+
+    def test_snapshot_preserves_approaches(self):
+        self.assertEqual(len(self.loaded_approaches), len(self.approaches))
+        for approach, loaded in zip(self.approaches, self.loaded_approaches):
+            self.assertEqual(approach.designation, loaded.designation)
+            self.assertEqual(approach.time, loaded.time)
+            self.assertEqual(approach.distance, loaded.distance)
+            self.assertEqual(approach.velocity, loaded.velocity)
+
+    def test_snapshot_loads_into_database(self):
+        db = NEODatabase(self.loaded_neos, self.loaded_approaches)
+        cerberus = db.get_neo_by_designation('1865')
+        self.assertEqual(cerberus.name, 'Cerberus')
+        self.assertTrue(cerberus.approaches)
+
+    def test_snapshot_reports_parse_time(self):
+        self.assertEqual(self.parse_seconds, 1.5)
+
+    def test_stale_snapshot_is_rejected(self):
+        stale = fingerprint(TEST_NEO_FILE)
+        with self.assertRaises(SnapshotError):
+            read_snapshot(self.path, stale)
+
+    def test_missing_snapshot_is_rejected(self):
+        with self.assertRaises(SnapshotError):
+            read_snapshot(self.path.with_name('missing.neodb'), self.fingerprint)
+
+
+if __name__ == '__main__':
+    unittest.main()
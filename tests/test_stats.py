@@ -0,0 +1,109 @@
+"""Check that streaming summaries match statistics computed on the matches.
+
+The `summarize` function counts the matching close approaches and tracks the
+minimum, maximum and mean of their distances and velocities exactly, for the
+whole stream or for each group, and estimates their percentiles with the
+P-square algorithm.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_stats
+"""
+import collections
+import pathlib
+import random
+import statistics
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from stats import (P2Quantile, summarize, summaries_to_json, format_table,
+                   GROUP_KEYS)
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def exact_percentile(values, p):
+    values = sorted(values)
+    rank = p * (len(values) - 1)
+    below = int(rank)
+    above = min(below + 1, len(values) - 1)
+    return values[below] + (values[above] - values[below]) * (rank - below)
+
+
+class TestP2Quantile(unittest.TestCase):
+    def test_few_values_are_exact(self):
+        estimate = P2Quantile(0.5)
+        for value in [4, 1, 3]:
+            estimate.add(value)
+        self.assertEqual(estimate.value, 3)
+
+    def test_empty_estimate_is_nan(self):
+        value = P2Quantile(0.9).value
+        self.assertNotEqual(value, value)
+
+    def test_estimate_is_close_to_exact_percentile(self):
+        rng = random.Random(42)
+        values = [rng.gauss(0, 1) for _ in range(5000)]
+        for p in (0.1, 0.5, 0.9):
+            estimate = P2Quantile(p)
+            for value in values:
+                estimate.add(value)
+            self.assertAlmostEqual(estimate.value,
+                                   exact_percentile(values, p), delta=0.05)
+
+
+class TestSummarize(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE),
+                             load_approaches(TEST_CAD_FILE))
+        cls.filters = create_filters(distance_max=0.1)
+        cls.matches = list(cls.db.query(cls.filters))
+
+    def test_single_group_matches_exact_statistics(self):
+        summaries = summarize(self.db.query(self.filters))
+        self.assertEqual(list(summaries), ['all'])
+        distances = [approach.distance for approach in self.matches]
+        summary = summaries['all']['distance_au']
+        self.assertEqual(summary.count, len(self.matches))
+        self.assertEqual(summary.minimum, min(distances))
+        self.assertEqual(summary.maximum, max(distances))
+        self.assertAlmostEqual(summary.mean, statistics.mean(distances))
+
+    def test_group_by_hazardous(self):
+        summaries = summarize(self.db.query(self.filters), 'hazardous')
+        counts = collections.Counter(approach.neo.hazardous
+                                     for approach in self.matches)
+        self.assertEqual(list(summaries), sorted(counts))
+        for group, attributes in summaries.items():
+            self.assertEqual(attributes['velocity_km_s'].count, counts[group])
+
+    def test_group_by_month_is_sorted(self):
+        summaries = summarize(self.db.query(self.filters), 'month')
+        months = {GROUP_KEYS['month'](approach) for approach in self.matches}
+        self.assertEqual(list(summaries), sorted(months))
+
+    def test_json_and_table_output(self):
+        summaries = summarize(self.db.query(self.filters), 'year',
+                              percentiles=(25, 75))
+        data = summaries_to_json(summaries, 'year')
+        self.assertEqual(data['group_by'], 'year')
+        self.assertEqual(data['groups'][0]['group'], 2020)
+        self.assertEqual(set(data['groups'][0]['distance_au']),
+                         {'min', 'max', 'mean', 'p25', 'p75'})
+        lines = format_table(summaries, 'year').splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('year'))
+
+    def test_no_matches(self):
+        filters = create_filters(distance_max=-1)
+        self.assertEqual(summarize(self.db.query(filters)), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+"""Check that one stream of close approaches can feed several writers.
+
+The `tee` function consumes its stream once, feeds each `TeeTarget` up to its
+own limit (from the calling thread or from a background thread), and reports
+a writer's error without blocking the stream. The `query` subcommand uses it
+to write several output files from a single scan.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_tee
+"""
+import argparse
+import contextlib
+import gzip
+import io
+import pathlib
+import tempfile
+import threading
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from main import make_parser, output_target, query
+from write import tee, TeeTarget
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class Collector:
+    """A writer that records the results it's given, and its thread."""
+
+    def __init__(self):
+        self.results = []
+        self.thread = None
+
+    def __call__(self, results):
+        self.thread = threading.current_thread()
+        self.results.extend(results)
+
+
+class TestTee(unittest.TestCase):
+    def setUp(self):
+        self.pulled = 0
+
+    def stream(self, n=5000):
+        for i in range(n):
+            self.pulled += 1
+            yield i
+
+    def test_every_target_gets_the_stream(self):
+        collectors = [Collector() for _ in range(3)]
+        tee(self.stream(), [TeeTarget(collectors[0]),
+                            TeeTarget(collectors[1], threaded=True,
+                                      batch_size=7, queue_size=1),
+                            TeeTarget(collectors[2], threaded=True)])
+        for collector in collectors:
+            self.assertEqual(collector.results, list(range(5000)))
+        self.assertEqual(self.pulled, 5000)
+        self.assertIs(collectors[0].thread, threading.current_thread())
+        self.assertIsNot(collectors[1].thread, threading.current_thread())
+
+    def test_limits(self):
+        collectors = [Collector() for _ in range(3)]
+        tee(self.stream(), [TeeTarget(collectors[0], limit=3),
+                            TeeTarget(collectors[1], limit=1500,
+                                      threaded=True, batch_size=100),
+                            TeeTarget(collectors[2], limit=10,
+                                      threaded=True)])
+        self.assertEqual([collector.results for collector in collectors],
+                         [list(range(3)), list(range(1500)),
+                          list(range(10))])
+        # The stream stops once every target has reached its limit.
+        self.assertEqual(self.pulled, 1500)
+
+    def test_only_threaded_targets(self):
+        collectors = [Collector() for _ in range(2)]
+        tee(self.stream(), [TeeTarget(collectors[0], threaded=True),
+                            TeeTarget(collectors[1], threaded=True,
+                                      limit=20)])
+        self.assertEqual(collectors[0].results, list(range(5000)))
+        self.assertEqual(collectors[1].results, list(range(20)))
+
+    def test_failing_writer(self):
+        collector = Collector()
+
+        def fail(results):
+            next(iter(results))
+            raise OSError("Disk full")
+
+        with self.assertRaisesRegex(OSError, "Disk full"):
+            tee(self.stream(), [TeeTarget(collector),
+                                TeeTarget(fail, threaded=True, batch_size=1,
+                                          queue_size=1)])
+        # The other writer still got every result.
+        self.assertEqual(collector.results, list(range(5000)))
+
+    def test_writer_ignoring_its_stream(self):
+        collector = Collector()
+        tee(self.stream(), [TeeTarget(lambda results: None, threaded=True,
+                                      batch_size=1, queue_size=1),
+                            TeeTarget(collector, threaded=True)])
+        self.assertEqual(collector.results, list(range(5000)))
+
+
+class TestOutputTarget(unittest.TestCase):
+    def test_parses_targets(self):
+        self.assertEqual(output_target('results.csv'),
+                         (pathlib.Path('results.csv'), None))
+        self.assertEqual(output_target('out/results.json.gz:25'),
+                         (pathlib.Path('out/results.json.gz'), 25))
+        self.assertEqual(output_target('-'), (None, None))
+        self.assertEqual(output_target('a:b.csv'),
+                         (pathlib.Path('a:b.csv'), None))
+
+    def test_rejects_invalid_targets(self):
+        for target in ('results.csv:0', ':10'):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                output_target(target)
+
+
+class TestQueryOutputs(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE),
+                             load_approaches(TEST_CAD_FILE), cache_entries=0)
+        cls.parser = make_parser()[0]
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = pathlib.Path(self.tmp.name)
+
+    def query(self, *arguments):
+        args = self.parser.parse_args(['query', *arguments])
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), \
+                contextlib.redirect_stderr(stderr):
+            query(self.db, args)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_outputs_match_single_outputs(self):
+        paths = [self.root / name for name in ('a.csv', 'a.json.gz',
+                                               'a.ndjson')]
+        self.query('--max-distance', '0.1', '--outfile',
+                   *map(str, paths), '-')
+        for path in paths:
+            single = self.root / f'single-{path.name}'
+            self.query('--max-distance', '0.1', '--outfile', str(single))
+            # Compare gzipped files uncompressed, since their headers hold
+            # their name and modification time.
+            read = gzip.open if path.suffix == '.gz' else open
+            with read(path, 'rb') as output, read(single, 'rb') as expected:
+                self.assertEqual(output.read(), expected.read())
+
+    def test_per_output_limits(self):
+        first, second = self.root / 'a.csv', self.root / 'b.csv'
+        stdout, _ = self.query('--limit', '5', '--outfile', str(first),
+                               f'{second}:2', '-')
+        self.assertEqual(len(first.read_text().splitlines()), 6)
+        self.assertEqual(len(second.read_text().splitlines()), 3)
+        self.assertEqual(stdout.count('approaches Earth'), 5)
+
+    def test_rejects_repeated_outputs(self):
+        path = str(self.root / 'a.csv')
+        _, stderr = self.query('--outfile', path, path)
+        self.assertIn('only be given once', stderr)
+        self.assertFalse((self.root / 'a.csv').exists())
+
+    def test_rejects_invalid_level_once(self):
+        paths = [str(self.root / name) for name in ('a.csv.bz2', 'b.json.bz2',
+                                                    'c.csv')]
+        _, stderr = self.query('--compress-level', '0', '--outfile', *paths)
+        self.assertEqual(stderr.count('compression level'), 1)
+        self.assertEqual(list(self.root.iterdir()), [])
+
+    def test_rejects_level_without_compressed_output(self):
+        path = str(self.root / 'a.csv')
+        _, stderr = self.query('--compress-level', '6', '--outfile', path)
+        self.assertIn('only applies to', stderr)
+        self.assertEqual(list(self.root.iterdir()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+"""Check the NDJSON and binary columnar output formats.
+
+`write_to_ndjson` writes one JSON document per close approach and per line.
+`write_to_columnar` writes typed, dictionary-encoded columns in batches, which
+`load_columnar` must read back exactly.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_write_formats
+"""
+import datetime
+import json
+import math
+import pathlib
+import tempfile
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches, load_columnar
+from filters import create_filters
+from neocol import COLUMNAR_MAGIC
+from write import write_to_ndjson, write_to_columnar
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestOutputFormats(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE),
+                             load_approaches(TEST_CAD_FILE), cache_entries=0)
+        cls.results = list(cls.db.query(create_filters(distance_max=0.1)))
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = pathlib.Path(self.tmp.name)
+
+    def test_ndjson_one_approach_per_line(self):
+        path = self.root / 'out.ndjson'
+        write_to_ndjson(iter(self.results), path, batch_size=7)
+        lines = path.read_text().splitlines()
+        self.assertEqual(len(lines), len(self.results))
+        for line, result in zip(lines, self.results):
+            decoded = json.loads(line)
+            self.assertEqual(decoded['datetime_utc'], result.time_str)
+            self.assertEqual(decoded['distance_au'], result.distance)
+            self.assertEqual(decoded['neo']['designation'],
+                             result.designation)
+
+    def test_ndjson_empty(self):
+        path = self.root / 'out.ndjson'
+        write_to_ndjson([], path)
+        self.assertEqual(path.read_text(), '')
+
+    def test_columnar_round_trip(self):
+        path = self.root / 'out.neocol'
+        write_to_columnar(iter(self.results), path, batch_size=100)
+        self.assertGreater(len(self.results), 300)
+        columns, dictionaries = load_columnar(path)
+
+        for name, column in columns.items():
+            self.assertEqual(len(column), len(self.results), name)
+        epoch = datetime.datetime(1970, 1, 1)
+        for i, result in enumerate(self.results):
+            self.assertEqual(
+                epoch + datetime.timedelta(minutes=columns['datetime_utc'][i]),
+                result.time)
+            self.assertEqual(columns['distance_au'][i], result.distance)
+            self.assertEqual(columns['velocity_km_s'][i], result.velocity)
+            self.assertEqual(
+                dictionaries['designation'][columns['designation'][i]],
+                result.designation)
+            name = columns['name'][i]
+            self.assertEqual(dictionaries['name'][name] if name >= 0 else None,
+                             result.neo.name)
+            diameter = columns['diameter_km'][i]
+            self.assertTrue(diameter == result.neo.diameter
+                            or math.isnan(diameter)
+                            and math.isnan(result.neo.diameter))
+            self.assertEqual(bool(columns['potentially_hazardous'][i]),
+                             result.neo.hazardous)
+
+    def test_columnar_dictionary_spans_batches(self):
+        path = self.root / 'out.neocol'
+        write_to_columnar(self.results, path, batch_size=10)
+        _, dictionaries = load_columnar(path)
+        designations = dictionaries['designation']
+        self.assertEqual(len(designations), len(set(designations)))
+        self.assertEqual(set(designations),
+                         {result.designation for result in self.results})
+
+    def test_columnar_empty(self):
+        path = self.root / 'out.neocol'
+        write_to_columnar([], path)
+        columns, dictionaries = load_columnar(path)
+        self.assertTrue(all(len(column) == 0 for column in columns.values()))
+        self.assertEqual(dictionaries, {'designation': [], 'name': []})
+
+    def test_columnar_rejects_other_files(self):
+        path = self.root / 'out.neocol'
+        path.write_bytes(b'designation,name\n')
+        with self.assertRaises(ValueError):
+            load_columnar(path)
+
+    def test_columnar_rejects_truncated_files(self):
+        path = self.root / 'out.neocol'
+        write_to_columnar(self.results, path)
+        data = path.read_bytes()
+        self.assertTrue(data.startswith(COLUMNAR_MAGIC))
+        path.write_bytes(data[:-5])
+        with self.assertRaises(ValueError):
+            load_columnar(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
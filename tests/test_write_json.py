@@ -0,0 +1,163 @@
+"""Check that the streaming JSON writer matches `json.dump`.
+
+`write_to_json` writes each close approach as it is produced, rather than
+building the whole list first. Its output must stay byte-for-byte identical to
+`json.dump(..., indent=4)` of that list, and its compact mode must produce the
+same document without the whitespace. The `ExportCache` that renders each NEO
+once per export must not change a byte of the CSV or JSON output.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_write_json
+"""
+import csv
+import datetime
+import io
+import json
+import pathlib
+import tempfile
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from models import NearEarthObject, CloseApproach
+from write import (CSV_FIELDNAMES, ExportCache, JSONArrayEncoder,
+                   write_to_json, write_neos_to_json, _csv_row)
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestJSONArrayEncoder(unittest.TestCase):
+    def encode(self, items, compact=False):
+        encoder = JSONArrayEncoder(compact)
+        return ''.join([encoder.item(item) for item in items] + [encoder.end()])
+
+    def test_empty_array(self):
+        self.assertEqual(self.encode([]), json.dumps([], indent=4))
+        self.assertEqual(self.encode([], compact=True), '[]')
+
+    def test_indented_matches_json_dumps(self):
+        items = [{'a': 1, 'b': {'c': [2, 3], 'd': 'line\nbreak'}},
+                 {'a': None, 'b': {}, 'e': []}, 'text', 4.5]
+        self.assertEqual(self.encode(items), json.dumps(items, indent=4))
+
+    def test_compact_has_no_whitespace(self):
+        items = [{'a': 1, 'b': {'c': [2, 3]}}, {'a': 'x y'}]
+        self.assertEqual(self.encode(items, compact=True),
+                         '[{"a":1,"b":{"c":[2,3]}},{"a":"x y"}]')
+
+
+class TestExportCache(unittest.TestCase):
+    def setUp(self):
+        # Names with characters that CSV must quote, and unusual floats.
+        self.neos = [NearEarthObject('2020 AB', 'Comma, "Quote"', '', 'Y'),
+                     NearEarthObject('433', 'Eros', '16.84', 'N'),
+                     NearEarthObject('2019 SC8', '', '0.01', 'N')]
+        self.results = []
+        for i, (neo, distance) in enumerate(zip(
+                self.neos * 3, (0.1, 1e-20, 12.0, float('nan'),
+                                float('inf'), 3, 0.30000000000000004,
+                                2.5e-5, 1.0))):
+            approach = CloseApproach(neo.designation,
+                                     datetime.datetime(2020, 1, i + 1, i, i),
+                                     distance, 10.0 + i)
+            approach.neo = neo
+            self.results.append(approach)
+
+    def test_csv_rows_match_csv_writer(self):
+        expected = io.StringIO()
+        writer = csv.writer(expected)
+        writer.writerow(CSV_FIELDNAMES)
+        writer.writerows(_csv_row(result) for result in self.results)
+        cache = ExportCache()
+        rows = [cache.csv_row(result) for result in self.results]
+        self.assertEqual(expected.getvalue().split('\r\n', 1)[1],
+                         ''.join(rows))
+
+    def test_json_items_match_json_dump(self):
+        for compact in (False, True):
+            with self.subTest(compact=compact):
+                cache = ExportCache(compact)
+                encoder = JSONArrayEncoder(compact)
+                text = ''.join([encoder.encoded(cache.json_item(result))
+                                for result in self.results] + [encoder.end()])
+                serialized = [result.serialize() for result in self.results]
+                if compact:
+                    expected = json.dumps(serialized, separators=(',', ':'))
+                else:
+                    expected = json.dumps(serialized, indent=4)
+                self.assertEqual(text, expected)
+
+    def test_renders_each_neo_once(self):
+        cache = ExportCache()
+        for result in self.results:
+            cache.csv_row(result)
+            cache.json_item(result)
+        self.assertEqual(len(cache._csv), len(self.neos))
+        self.assertEqual(len(cache._json), len(self.neos))
+
+
+class TestWriteToJSON(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE),
+                             load_approaches(TEST_CAD_FILE), cache_entries=0)
+        cls.filters = create_filters(distance_max=0.1)
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = pathlib.Path(self.tmp.name)
+
+    def test_matches_json_dump(self):
+        results = list(self.db.query(self.filters))
+        self.assertGreater(len(results), 1)
+        path = self.root / 'out.json'
+        write_to_json(iter(results), path, buffer_size=64)
+        expected = json.dumps([result.serialize() for result in results],
+                              indent=4)
+        self.assertEqual(path.read_text(), expected)
+
+    def test_compact(self):
+        indented, compact = self.root / 'a.json', self.root / 'b.json'
+        write_to_json(self.db.query(self.filters), indented)
+        write_to_json(self.db.query(self.filters), compact, compact=True)
+        self.assertEqual(json.loads(compact.read_text()),
+                         json.loads(indented.read_text()))
+        self.assertNotIn('\n', compact.read_text())
+        self.assertLess(compact.stat().st_size, indented.stat().st_size)
+
+    def test_consumes_results_lazily(self):
+        path = self.root / 'out.json'
+        written = []
+
+        def results():
+            for approach in self.db.query(self.filters):
+                written.append(path.stat().st_size)
+                yield approach
+
+        write_to_json(results(), path, buffer_size=1)
+        # With a line-buffered file, earlier results are already on disk when
+        # later ones are produced.
+        self.assertGreater(written[-1], 0)
+
+    def test_write_neos_matches_json_dump(self):
+        neos = [self.db.get_neo_by_designation(designation)
+                for designation in ('1685', '2020 BS', '2019 SC8')]
+        path = self.root / 'neos.json'
+        write_neos_to_json(neos, path)
+        expected = [dict(neo.serialize(),
+                         approaches=[{'datetime_utc': approach.time_str,
+                                      'distance_au': approach.distance,
+                                      'velocity_km_s': approach.velocity}
+                                     for approach in neo.approaches])
+                    for neo in neos]
+        self.assertEqual(path.read_text(), json.dumps(expected, indent=4))
+
+
+if __name__ == '__main__':
+    unittest.main()
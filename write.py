@@ -4,17 +4,73 @@ This module exports two functions: `write_to_csv` and `write_to_json`, each of
 which accept an `results` stream of close approaches and a path to which to
 write the data.
 
+The `write_neos_to_csv` and `write_neos_to_json` functions similarly write a
+stream of NEOs, each with all of its close approaches, for batch inspection.
+
+The `write_to_ndjson` function writes one JSON document per line, and the
+`write_to_columnar` function writes a compact binary file of typed columns
+(in the format of the `neocol` module), which `extract.load_columnar` reads
+back as arrays. Both encode the stream in batches, without collecting it.
+
+Every writer compresses its output with gzip, bzip2 or xz when the file name
+ends with `.gz`, `.bz2` or `.xz` (such as `results.csv.gz`), at an optional
+`compresslevel`.
+
+The writers render the columns of each NEO once per export, with an
+`ExportCache`, rather than once per close approach, and reuse the rendered text
+for the NEO's other approaches.
+
+The JSON writers stream their output through a `JSONArrayEncoder`, which
+encodes one item at a time, so the whole list is never held in memory.
+
+The `awrite_to_csv` and `awrite_to_json` coroutines write an asynchronous
+stream of close approaches (such as `NEODatabase.aquery`), doing the blocking
+file operations on an executor.
+
+The `tee` function feeds a single stream of close approaches to several
+writers (such as a CSV file, a JSON file and stdout), consuming it only once.
+Each `TeeTarget` has its own limit, and slow writers run in background
+threads, fed through bounded queues.
+
 These functions are invoked by the main module with the output of the `limit`
 function and the filename supplied by the user at the command line. The file's
 extension determines which of these functions is used.
 
 You'll edit this file in Part 4.
 """
+import asyncio
 import csv
+import functools
+import io
+import itertools
 import json
+import math
+import queue
+import threading
+
+import compression
+from neocol import write_columns
 
 
-def write_to_csv(results, filename):
+# The header of the CSV output of close approaches.
+CSV_FIELDNAMES = ('datetime_utc', 'distance_au', 'velocity_km_s',
+                  'designation', 'name', 'diameter_km',
+                  'potentially_hazardous')
+
+# Number of results encoded at once by the NDJSON and columnar writers.
+BATCH_SIZE = 4096
+
+# Number of rows or results that the asynchronous writers collect before
+# handing them to the executor.
+ASYNC_BATCH_SIZE = 1000
+
+# Number of results handed at once to a threaded `tee` target, and number of
+# such batches its queue holds before the stream waits for the writer.
+TEE_BATCH_SIZE = 1000
+TEE_QUEUE_SIZE = 4
+
+
+def write_to_csv(results, filename, compresslevel=None):
     """Write an iterable of `CloseApproach` objects to a CSV file.
 
     The precise output specification is in `README.md`. Roughly, each output
@@ -24,33 +80,59 @@ def write_to_csv(results, filename):
     :param results: An iterable of `CloseApproach` objects.
     :param filename: A Path-like object pointing to where the data should
         be saved.
+    :param compresslevel: The compression level of a compressed file, or None
+        for the codec's default level.
     """
-    fieldnames = ('datetime_utc', 'distance_au', 'velocity_km_s',
-                  'designation', 'name', 'diameter_km',
-                  'potentially_hazardous')
-
-    with open(filename, 'w', newline='') as csv_fl:
-        csv_writer = csv.writer(csv_fl)
-        csv_writer.writerow(fieldnames)
+    cache = ExportCache()
+    with _open(filename, 'w', compresslevel, newline='') as csv_fl:
+        csv_fl.write(_csv_line(CSV_FIELDNAMES))
         for result in results:
-            if result.neo.name is None:
-                f_name = ''
-            else:
-                f_name = result.neo.name
+            csv_fl.write(cache.csv_row(result))
+
+
+def _open(filename, mode, compresslevel=None, **kwargs):
+    """Open an output file, through a codec if its name asks for one.
+
+    :param filename: A Path-like object pointing to the output file.
+    :param mode: A mode for `open`, such as 'w' or 'wb'.
+    :param compresslevel: The compression level of a compressed file, or None
+        for the codec's default level.
+    :param kwargs: Other arguments for `open`.
+    :return: A file object.
+    """
+    codec = compression.suffix_codec(filename)
+    if codec is None:
+        return open(filename, mode, **kwargs)
+    return compression.open_codec(codec, filename, mode, compresslevel,
+                                  **kwargs)
 
-            row_to_file = (
-                result.time_str,
-                str(result.distance),
-                str(result.velocity),
-                result.designation,
-                f_name,
-                str(result.neo.diameter),
-                str(result.neo.hazardous))
 
-            csv_writer.writerow(row_to_file)
+def _csv_line(fields):
+    """Return the text of a CSV row, exactly as `csv.writer` writes it."""
+    line = io.StringIO()
+    csv.writer(line).writerow(fields)
+    return line.getvalue()
 
 
-def write_to_json(results, filename):
+def _csv_row(result):
+    """Return the CSV row of a `CloseApproach`, matching `CSV_FIELDNAMES`."""
+    if result.neo.name is None:
+        f_name = ''
+    else:
+        f_name = result.neo.name
+
+    return (
+        result.time_str,
+        str(result.distance),
+        str(result.velocity),
+        result.designation,
+        f_name,
+        str(result.neo.diameter),
+        str(result.neo.hazardous))
+
+
+def write_to_json(results, filename, compact=False, buffer_size=-1,
+                  compresslevel=None):
     """Write an iterable of `CloseApproach` objects to a JSON file.
 
     The precise output specification is in `README.md`. Roughly, the output
@@ -58,15 +140,476 @@ def write_to_json(results, filename):
     to their values and the 'neo' key mapping to a dictionary of the associated
     NEO's attributes.
 
+    The list is streamed: each result is serialized and written as it is
+    produced, so memory use doesn't grow with the number of results.
+
     :param results: An iterable of `CloseApproach` objects.
     :param filename: A Path-like object pointing to where the data should
         be saved.
+    :param compact: Whether to drop the indentation and the whitespace
+        between items, for smaller files.
+    :param buffer_size: The size in bytes of the file's write buffer, or -1
+        for the default size. Compressed files use their codec's buffer.
+    :param compresslevel: The compression level of a compressed file, or None
+        for the codec's default level.
     """
-    lista = []
-    # Format results into Dictionary with serialize method
-    for result in results:
-        lista.append(result.serialize())
-
-    # Write re-formatted results to Json file
-    with open(filename, 'w') as json_fl:
-        json.dump(lista, json_fl, indent=4)
+    encoder = JSONArrayEncoder(compact)
+    cache = ExportCache(compact)
+    with _open(filename, 'w', compresslevel,
+               buffering=buffer_size) as json_fl:
+        for result in results:
+            json_fl.write(encoder.encoded(cache.json_item(result)))
+        json_fl.write(encoder.end())
+
+
+class JSONArrayEncoder:
+    """Encode a JSON array piece by piece, one item at a time.
+
+    The pieces concatenate to exactly what `json.dump` writes for the whole
+    list (with an indent of 4, unless compact), without ever holding the list.
+    """
+
+    def __init__(self, compact=False):
+        """Create a new `JSONArrayEncoder`.
+
+        :param compact: Whether to drop the indentation and the whitespace
+            between items.
+        """
+        self.compact = compact
+        if compact:
+            self._encoder = json.JSONEncoder(separators=(',', ':'))
+        else:
+            self._encoder = json.JSONEncoder(indent=4)
+        self._empty = True
+
+    def item(self, obj):
+        """Return the text of the next item of the array.
+
+        :param obj: A JSON-compatible object.
+        :return: The item's text, preceded by the opening bracket or by a
+            separator.
+        """
+        text = self._encoder.encode(obj)
+        if not self.compact:
+            # Strings are encoded with their newlines escaped, so every
+            # newline is between tokens and can take the array's indentation.
+            text = text.replace('\n', '\n    ')
+        return self.encoded(text)
+
+    def encoded(self, text):
+        """Return the text of the next item of the array, already encoded.
+
+        :param text: The JSON text of the item, indented as an item of the
+            array, such as one returned by `ExportCache.json_item`.
+        :return: The item's text, preceded by the opening bracket or by a
+            separator.
+        """
+        if self.compact:
+            prefix = '[' if self._empty else ','
+        else:
+            prefix = '[\n    ' if self._empty else ',\n    '
+        self._empty = False
+        return prefix + text
+
+    def end(self):
+        """Return the text closing the array."""
+        if self._empty:
+            return '[]'
+        return ']' if self.compact else '\n]'
+
+
+class ExportCache:
+    """The rendered NEO columns of one export, computed once per NEO.
+
+    A popular NEO appears in many rows of an export, so the first time one of
+    its close approaches is written, the NEO's columns are rendered - as the
+    end of a CSV row and as JSON text - and kept for its other approaches.
+    Only the approach's own time, distance and velocity are rendered per row.
+    A cache is meant to live as long as one export, so it holds no NEO
+    beyond it.
+    """
+
+    def __init__(self, compact=False):
+        """Create a new, empty `ExportCache`.
+
+        :param compact: Whether JSON items drop the indentation and the
+            whitespace between tokens.
+        """
+        self.compact = compact
+        if compact:
+            self._encoder = json.JSONEncoder(separators=(',', ':'))
+            self._template = ('{{"datetime_utc":"{}","distance_au":{},'
+                              '"velocity_km_s":{},"neo":{}}}')
+        else:
+            self._encoder = json.JSONEncoder(indent=4)
+            self._template = ('{{\n        "datetime_utc": "{}",'
+                              '\n        "distance_au": {},'
+                              '\n        "velocity_km_s": {},'
+                              '\n        "neo": {}\n    }}')
+        self._csv = {}
+        self._json = {}
+
+    def csv_row(self, result):
+        """Return the line of a `CloseApproach` in the CSV output.
+
+        :param result: A `CloseApproach`.
+        :return: The same text as `csv.writer` writes for its row.
+        """
+        tail = self._csv.get(result.neo)
+        if tail is None:
+            # Only the NEO's columns can need quoting.
+            tail = self._csv[result.neo] = _csv_line(_csv_row(result)[3:])
+        return f'{result.time_str},{result.distance},{result.velocity},{tail}'
+
+    def json_item(self, result):
+        """Return the JSON text of a `CloseApproach`, as an item of a list.
+
+        :param result: A `CloseApproach`.
+        :return: The same text as `json.dump` writes for its `serialize()`
+            dictionary, indented as an item of a list unless compact.
+        """
+        neo = self._json.get(result.neo)
+        if neo is None:
+            neo = self._encoder.encode(result.neo.serialize())
+            if not self.compact:
+                neo = neo.replace('\n', '\n        ')
+            self._json[result.neo] = neo
+        # Times have no characters that need escaping.
+        return self._template.format(result.time_str,
+                                     _json_float(result.distance),
+                                     _json_float(result.velocity), neo)
+
+
+def _json_float(value):
+    """Return the JSON text of a float, as `json.dump` writes it."""
+    if math.isfinite(value):
+        return float.__repr__(value)
+    if math.isnan(value):
+        return 'NaN'
+    return 'Infinity' if value > 0 else '-Infinity'
+
+
+def write_to_ndjson(results, filename, batch_size=BATCH_SIZE,
+                    compresslevel=None):
+    """Write an iterable of `CloseApproach` objects to an NDJSON file.
+
+    Each line is a compact JSON document with the same structure as an entry
+    of the `write_to_json` list, so the file can be read line by line.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param filename: A Path-like object pointing to where the data should
+        be saved.
+    :param batch_size: The number of lines encoded per write.
+    :param compresslevel: The compression level of a compressed file, or None
+        for the codec's default level.
+    """
+    json_item = ExportCache(compact=True).json_item
+    results = iter(results)
+    with _open(filename, 'w', compresslevel) as ndjson_fl:
+        for batch in iter(lambda: list(itertools.islice(results, batch_size)),
+                          []):
+            ndjson_fl.write(''.join([json_item(result) + '\n'
+                                     for result in batch]))
+
+
+def write_to_columnar(results, filename, batch_size=BATCH_SIZE,
+                      compresslevel=None):
+    """Write an iterable of `CloseApproach` objects to a binary columnar file.
+
+    The format, in which designations and names are dictionary-encoded once
+    per file, is described in the `neocol` module.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param filename: A Path-like object pointing to where the data should
+        be saved.
+    :param batch_size: The number of rows per batch.
+    :param compresslevel: The compression level of a compressed file, or None
+        for the codec's default level.
+    """
+    with _open(filename, 'wb', compresslevel) as columnar_fl:
+        write_columns(results, columnar_fl, batch_size)
+
+
+def write_neos_to_csv(neos, filename, compresslevel=None):
+    """Write an iterable of `NearEarthObject`s and their approaches to CSV.
+
+    Each output row corresponds to one close approach of an NEO from the
+    `neos` stream, preceded by that NEO's information. An NEO without any
+    known close approach has a single row, with empty approach columns.
+
+    :param neos: An iterable of `NearEarthObject` objects.
+    :param filename: A Path-like object pointing to where the data should
+        be saved.
+    :param compresslevel: The compression level of a compressed file, or None
+        for the codec's default level.
+    """
+    fieldnames = ('designation', 'name', 'diameter_km',
+                  'potentially_hazardous', 'datetime_utc', 'distance_au',
+                  'velocity_km_s')
+
+    with _open(filename, 'w', compresslevel, newline='') as csv_fl:
+        csv_writer = csv.writer(csv_fl)
+        csv_writer.writerow(fieldnames)
+        for neo in neos:
+            neo_columns = (neo.designation,
+                           '' if neo.name is None else neo.name,
+                           str(neo.diameter),
+                           str(neo.hazardous))
+            if not neo.approaches:
+                csv_writer.writerow(neo_columns + ('', '', ''))
+            for approach in neo.approaches:
+                csv_writer.writerow(neo_columns + (approach.time_str,
+                                                   str(approach.distance),
+                                                   str(approach.velocity)))
+
+
+def write_neos_to_json(neos, filename, compresslevel=None):
+    """Write an iterable of `NearEarthObject`s and their approaches to JSON.
+
+    The output is a list containing dictionaries, each mapping
+    `NearEarthObject` attributes to their values and the 'approaches' key
+    mapping to a list of dictionaries of that NEO's close approaches.
+
+    :param neos: An iterable of `NearEarthObject` objects.
+    :param filename: A Path-like object pointing to where the data should
+        be saved.
+    :param compresslevel: The compression level of a compressed file, or None
+        for the codec's default level.
+    """
+    encoder = JSONArrayEncoder()
+    with _open(filename, 'w', compresslevel) as json_fl:
+        for neo in neos:
+            neo_dict = neo.serialize()
+            neo_dict['approaches'] = [{'datetime_utc': approach.time_str,
+                                       'distance_au': approach.distance,
+                                       'velocity_km_s': approach.velocity}
+                                      for approach in neo.approaches]
+            json_fl.write(encoder.item(neo_dict))
+        json_fl.write(encoder.end())
+
+
+async def awrite_to_csv(results, filename, executor=None,
+                        batch_size=ASYNC_BATCH_SIZE):
+    """Write an asynchronous stream of `CloseApproach` objects to a CSV file.
+
+    The output is the same as that of `write_to_csv`. Rows are written in
+    batches on the executor, where the file is also opened and closed, so the
+    event loop isn't blocked by file I/O.
+
+    :param results: An asynchronous iterable of `CloseApproach` objects.
+    :param filename: A Path-like object pointing to where the data should
+        be saved.
+    :param executor: The `concurrent.futures.Executor` doing the file I/O, or
+        None for the event loop's default executor.
+    :param batch_size: The number of rows written per executor call.
+    """
+    loop = asyncio.get_running_loop()
+    csv_fl = await loop.run_in_executor(
+        executor, functools.partial(_open, filename, 'w', newline=''))
+    try:
+        cache = ExportCache()
+        rows = [_csv_line(CSV_FIELDNAMES)]
+        async for result in results:
+            rows.append(cache.csv_row(result))
+            if len(rows) >= batch_size:
+                await loop.run_in_executor(executor, csv_fl.write,
+                                           ''.join(rows))
+                rows = []
+        await loop.run_in_executor(executor, csv_fl.write, ''.join(rows))
+    finally:
+        # Closing flushes the last buffer (and ends a compressed stream).
+        await loop.run_in_executor(executor, csv_fl.close)
+
+
+async def awrite_to_json(results, filename, executor=None,
+                         batch_size=ASYNC_BATCH_SIZE, compact=False):
+    """Write an asynchronous stream of `CloseApproach` objects to a JSON file.
+
+    The output is the same as that of `write_to_json`. Results are encoded as
+    they arrive and written in batches on the executor, where the file is
+    also opened and closed, so the event loop isn't blocked by file I/O.
+
+    :param results: An asynchronous iterable of `CloseApproach` objects.
+    :param filename: A Path-like object pointing to where the data should
+        be saved.
+    :param executor: The `concurrent.futures.Executor` doing the file I/O, or
+        None for the event loop's default executor.
+    :param batch_size: The number of results written per executor call.
+    :param compact: Whether to drop the indentation and the whitespace
+        between items.
+    """
+    loop = asyncio.get_running_loop()
+    encoder = JSONArrayEncoder(compact)
+    cache = ExportCache(compact)
+    json_fl = await loop.run_in_executor(
+        executor, functools.partial(_open, filename, 'w'))
+    try:
+        pieces = []
+        async for result in results:
+            pieces.append(encoder.encoded(cache.json_item(result)))
+            if len(pieces) >= batch_size:
+                await loop.run_in_executor(executor, json_fl.write,
+                                           ''.join(pieces))
+                pieces = []
+        pieces.append(encoder.end())
+        await loop.run_in_executor(executor, json_fl.write, ''.join(pieces))
+    finally:
+        # Closing flushes the last buffer (and ends a compressed stream).
+        await loop.run_in_executor(executor, json_fl.close)
+
+
+class TeeTarget:
+    """One of the writers fed by `tee`, with its own limit and buffering."""
+
+    def __init__(self, write, limit=None, threaded=False,
+                 batch_size=TEE_BATCH_SIZE, queue_size=TEE_QUEUE_SIZE):
+        """Create a new `TeeTarget`.
+
+        :param write: A function writing an iterable of `CloseApproach`
+            objects, such as `functools.partial(write_to_csv,
+            filename='results.csv')`.
+        :param limit: The maximum number of results to write, or None for no
+            limit.
+        :param threaded: Whether to write from a background thread, rather
+            than from the thread calling `tee`.
+        :param batch_size: The number of results handed at once to a threaded
+            writer.
+        :param queue_size: The number of batches that the queue of a threaded
+            writer holds before the stream waits for the writer.
+        """
+        self.write = write
+        self.limit = limit
+        self.threaded = threaded
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+
+
+# Marks the end of the results handed to a threaded writer.
+_DONE = object()
+
+
+class _BackgroundWriter(threading.Thread):
+    """A thread running the writer of a threaded `TeeTarget`."""
+
+    def __init__(self, target):
+        """Create a new `_BackgroundWriter`, which has yet to be started.
+
+        :param target: A `TeeTarget`.
+        """
+        super().__init__(daemon=True)
+        self.target = target
+        self.error = None
+        self._queue = queue.Queue(target.queue_size)
+        self._batch = []
+        self._count = 0
+        self._closed = False
+        if target.limit is not None and target.limit <= 0:
+            self.close()
+
+    @property
+    def closed(self):
+        """Return whether the writer's stream has ended, so it wants none."""
+        return self._closed
+
+    def put(self, result):
+        """Hand a result to the writer.
+
+        :param result: A `CloseApproach`.
+        :return: Whether the writer wants more results. A writer that reached
+            its limit or failed is closed, and wants none.
+        """
+        if self._closed:
+            return False
+        if self.error is not None:
+            self.close()
+            return False
+        self._batch.append(result)
+        self._count += 1
+        if len(self._batch) >= self.target.batch_size:
+            self._queue.put(self._batch)
+            self._batch = []
+        if self._count == self.target.limit:
+            self.close()
+            return False
+        return True
+
+    def close(self):
+        """Hand the last buffered results to the writer, and end its stream."""
+        if not self._closed:
+            self._closed = True
+            if self._batch:
+                self._queue.put(self._batch)
+            self._queue.put(_DONE)
+
+    def run(self):
+        """Write the results handed to this writer, until its stream ends."""
+        batches = iter(self._queue.get, _DONE)
+        try:
+            self.target.write(itertools.chain.from_iterable(batches))
+        except Exception as error:
+            self.error = error
+        finally:
+            # A writer may stop early (on an error, or without consuming its
+            # stream), so keep emptying the queue to never block the stream.
+            for _ in batches:
+                pass
+
+
+def tee(results, targets):
+    """Write one stream of close approaches with several writers.
+
+    The stream is consumed only once. The first target that isn't threaded
+    writes from the calling thread, pulling results straight from the
+    stream. Every other target writes from a background thread, fed batches
+    of results through a bounded queue, so a slow writer (such as a
+    compressed or large file) doesn't hold the others back until its queue
+    is full.
+
+    Each target stops receiving results at its limit, and the stream stops
+    being consumed once every target has reached its limit.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param targets: A collection of `TeeTarget`s.
+    :raises Exception: The first error raised by a writer, once every writer
+        has stopped.
+    """
+    targets = list(targets)
+    inline = next((target for target in targets if not target.threaded),
+                  None)
+    writers = [_BackgroundWriter(target) for target in targets
+               if target is not inline]
+    for writer in writers:
+        writer.start()
+
+    results = iter(results)
+    active = [writer for writer in writers if not writer.closed]
+    inline_done = inline is None
+
+    def fanout():
+        nonlocal active
+        while active or not inline_done:
+            result = next(results, _DONE)
+            if result is _DONE:
+                return
+            wanted = [writer.put(result) for writer in active]
+            if not all(wanted):
+                active = [writer for writer, more in zip(active, wanted)
+                          if more]
+            yield result
+
+    stream = fanout()
+    try:
+        if inline is not None:
+            inline.write(itertools.islice(stream, inline.limit))
+            inline_done = True
+        for _ in stream:
+            pass
+    finally:
+        for writer in writers:
+            writer.close()
+        for writer in writers:
+            writer.join()
+
+    for writer in writers:
+        if writer.error is not None:
+            raise writer.error